@@ -6,6 +6,10 @@ from models import *
 from schemas import *
 from auth import require_admin, require_superadmin, check_tool_access
 from ai_services import ai_manager
+from search_index import tool_index, free_tool_index
+from trending_calculator import trending_aggregates, rescore_tool, analytics_snapshot
+from category_stats import tool_category_analytics
+from review_ratings import apply_rating_delta
 from typing import Optional, List
 import uuid
 import json
@@ -53,6 +57,11 @@ async def update_tool_content(
     
     db.commit()
     db.refresh(db_tool)
+    
+    analytics_snapshot.invalidate()
+    tool_index.index(db, db_tool)
+    tool_category_analytics.invalidate(db_tool.category_id)
+    
     return db_tool
 
 @router.post("/tools/{tool_id}/request-access", response_model=ToolAccessRequestResponse)
@@ -199,7 +208,21 @@ async def delete_review(
         raise HTTPException(status_code=404, detail="Review not found")
     
     db.delete(review)
+    
+    # Update tool rating statistics
+    tool = db.query(Tool).filter(Tool.id == review.tool_id).first()
+    if tool:
+        trending_aggregates.ensure_loaded(db)
+        old_rating, old_total_reviews = tool.rating, tool.total_reviews
+        apply_rating_delta(db, tool, -review.rating, -1)
+        trending_aggregates.record_rating_change(old_rating, old_total_reviews, tool.rating, tool.total_reviews)
+        rescore_tool(db, tool)
+    
     db.commit()
+    
+    if tool:
+        analytics_snapshot.invalidate()
+        tool_category_analytics.invalidate(tool.category_id)
     return {"message": "Review deleted successfully"}
 
 # Free Tools Admin Management Routes
@@ -222,6 +245,7 @@ async def create_free_tool(
     db.add(db_tool)
     db.commit()
     db.refresh(db_tool)
+    free_tool_index.index(db, db_tool)
     return db_tool
 
 @router.put("/free-tools/{tool_id}", response_model=FreeToolResponse)
@@ -242,6 +266,7 @@ async def update_free_tool(
     
     db.commit()
     db.refresh(db_tool)
+    free_tool_index.index(db, db_tool)
     return db_tool
 
 @router.delete("/free-tools/{tool_id}")
@@ -257,6 +282,7 @@ async def delete_free_tool(
     
     db.delete(db_tool)
     db.commit()
+    free_tool_index.unindex(db, tool_id)
     return {"message": "Free tool deleted successfully"}
 
 @router.get("/free-tools", response_model=List[FreeToolResponse])
@@ -286,6 +312,7 @@ async def bulk_upload_free_tools(
     # Parse CSV and create free tools
     reader = csv.DictReader(io.StringIO(csv_data))
     created_tools = []
+    created_objects = []
     errors = []
     
     for row_num, row in enumerate(reader, start=2):
@@ -309,12 +336,15 @@ async def bulk_upload_free_tools(
             db_tool = FreeTool(**tool_data)
             db.add(db_tool)
             created_tools.append(tool_data['name'])
+            created_objects.append(db_tool)
             
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
     
     if created_tools:
         db.commit()
+        for db_tool in created_objects:
+            free_tool_index.index(db, db_tool)
     
     return {
         "tools_created": len(created_tools),
@@ -603,6 +633,7 @@ async def create_free_tool(
     db.add(db_tool)
     db.commit()
     db.refresh(db_tool)
+    free_tool_index.index(db, db_tool)
     return db_tool
 
 @router.put("/free-tools/{tool_id}", response_model=FreeToolResponse)
@@ -623,6 +654,7 @@ async def update_free_tool(
     
     db.commit()
     db.refresh(db_tool)
+    free_tool_index.index(db, db_tool)
     return db_tool
 
 @router.delete("/free-tools/{tool_id}")
@@ -638,6 +670,7 @@ async def delete_free_tool(
     
     db.delete(db_tool)
     db.commit()
+    free_tool_index.unindex(db, tool_id)
     return {"message": "Free tool deleted successfully"}
 
 @router.get("/free-tools", response_model=List[FreeToolResponse])
@@ -668,6 +701,7 @@ async def bulk_upload_free_tools(
     # Parse CSV and create free tools
     reader = csv.DictReader(io.StringIO(csv_data))
     created_tools = []
+    created_objects = []
     errors = []
     
     for row_num, row in enumerate(reader, start=2):
@@ -691,12 +725,15 @@ async def bulk_upload_free_tools(
             db_tool = FreeTool(**tool_data)
             db.add(db_tool)
             created_tools.append(tool_data['name'])
+            created_objects.append(db_tool)
             
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
     
     if created_tools:
         db.commit()
+        for db_tool in created_objects:
+            free_tool_index.index(db, db_tool)
     
     return {
         "tools_created": len(created_tools),
@@ -5,6 +5,7 @@ from models import Blog, User
 from schemas import *
 from auth import get_current_verified_user
 from groq_service import groq_service
+from category_stats import blog_category_stats
 from typing import Optional, Dict, Any
 import uuid
 from datetime import datetime, timedelta
@@ -331,6 +332,7 @@ async def publish_draft(
         
         db.commit()
         db.refresh(draft)
+        blog_category_stats.invalidate(draft.category_id)
         
         return {
             "success": True,
@@ -0,0 +1,160 @@
+"""
+Shared async clients for the LLM providers
+
+AI generation uses the async SDK clients (AsyncGroq, AsyncOpenAI) so a
+multi-second completion awaits instead of blocking the event loop. SDK
+clients are cheap to create per API key; the HTTP connection pool under
+them is not, so there is one pool per SDK per process, shared by every key
+and request. Pools are opened on first use and reopened if they belong to
+another event loop; the app closes them on shutdown.
+
+Calls to each provider are limited to <PROVIDER>_MAX_CONCURRENCY at a time
+(per event loop, i.e. per worker). Further calls queue; one still queued
+after AI_QUEUE_TIMEOUT_SECONDS fails with ProviderBusyError.
+
+Settings:
+
+    GROQ_MAX_CONCURRENCY          concurrent Groq calls (default 8)
+    CLAUDE_MAX_CONCURRENCY        concurrent Claude calls (default 8)
+    AI_QUEUE_TIMEOUT_SECONDS      longest wait for a free slot (default 30)
+    AI_REQUEST_TIMEOUT_SECONDS    per-call timeout (default 60)
+"""
+
+import asyncio
+import os
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+import groq
+import httpx
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+CLAUDE_MAX_CONCURRENCY = int(os.getenv("CLAUDE_MAX_CONCURRENCY", "8"))
+AI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "30"))
+AI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "60"))
+
+# Providers without an entry are limited to this many concurrent calls
+DEFAULT_MAX_CONCURRENCY = 8
+
+class ProviderBusyError(Exception):
+    """No free slot for the provider within the queue timeout"""
+
+class AIClients:
+    """Pooled async SDK clients and per-provider concurrency limits"""
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        queue_timeout: float = AI_QUEUE_TIMEOUT_SECONDS,
+        request_timeout: float = AI_REQUEST_TIMEOUT_SECONDS,
+    ):
+        self.limits = limits
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pools: Dict[str, Any] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight = Counter()
+        self.waiting = Counter()
+        self.calls = Counter()
+        self.rejected = Counter()
+        self.pools_created = 0
+
+    def _bind(self):
+        # Pools and semaphores belong to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._pools = {}
+            self._semaphores = {}
+            self._loop = loop
+
+    def _pool(self, name: str, factory: Callable[[], Any]):
+        self._bind()
+        pool = self._pools.get(name)
+        if pool is None or pool.is_closed:
+            pool = self._pools[name] = factory()
+            self.pools_created += 1
+        return pool
+
+    def groq(self, api_key: str) -> groq.AsyncGroq:
+        return groq.AsyncGroq(
+            api_key=api_key,
+            timeout=self.request_timeout,
+            http_client=self._pool("groq", groq.DefaultAsyncHttpxClient),
+        )
+
+    def openai(self, api_key: str, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+        """OpenAI SDK client, e.g. for Groq's OpenAI-compatible API"""
+        return openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self.request_timeout,
+            http_client=self._pool("openai", openai.DefaultAsyncHttpxClient),
+        )
+
+    def http(self) -> httpx.AsyncClient:
+        """Plain HTTP client for providers called without an SDK"""
+        return self._pool("httpx", lambda: httpx.AsyncClient(timeout=self.request_timeout))
+
+    @asynccontextmanager
+    async def limit(self, provider: str):
+        """
+        Hold one of the provider's concurrency slots.
+
+        Raises:
+            ProviderBusyError: no slot freed up within queue_timeout
+        """
+        self._bind()
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = self._semaphores[provider] = asyncio.Semaphore(
+                self.limits.get(provider, DEFAULT_MAX_CONCURRENCY)
+            )
+
+        self.waiting[provider] += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected[provider] += 1
+            raise ProviderBusyError(f"{provider} is busy, please try again shortly")
+        finally:
+            self.waiting[provider] -= 1
+
+        self.in_flight[provider] += 1
+        self.calls[provider] += 1
+        try:
+            yield
+        finally:
+            self.in_flight[provider] -= 1
+            semaphore.release()
+
+    async def close(self):
+        if self._loop is asyncio.get_running_loop():
+            for pool in self._pools.values():
+                await pool.aclose()
+        self._pools = {}
+        self._semaphores = {}
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pools_open": sorted(name for name, pool in self._pools.items() if not pool.is_closed),
+            "pools_created": self.pools_created,
+            "providers": {
+                provider: {
+                    "limit": self.limits.get(provider, DEFAULT_MAX_CONCURRENCY),
+                    "in_flight": self.in_flight[provider],
+                    "waiting": self.waiting[provider],
+                    "calls": self.calls[provider],
+                    "rejected": self.rejected[provider],
+                }
+                for provider in sorted(set(self.limits) | set(self.calls))
+            },
+        }
+
+# Global AI clients
+ai_clients = AIClients({"groq": GROQ_MAX_CONCURRENCY, "claude": CLAUDE_MAX_CONCURRENCY})
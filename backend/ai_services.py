@@ -1,11 +1,10 @@
 import asyncio
 import json
-import httpx
-import openai
 import os
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import logging
+from ai_clients import ai_clients
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +14,6 @@ class GroqService:
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.base_url = "https://api.groq.com/openai/v1"
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url=self.base_url
-        )
     
     async def generate_content(
         self, 
@@ -39,15 +34,16 @@ class GroqService:
             
             system_prompt = system_prompts.get(content_type, system_prompts["blog"])
             
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=0.7
-            )
+            async with ai_clients.limit("groq"):
+                response = await ai_clients.openai(self.api_key, self.base_url).chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=0.7
+                )
             
             content = response.choices[0].message.content
             tokens_used = response.usage.total_tokens
@@ -89,8 +85,8 @@ class ClaudeService:
             
             system_prompt = system_prompts.get(content_type, system_prompts["blog"])
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            async with ai_clients.limit("claude"):
+                response = await ai_clients.http().post(
                     f"{self.base_url}/messages",
                     headers={
                         "Content-Type": "application/json",
@@ -1,14 +1,19 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status, Request, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from database import get_db
 from models import User
-from schemas import TokenData
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,8 +21,14 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with a different cost still verify and are upgraded on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 class CustomHTTPBearer(HTTPBearer):
     async def __call__(self, request: Request):
@@ -49,33 +60,156 @@ class CustomHTTPBearer(HTTPBearer):
 
 security = CustomHTTPBearer()
 
+class AuthUserCache:
+    """
+    Short-lived LRU of the user fields auth checks need, keyed by
+    (username, token issue time).
+
+    A hit returns a User attached to the request session without querying;
+    any other column is lazy loaded by primary key on first access.
+    Routes that change a user's role, status or identity call invalidate().
+    """
+
+    FIELDS = ("id", "username", "user_type", "is_active", "is_verified")
+
+    def __init__(self, ttl: float = AUTH_USER_CACHE_TTL_SECONDS, max_entries: int = AUTH_USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Any], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, db: Session, username: str, issued_at: Any) -> Optional[User]:
+        key = (username, issued_at)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            values = entry[1]
+
+        # Prefer the session's own copy, which may be fresher than the cache
+        existing = db.identity_map.get(identity_key(User, values["id"]))
+        if existing is not None:
+            return existing
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def put(self, username: str, issued_at: Any, user: User):
+        values = {field: getattr(user, field) for field in self.FIELDS}
+        with self._lock:
+            self._entries[(username, issued_at)] = (time.monotonic(), values)
+            self._entries.move_to_end((username, issued_at))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Drop every cached token of a user"""
+        with self._lock:
+            for key in [key for key, (_, values) in self._entries.items() if values["id"] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Global instance
+auth_user_cache = AuthUserCache()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so request handlers never block
+    the event loop (bcrypt releases the GIL while hashing).
+
+    At most `workers + max_queue` calls are admitted; beyond that callers get
+    503 instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(pwd_context.hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "peak_queue_depth": self.peak_queue_depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+# Global instance
+password_hasher = PasswordHasher()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+        if payload.get("sub") is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return username
+        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -83,10 +217,25 @@ def verify_token(token: str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    username = verify_token(token)
+def verify_token(token: str):
+    return decode_token(token)["sub"]
+
+def _load_user(db: Session, payload: dict) -> Optional[User]:
+    """User named by a decoded token, from the auth cache or the request session"""
+    username = payload["sub"]
+    issued_at = payload.get("iat")
+
+    user = auth_user_cache.get(db, username, issued_at)
+    if user is not None:
+        return user
+
     user = db.query(User).filter(User.username == username).first()
+    if user is not None:
+        auth_user_cache.put(username, issued_at, user)
+    return user
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    user = _load_user(db, decode_token(credentials.credentials))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -132,6 +281,19 @@ def authenticate_user(db: Session, email: str, password: str):
         return False
     return user
 
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """authenticate_user() with bcrypt on the hashing pool; rehashes at the configured cost"""
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        return False
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
+        return False
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    return user
+
 def check_tool_access(current_user: User, tool_id: str, db: Session):
     """Check if current user has access to a specific tool"""
     from models import Tool, ToolAccessRequest
@@ -170,20 +332,12 @@ def get_token_optional(authorization: str = Header(None)):
     except ValueError:
         return None
 
-def get_current_user_optional(token: str = Depends(get_token_optional)):
+def get_current_user_optional(token: str = Depends(get_token_optional), db: Session = Depends(get_db)):
+    """Current user for public routes, or None; shares the request's session"""
     if not token:
         return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        token_data = TokenData(username=username)
-    except JWTError:
-        return None
-    
-    db = next(get_db())
-    user = get_user(db, username=token_data.username)
-    if user is None:
+        payload = decode_token(token)
+    except HTTPException:
         return None
-    return user
\ No newline at end of file
+    return _load_user(db, payload)
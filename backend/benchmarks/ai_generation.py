@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Latency of unrelated endpoints while AI blog generation is running
+
+Runs the app in-process on one event loop, the way uvicorn serves it, with
+Groq replaced by a local fake that takes --llm-delay seconds per completion
+(tests/fake_upstream.py). Concurrent POST /api/ai-blog/generate-content
+requests run twice:
+
+- async:    the shipped AsyncGroq client on the shared pool
+- blocking: a shim that calls the synchronous Groq client inline on the
+            event loop, as groq_service did before
+
+Meanwhile probes hit "/" and /api/categories every few milliseconds. With
+the blocking client each generation stalls every other request for the
+whole completion; with the async one probe latency should stay flat.
+
+Usage:
+    cd backend && python benchmarks/ai_generation.py [--requests 20] [--concurrency 8] [--llm-delay 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="ai-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+import groq
+import httpx
+from auth import get_current_verified_user
+from models import User
+from groq_service import groq_service
+from ai_clients import ai_clients
+from view_counter import view_counter
+from search_history import search_history_writer
+from tests.fake_upstream import FakeUpstream
+from server import app
+
+BENCH_USER = User(
+    id=str(uuid.uuid4()), email="bench@example.com", username="bench",
+    full_name="Bench", hashed_password="x", is_active=True, is_verified=True
+)
+
+async def blocking_complete(**kwargs):
+    """The pre-async call: synchronous Groq client, run on the event loop"""
+    client = groq.Groq(api_key=groq_service.api_key, base_url=os.environ["GROQ_BASE_URL"])
+    return client.chat.completions.create(**kwargs)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+async def run(requests: int, concurrency: int):
+    latencies = []
+    probe_latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+        async def generate(i):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/ai-blog/generate-content", json={"prompt": f"CRM tools {i}", "content_type": "introduction"}
+                )
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+
+        async def probe():
+            paths = ["/", "/api/categories"]
+            i = 0
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get(paths[i % len(paths)])
+                probe_latencies.append(time.perf_counter() - started)
+                i += 1
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(generate(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "gen/s": requests / elapsed,
+        "gen p50 ms": percentile(latencies, 0.5),
+        "probes": len(probe_latencies),
+        "probe p50 ms": percentile(probe_latencies, 0.5),
+        "probe p95 ms": percentile(probe_latencies, 0.95),
+        "probe max ms": max(probe_latencies) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    view_counter.stop()
+    search_history_writer.stop()
+    upstream = FakeUpstream().start()
+    upstream.delay = args.llm_delay
+    os.environ["GROQ_BASE_URL"] = upstream.base_url
+    groq_service.api_key = "bench-key"
+    app.dependency_overrides[get_current_verified_user] = lambda: BENCH_USER
+    ai_clients.limits["groq"] = max(ai_clients.limits["groq"], args.concurrency)
+
+    async def compare():
+        results = {}
+        for name, complete in (("blocking", blocking_complete), ("async", None)):
+            if complete:
+                groq_service._complete = complete
+            else:
+                del groq_service._complete
+            await run(min(args.requests, 4), args.concurrency)  # warm up
+            results[name] = await run(args.requests, args.concurrency)
+        await ai_clients.close()
+        return results
+
+    try:
+        results = asyncio.run(compare())
+    finally:
+        upstream.stop()
+
+    columns = list(results["async"])
+    print(f"{'client':<10}" + "".join(f"{column:>15}" for column in columns))
+    for name, result in results.items():
+        print(f"{name:<10}" + "".join(f"{result[column]:>15.1f}" for column in columns))
+
+if __name__ == "__main__":
+    main()
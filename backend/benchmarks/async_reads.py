@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Async vs blocking database path for the hot read endpoints
+
+Seeds a throwaway SQLite database and drives tool search, tool detail, blog
+list and categories concurrently through the ASGI app on one event loop, the
+way uvicorn serves them. Each endpoint runs twice:
+
+- async:    the shipped AsyncSession path (aiosqlite here, asyncpg in production)
+- blocking: the same route code with a shim that runs the synchronous Session
+            inline on the event loop, as the routes did before
+
+A probe hits "/" every few milliseconds meanwhile; its latency shows how
+long the event loop is stalled by database work.
+
+Keep --concurrency below DB_POOL_SIZE + DB_MAX_OVERFLOW: past it the
+blocking path waits for a connection on the event loop itself and stalls
+until DB_POOL_TIMEOUT.
+
+Usage:
+    cd backend && python benchmarks/async_reads.py [--tools 5000] [--requests 400] [--concurrency 25]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="async-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+os.environ["TOOL_SEARCH_BACKEND"] = "database"
+
+import httpx
+from database import SessionLocal, get_async_db, get_async_read_db
+from models import Category, Tool, Blog, User
+from view_counter import view_counter
+from server import app
+
+class BlockingSession:
+    """AsyncSession look-alike that runs a sync Session without yielding"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, statement):
+        return self.session.execute(statement)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+async def blocking_db():
+    session = SessionLocal()
+    try:
+        yield BlockingSession(session)
+    finally:
+        session.close()
+
+def seed(tool_count: int):
+    db = SessionLocal()
+    try:
+        author = User(
+            id=str(uuid.uuid4()), email="bench@example.com", username="bench",
+            full_name="Bench", hashed_password="x", is_active=True, is_verified=True
+        )
+        categories = [Category(id=str(uuid.uuid4()), name=f"Category {i}") for i in range(10)]
+        db.add(author)
+        db.add_all(categories)
+        tools = []
+        for i in range(tool_count):
+            tools.append(Tool(
+                id=str(uuid.uuid4()), name=f"Tool {i}", slug=f"tool-{i}",
+                description=f"Tool {i} automates reporting, analytics and workflow number {i}",
+                short_description="Benchmark tool", category_id=categories[i % 10].id,
+                location=["Berlin", "London", "Austin", "Toronto"][i % 4],
+                pricing_model=["Free", "Freemium", "Paid"][i % 3], rating=i % 5, views=i
+            ))
+        db.add_all(tools)
+        db.add_all(
+            Blog(
+                id=str(uuid.uuid4()), title=f"Blog {i}", content="Benchmark content " * 50,
+                author_id=author.id, category_id=categories[i % 10].id,
+                status="published", slug=f"blog-{i}"
+            )
+            for i in range(200)
+        )
+        db.commit()
+        return [tool.id for tool in tools[:50]]
+    finally:
+        db.close()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+async def run(paths, requests: int, concurrency: int):
+    latencies = []
+    probe_latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+        async def call(path):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, (path, response.status_code)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(call(paths[i % len(paths)]) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "req/s": requests / elapsed,
+        "p50 ms": percentile(latencies, 0.5),
+        "p95 ms": percentile(latencies, 0.95),
+        "probes": len(probe_latencies),
+        "probe p95 ms": percentile(probe_latencies, 0.95),
+        "probe max ms": max(probe_latencies) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tools", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=25)
+    args = parser.parse_args()
+
+    view_counter.stop()
+    tool_ids = seed(args.tools)
+    paths = [
+        "/api/tools/search?location=lon&per_page=20",
+        "/api/tools/search?pricing_model=Paid&sort_by=rating&page=3",
+        f"/api/tools/{tool_ids[0]}",
+        "/api/blogs?limit=20",
+        "/api/categories",
+    ]
+
+    async def compare():
+        results = {}
+        for name, override in (("blocking", blocking_db), ("async", None)):
+            for dependency in (get_async_db, get_async_read_db):
+                if override:
+                    app.dependency_overrides[dependency] = override
+                else:
+                    app.dependency_overrides.pop(dependency, None)
+            await run(paths, min(args.requests, 50), args.concurrency)  # warm up
+            results[name] = await run(paths, args.requests, args.concurrency)
+        return results
+
+    results = asyncio.run(compare())
+    columns = list(results["async"])
+    print(f"{'path':<10}" + "".join(f"{column:>15}" for column in columns))
+    for name, result in results.items():
+        print(f"{name:<10}" + "".join(f"{result[column]:>15.1f}" for column in columns))
+
+if __name__ == "__main__":
+    main()
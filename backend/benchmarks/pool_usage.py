@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Connection pool usage under optional-auth load
+
+Runs the app in-process against a throwaway SQLite database (no dependency
+overrides, so every request goes through the real get_db) and hammers the
+routes that use optional authentication from several threads, sampling
+engine.pool.checkedout() while they run.
+
+Checkouts should stay at or below the number of concurrent requests and fall
+back to zero afterwards; a leaked session shows up as a climbing count.
+
+Usage:
+    cd backend && python benchmarks/pool_usage.py [--threads 8] [--requests 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="pool-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi.testclient import TestClient
+from database import engine, SessionLocal
+from models import User, Category, Tool
+from auth import get_password_hash
+from view_counter import view_counter
+from server import app
+
+def seed():
+    db = SessionLocal()
+    try:
+        user = User(
+            id=str(uuid.uuid4()), email="bench@example.com", username="bench",
+            full_name="Bench User", hashed_password=get_password_hash("benchpass"),
+            user_type="user", is_active=True, is_verified=True
+        )
+        category = Category(id=str(uuid.uuid4()), name="Bench", description="Bench")
+        tool = Tool(
+            id=str(uuid.uuid4()), name="Bench Tool", description="Bench tool",
+            short_description="Bench", category_id=category.id, slug="bench-tool"
+        )
+        db.add_all([user, category, tool])
+        db.commit()
+        return tool.id
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    view_counter.stop()
+    tool_id = seed()
+    client = TestClient(app)
+    token = client.post("/api/auth/login", json={"email": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    samples = []
+    running = threading.Event()
+    running.set()
+
+    def sample():
+        while running.is_set():
+            samples.append(engine.pool.checkedout())
+            time.sleep(0.001)
+
+    def hit(i):
+        # Alternate authenticated and anonymous requests
+        return client.get(f"/api/tools/{tool_id}/reviews", headers=headers if i % 2 else None).status_code
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        statuses = list(executor.map(hit, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    running.clear()
+    sampler.join()
+
+    print(f"requests:              {len(statuses)} ({statuses.count(200)} ok) in {elapsed:.2f}s")
+    print(f"throughput:            {len(statuses) / elapsed:.0f} req/s")
+    print(f"peak pool checkouts:   {max(samples)} (threads: {args.threads})")
+    print(f"checkouts afterwards:  {engine.pool.checkedout()}")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
-from database import get_db
-from models import Blog, Comment, User, Category, user_blog_likes, BlogReview
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, asc, select
+from database import get_db, get_async_db, get_async_read_db
+from models import Blog, Comment, User, user_blog_likes, BlogReview
 from schemas import *
 from auth import get_current_verified_user, get_current_user_optional
+from view_counter import view_counter
+from pagination import keyset_paginate
+from category_stats import blog_category_stats, category_names
+from review_ratings import apply_rating_delta
 from typing import Optional, List
 import uuid
 from datetime import datetime
 
 router = APIRouter(prefix="/api/blogs", tags=["blogs"])
 
+# Sort options of GET /api/blogs mapped to (column, descending) for keyset pagination
+BLOG_LIST_ORDERS = {
+    "views": (Blog.views, True),
+    "likes": (Blog.likes, True),
+    "oldest": (Blog.created_at, False),
+    "created_at": (Blog.created_at, True),
+}
+
 @router.get("", response_model=List[BlogResponse])
 async def get_blogs(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
     status: str = "published",
@@ -20,9 +34,25 @@ async def get_blogs(
     author_id: Optional[str] = None,
     search: Optional[str] = None,
     sort_by: str = "created_at",
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get blogs with filtering and sorting"""
+    """
+    Get blogs with filtering and sorting
+    
+    With `cursor` (empty for the first page), pages are fetched by keyset
+    instead of offset and the next page's cursor is sent in the
+    X-Next-Cursor header.
+    """
+    blogs, next_cursor = await db.run_sync(
+        _list_blogs, skip, limit, status, category_id, author_id, search, sort_by, cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return blogs
+
+def _list_blogs(db: Session, skip, limit, status, category_id, author_id, search, sort_by, cursor):
+    """(blogs, next cursor) for GET /api/blogs"""
     query = db.query(Blog)
     
     # If status is provided, filter by status, otherwise get all statuses
@@ -39,6 +69,14 @@ async def get_blogs(
             Blog.content.ilike(f"%{search}%")
         )
     
+    if cursor is not None:
+        column, descending = BLOG_LIST_ORDERS.get(sort_by, BLOG_LIST_ORDERS["created_at"])
+        blogs, next_cursor = keyset_paginate(
+            query, [(column, descending), (Blog.id, descending)], limit,
+            sort_by if sort_by in BLOG_LIST_ORDERS else "created_at", cursor
+        )
+        return blogs, next_cursor
+    
     # Sorting
     if sort_by == "views":
         query = query.order_by(desc(Blog.views))
@@ -50,31 +88,31 @@ async def get_blogs(
         query = query.order_by(desc(Blog.created_at))
     
     blogs = query.offset(skip).limit(limit).all()
-    return blogs
+    return blogs, None
 
 @router.get("/{blog_id}", response_model=BlogResponse)
-async def get_blog(blog_id: str, db: Session = Depends(get_db)):
+async def get_blog(blog_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get a specific blog by ID"""
-    blog = db.query(Blog).filter(Blog.id == blog_id).first()
+    result = await db.execute(select(Blog).where(Blog.id == blog_id))
+    blog = result.scalars().first()
     if not blog:
         raise HTTPException(status_code=404, detail="Blog not found")
     
-    # Increment view count
-    blog.views += 1
-    db.commit()
+    # Buffered; written on the next view counter flush
+    view_counter.record("blogs", blog.id)
     
     return blog
 
 @router.get("/slug/{slug}", response_model=BlogResponse)
-async def get_blog_by_slug(slug: str, db: Session = Depends(get_db)):
+async def get_blog_by_slug(slug: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get a blog by slug"""
-    blog = db.query(Blog).filter(Blog.slug == slug).first()
+    result = await db.execute(select(Blog).where(Blog.slug == slug))
+    blog = result.scalars().first()
     if not blog:
         raise HTTPException(status_code=404, detail="Blog not found")
     
-    # Increment view count
-    blog.views += 1
-    db.commit()
+    # Buffered; written on the next view counter flush
+    view_counter.record("blogs", blog.id)
     
     return blog
 
@@ -104,6 +142,7 @@ async def create_blog(
     db.add(db_blog)
     db.commit()
     db.refresh(db_blog)
+    blog_category_stats.invalidate(db_blog.category_id)
     return db_blog
 
 @router.put("/{blog_id}", response_model=BlogResponse)
@@ -133,11 +172,13 @@ async def update_blog(
     if update_data.get('status') == 'published' and db_blog.status != 'published':
         update_data['published_at'] = datetime.utcnow()
     
+    previous_category_id = db_blog.category_id
     for field, value in update_data.items():
         setattr(db_blog, field, value)
     
     db.commit()
     db.refresh(db_blog)
+    blog_category_stats.invalidate(previous_category_id, db_blog.category_id)
     return db_blog
 
 @router.delete("/{blog_id}")
@@ -155,8 +196,10 @@ async def delete_blog(
     if db_blog.author_id != current_user.id and current_user.user_type not in ["admin", "superadmin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    category_id = db_blog.category_id
     db.delete(db_blog)
     db.commit()
+    blog_category_stats.invalidate(category_id)
     return {"message": "Blog deleted successfully"}
 
 @router.post("/{blog_id}/like")
@@ -198,6 +241,7 @@ async def toggle_blog_like(
         action = "liked"
     
     db.commit()
+    blog_category_stats.invalidate(blog.category_id)
     
     return {
         "action": action,
@@ -268,12 +312,7 @@ async def create_blog_review(
     db.add(db_review)
     
     # Update blog rating statistics
-    reviews = db.query(BlogReview).filter(BlogReview.blog_id == blog_id).all()
-    total_reviews = len(reviews) + 1  # Include the new review
-    avg_rating = (sum(r.rating for r in reviews) + review.rating) / total_reviews
-    
-    blog.rating = avg_rating
-    blog.total_reviews = total_reviews
+    apply_rating_delta(db, blog, review.rating, 1)
     
     db.commit()
     db.refresh(db_review)
@@ -283,13 +322,28 @@ async def create_blog_review(
 @router.get("/{blog_id}/reviews", response_model=List[BlogReviewResponse])
 async def get_blog_reviews(
     blog_id: str,
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
-    """Get reviews for a blog with user's review status"""
-    reviews = db.query(BlogReview).filter(BlogReview.blog_id == blog_id).offset(skip).limit(limit).all()
+    """
+    Get reviews for a blog with user's review status
+    
+    With `cursor`, reviews are returned newest first and the next page's
+    cursor is sent in the X-Next-Cursor header.
+    """
+    query = db.query(BlogReview).filter(BlogReview.blog_id == blog_id)
+    if cursor is not None:
+        reviews, next_cursor = keyset_paginate(
+            query, [(BlogReview.created_at, True), (BlogReview.id, True)], limit, "newest", cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        reviews = query.offset(skip).limit(limit).all()
     
     # Add user's review status to each review
     for review in reviews:
@@ -358,6 +412,8 @@ async def update_blog_review(
     if db_review.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to edit this review")
     
+    rating_delta = review_update.rating - db_review.rating
+    
     # Update review
     db_review.rating = review_update.rating
     db_review.title = review_update.title
@@ -365,14 +421,10 @@ async def update_blog_review(
     db_review.pros = review_update.pros
     db_review.cons = review_update.cons
     
-    # Recalculate blog rating statistics
+    # Update blog rating statistics
     blog = db.query(Blog).filter(Blog.id == db_review.blog_id).first()
-    if blog:
-        reviews = db.query(BlogReview).filter(BlogReview.blog_id == db_review.blog_id).all()
-        if reviews:
-            avg_rating = sum(r.rating for r in reviews) / len(reviews)
-            blog.rating = avg_rating
-            blog.total_reviews = len(reviews)
+    if blog and rating_delta:
+        apply_rating_delta(db, blog, rating_delta, 0)
     
     db.commit()
     db.refresh(db_review)
@@ -397,17 +449,10 @@ async def delete_blog_review(
     blog_id = db_review.blog_id
     db.delete(db_review)
     
-    # Recalculate blog rating statistics
+    # Update blog rating statistics
     blog = db.query(Blog).filter(Blog.id == blog_id).first()
     if blog:
-        reviews = db.query(BlogReview).filter(BlogReview.blog_id == blog_id).all()
-        if reviews:
-            avg_rating = sum(r.rating for r in reviews) / len(reviews)
-            blog.rating = avg_rating
-            blog.total_reviews = len(reviews)
-        else:
-            blog.rating = 0.0
-            blog.total_reviews = 0
+        apply_rating_delta(db, blog, -db_review.rating, -1)
     
     db.commit()
     
@@ -563,48 +608,14 @@ async def get_blog_analytics(
     }
 
 @router.get("/categories/stats")
-async def get_blog_category_stats(db: Session = Depends(get_db)):
+async def get_blog_category_stats(
+    db: AsyncSession = Depends(get_async_read_db),
+    primary_db: AsyncSession = Depends(get_async_db)
+):
     """Get blog statistics by category"""
-    
-    categories = db.query(Category).all()
-    category_stats = []
-    
-    for category in categories:
-        blog_count = db.query(Blog).filter(
-            Blog.category_id == category.id,
-            Blog.status == "published"
-        ).count()
-        
-        if blog_count > 0:
-            total_views = db.query(Blog).filter(
-                Blog.category_id == category.id,
-                Blog.status == "published"
-            ).with_entities(func.sum(Blog.views)).scalar() or 0
-            
-            total_likes = db.query(Blog).filter(
-                Blog.category_id == category.id,
-                Blog.status == "published"
-            ).with_entities(func.sum(Blog.likes)).scalar() or 0
-            
-            avg_views = total_views / blog_count if blog_count > 0 else 0
-            avg_likes = total_likes / blog_count if blog_count > 0 else 0
-        else:
-            total_views = 0
-            total_likes = 0
-            avg_views = 0
-            avg_likes = 0
-        
-        category_stats.append({
-            "category_id": category.id,
-            "category_name": category.name,
-            "blog_count": blog_count,
-            "total_views": total_views,
-            "total_likes": total_likes,
-            "avg_views": avg_views,
-            "avg_likes": avg_likes
-        })
-    
-    return category_stats
+    # Names from the replica; stale entries are recomputed on the primary
+    categories = await db.run_sync(category_names)
+    return await primary_db.run_sync(blog_category_stats.get, categories)
 
 # Author performance routes
 @router.get("/authors/stats")
@@ -0,0 +1,161 @@
+"""
+Cached per-category statistics
+
+GET /api/tools/categories/analytics and GET /api/blogs/categories/stats used
+to run several queries per category. Both are now computed for any number of
+categories with one grouped aggregate (plus, for tools, one
+ROW_NUMBER() OVER (PARTITION BY category_id ...) query for the recommended
+tools) and cached per category.
+
+An entry stays cached until a write touches a tool or blog in its category
+(create/update/delete, reviews, likes, flushed views, trending recompute);
+only stale categories are recomputed. Category names are always read fresh,
+so renames and new or deleted categories need no invalidation.
+
+Endpoints may read the names on a read replica but must recompute on the
+primary: an entry computed from a replica that has not caught up with a
+write would stay cached until the next write to its category.
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, desc, select
+from sqlalchemy.orm import Session
+from models import Category, Tool, Blog
+from schemas import CategoryAnalytics
+
+RECOMMENDED_TOOLS_PER_CATEGORY = 5
+
+class CategoryStatsCache:
+    """Per-category results of a grouped computation, recomputed only when stale"""
+
+    def __init__(self, compute: Callable[[Session, Dict[str, str]], Dict[str, Dict[str, Any]]]):
+        self.compute = compute
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._stale = set()
+
+    def invalidate(self, *category_ids: Optional[str]):
+        """Mark categories stale"""
+        with self._lock:
+            self._stale.update(category_id for category_id in category_ids if category_id)
+
+    def clear(self):
+        """Drop every cached category"""
+        with self._lock:
+            self._entries.clear()
+            self._stale.clear()
+
+    def get(self, db: Session, categories: Optional[List[Tuple[str, str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Statistics for every category, in category order.
+
+        Args:
+            db: Session stale categories are recomputed on
+            categories: category_names() rows, if already read (e.g. on a
+                replica); read from `db` otherwise
+        """
+        if categories is None:
+            categories = category_names(db)
+
+        with self._lock:
+            missing = {
+                category_id: name for category_id, name in categories
+                if category_id not in self._entries or category_id in self._stale
+            }
+            # Invalidations that arrive while computing mark the entry stale again
+            self._stale.difference_update(missing)
+
+        if missing:
+            computed = self.compute(db, missing)
+            with self._lock:
+                self._entries.update(computed)
+
+        with self._lock:
+            return [
+                dict(self._entries[category_id], category_name=name)
+                for category_id, name in categories
+                if category_id in self._entries
+            ]
+
+def category_names(db: Session) -> List[Tuple[str, str]]:
+    """(id, name) of every category"""
+    return db.query(Category.id, Category.name).all()
+
+def _compute_tool_category_analytics(db: Session, categories: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    category_ids = list(categories)
+
+    totals = {
+        category_id: (tool_count, avg_rating, total_views)
+        for category_id, tool_count, avg_rating, total_views in db.query(
+            Tool.category_id,
+            func.count(Tool.id),
+            func.avg(Tool.rating),
+            func.sum(Tool.views)
+        ).filter(Tool.category_id.in_(category_ids)).group_by(Tool.category_id)
+    }
+
+    ranked = select(
+        Tool.id.label("tool_id"),
+        func.row_number().over(
+            partition_by=Tool.category_id,
+            order_by=(desc(Tool.rating), Tool.id)
+        ).label("position")
+    ).where(Tool.category_id.in_(category_ids)).subquery()
+
+    recommended = {category_id: [] for category_id in category_ids}
+    for tool in (
+        db.query(Tool)
+        .join(ranked, ranked.c.tool_id == Tool.id)
+        .filter(ranked.c.position <= RECOMMENDED_TOOLS_PER_CATEGORY)
+        .order_by(Tool.category_id, ranked.c.position)
+    ):
+        recommended[tool.category_id].append(tool)
+
+    entries = {}
+    for category_id, name in categories.items():
+        tool_count, avg_rating, total_views = totals.get(category_id, (0, 0, 0))
+        entries[category_id] = jsonable_encoder(CategoryAnalytics(
+            category_id=category_id,
+            category_name=name,
+            tool_count=tool_count,
+            avg_rating=float(avg_rating or 0),
+            total_views=int(total_views or 0),
+            recommended_tools=recommended[category_id]
+        ))
+    return entries
+
+def _compute_blog_category_stats(db: Session, categories: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    totals = {
+        category_id: (blog_count, total_views, total_likes)
+        for category_id, blog_count, total_views, total_likes in db.query(
+            Blog.category_id,
+            func.count(Blog.id),
+            func.sum(Blog.views),
+            func.sum(Blog.likes)
+        ).filter(
+            Blog.category_id.in_(list(categories)),
+            Blog.status == "published"
+        ).group_by(Blog.category_id)
+    }
+
+    entries = {}
+    for category_id, name in categories.items():
+        blog_count, total_views, total_likes = totals.get(category_id, (0, 0, 0))
+        total_views = total_views or 0
+        total_likes = total_likes or 0
+        entries[category_id] = {
+            "category_id": category_id,
+            "category_name": name,
+            "blog_count": blog_count,
+            "total_views": total_views,
+            "total_likes": total_likes,
+            "avg_views": total_views / blog_count if blog_count > 0 else 0,
+            "avg_likes": total_likes / blog_count if blog_count > 0 else 0
+        }
+    return entries
+
+# Global instances
+tool_category_analytics = CategoryStatsCache(_compute_tool_category_analytics)
+blog_category_stats = CategoryStatsCache(_compute_blog_category_stats)
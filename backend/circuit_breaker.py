@@ -0,0 +1,261 @@
+"""
+Circuit breaker, adaptive timeouts and hedged requests for upstream APIs
+
+An UpstreamGuard wraps every call to one upstream (e.g. the Google or Bing
+search API):
+
+- Circuit breaker: outcomes of the last `window` calls are kept. Once at
+  least `min_calls` are recorded and the share of failed or slow calls
+  (slower than `slow_call_seconds`) reaches `failure_rate`, the circuit
+  opens and calls fail at once with CircuitOpenError instead of waiting
+  for the upstream. After `open_seconds` it is half-open: up to
+  `half_open_probes` calls go through; a good one closes the circuit, a
+  bad one opens it again.
+- Adaptive timeout: once enough latencies are observed, calls time out
+  after `timeout_multiplier` x the p99 latency, kept between
+  `min_timeout` and `max_timeout` (`max_timeout` until then). Only
+  successful calls are observed, so when the circuit opens the latencies
+  are forgotten and half-open probes get `max_timeout`; an upstream that
+  settles at a higher latency is then relearned instead of timing out
+  for good.
+- Hedging (optional): a call still running after the p95 latency gets a
+  second, identical call; the first to succeed wins and the other is
+  cancelled. Only for idempotent calls.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Latency samples needed before timeouts and hedging adapt
+MIN_LATENCY_SAMPLES = 20
+
+class CircuitOpenError(Exception):
+    """The upstream's circuit is open; the call was not made"""
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of the recorded latencies, None if there are none"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(q / 100 * len(samples)) - 1))
+        return samples[index]
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window: int = 20,
+        slow_call_seconds: float = 3.0,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._probes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now; call record() or release() after it"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    return False
+                self._probes += 1
+            return True
+
+    def record(self, seconds: float, failed: bool = False):
+        """Outcome of an allowed call"""
+        bad = failed or seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if bad:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(bad)
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def release(self):
+        """An allowed call ended without an outcome (cancelled)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "times_opened": self.times_opened,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+            }
+
+class UpstreamGuard:
+    """Breaker, adaptive timeout and optional hedging around one upstream"""
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        max_timeout: float = 10.0,
+        min_timeout: float = 1.0,
+        timeout_multiplier: float = 2.0,
+        hedge: bool = False,
+    ):
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge = hedge
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.hedged = 0
+
+    def timeout(self) -> float:
+        """Current timeout: a multiple of the observed p99 latency"""
+        if self.latency.count() < MIN_LATENCY_SAMPLES:
+            return self.max_timeout
+        timeout = self.latency.percentile(99) * self.timeout_multiplier
+        return min(self.max_timeout, max(self.min_timeout, timeout))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a hedged call is sent, None if hedging is off"""
+        if not self.hedge or self.latency.count() < MIN_LATENCY_SAMPLES:
+            return None
+        return self.latency.percentile(95)
+
+    async def call(self, fetch: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fetch()` under the guard.
+
+        Raises:
+            CircuitOpenError: the circuit is open; `fetch` was not called
+            asyncio.TimeoutError: no response within timeout()
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.breaker.name} circuit is open")
+
+        self.calls += 1
+        # A probe must not inherit the timeout learned before the circuit opened
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._hedged(fetch), self.max_timeout if probe else self.timeout())
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+            self._record(time.monotonic() - started, failed=True)
+            raise
+
+        elapsed = time.monotonic() - started
+        self.latency.record(elapsed)
+        self._record(elapsed)
+        return result
+
+    def _record(self, seconds: float, failed: bool = False):
+        times_opened = self.breaker.times_opened
+        self.breaker.record(seconds, failed=failed)
+        if self.breaker.times_opened != times_opened:
+            self.latency.clear()
+
+    async def _hedged(self, fetch: Callable[[], Awaitable[T]]) -> T:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await fetch()
+
+        first = asyncio.ensure_future(fetch())
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        self.hedged += 1
+        second = asyncio.ensure_future(fetch())
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (first, second):
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        return {
+            **self.breaker.stats(),
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "hedged": self.hedged,
+            "timeout_seconds": round(self.timeout(), 3),
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
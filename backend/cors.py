@@ -0,0 +1,100 @@
+"""
+CORS origin matching
+
+One CORS layer: Starlette's CORSMiddleware, with origin checks done by an
+OriginMatcher instead of a list scan. Exact origins are a set lookup and
+the wildcard domains (*.emergentagent.com, *.github.dev) are one
+precompiled pattern. Decisions are kept in an LRU cache of
+CORS_ORIGIN_CACHE_SIZE origins (default 1024), so per-request cost is
+constant and memory stays bounded whatever origins clients send.
+
+Preflight requests are answered by the middleware without reaching the
+app.
+
+Settings:
+
+    CORS_ALLOW_ALL_ORIGINS    allow every origin, for development (default true)
+    CORS_ORIGINS              extra allowed origins, comma-separated
+    CORS_ORIGIN_CACHE_SIZE    cached origin decisions (default 1024)
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable
+from fastapi.middleware.cors import CORSMiddleware
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CORS_ALLOW_ALL_ORIGINS = os.getenv("CORS_ALLOW_ALL_ORIGINS", "true").lower() == "true"
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
+CORS_ORIGIN_CACHE_SIZE = int(os.getenv("CORS_ORIGIN_CACHE_SIZE", "1024"))
+
+# Any subdomain of these hosts, over HTTPS
+ORIGIN_PATTERNS = [
+    r"https://[a-z0-9.-]+\.emergentagent\.com",
+    r"https://[a-z0-9.-]+\.github\.dev",
+]
+
+class OriginMatcher:
+    """Allowed-origin check with a bounded cache of decisions"""
+
+    def __init__(
+        self,
+        origins: Iterable[str],
+        patterns: Iterable[str] = ORIGIN_PATTERNS,
+        allow_all: bool = False,
+        cache_size: int = CORS_ORIGIN_CACHE_SIZE,
+    ):
+        self.origins = frozenset(filter(None, origins))
+        patterns = list(patterns)
+        self.pattern = re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE) if patterns else None
+        self.allow_all = allow_all
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._decisions: "OrderedDict[str, bool]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def is_allowed(self, origin: str) -> bool:
+        if self.allow_all or origin in self.origins:
+            return True
+
+        with self._lock:
+            allowed = self._decisions.get(origin)
+            if allowed is not None:
+                self._decisions.move_to_end(origin)
+                self.hits += 1
+                return allowed
+
+        allowed = self.pattern is not None and self.pattern.fullmatch(origin) is not None
+        with self._lock:
+            self.misses += 1
+            self._decisions[origin] = allowed
+            while len(self._decisions) > self.cache_size:
+                self._decisions.popitem(last=False)
+        return allowed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "allow_all": self.allow_all,
+                "origins": sorted(self.origins),
+                "patterns": self.pattern.pattern if self.pattern is not None else None,
+                "cached": len(self._decisions),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+class MatchedOriginCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware that asks an OriginMatcher which origins are allowed"""
+
+    def __init__(self, app, matcher: OriginMatcher, **kwargs):
+        # No "*": allowed origins are echoed back, as credentials require
+        super().__init__(app, allow_origins=(), **kwargs)
+        self.matcher = matcher
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        return self.matcher.is_allowed(origin)
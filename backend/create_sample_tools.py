@@ -9,11 +9,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
-from models import Base, FreeTool
+from models import FreeTool
+from migrations import run_migrations
 import uuid
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or upgrade the database schema
+run_migrations(engine)
 
 def create_sample_tools():
     db = SessionLocal()
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 
 from database import engine
-from models import Base
+from migrations import run_migrations
 
 def create_tables():
     """Create all database tables"""
     try:
         print("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
         print("✅ Database tables created successfully!")
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
@@ -1,21 +1,64 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 import os
 from dotenv import load_dotenv
+from db_pool import create_pooled_engine, create_pooled_async_engine
+from db_routing import DATABASE_READ_URLS, ReplicaSet, RoutingSession, StickyReads, client_key
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+engine = create_pooled_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Non-blocking path for hot read endpoints (asyncpg / aiosqlite)
+async_engine = create_pooled_async_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replicas (DATABASE_READ_URLS); see db_routing
+read_replicas = ReplicaSet(DATABASE_READ_URLS)
+sticky_reads = StickyReads()
+AsyncReadSessionLocal = async_sessionmaker(
+    async_engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
+def create_migration_engine():
+    """Unpooled engine for schema migrations, which may outlast DB_STATEMENT_TIMEOUT_MS"""
+    return create_pooled_engine(DATABASE_URL, statement_timeout_ms=0, poolclass=NullPool)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    """AsyncSession for read-only endpoints; reads from a replica when one is configured"""
+    replica = None
+    if read_replicas and not sticky_reads.is_sticky(client_key(request)):
+        replica = read_replicas.choose()
+
+    if replica is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    async with AsyncReadSessionLocal(info={"replica": replica.sync_engine}) as db:
+        try:
+            yield db
+        except DBAPIError as e:
+            if e.connection_invalidated:
+                read_replicas.mark_unhealthy(replica)
+            raise
@@ -0,0 +1,251 @@
+"""
+Configured and instrumented connection pool
+
+Pool settings come from the environment:
+
+    DB_POOL_SIZE              persistent connections (default 10)
+    DB_MAX_OVERFLOW           extra connections under load (default 20)
+    DB_POOL_TIMEOUT           seconds to wait for a connection (default 30)
+    DB_POOL_RECYCLE           seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING          test connections on checkout (default true)
+    DB_STATEMENT_TIMEOUT_MS   per-statement limit, 0 disables (default 15000)
+
+The statement timeout is PostgreSQL's `statement_timeout`. On SQLite, a
+progress handler interrupts statements that run past the same limit (sync
+engine only; aiosqlite runs statements on its own thread).
+
+create_pooled_async_engine() builds the AsyncEngine for the same database,
+using asyncpg for PostgreSQL and aiosqlite for SQLite.
+
+The instrumented pools record checkout wait times, overflow, timeouts,
+connects and invalidations; pool_stats(engine) reports them.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+# Async driver for each backend
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+class PoolMetrics:
+    """Counters and recent checkout wait times of one pool"""
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.peak_overflow = 0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float, overflow: int):
+        with self._lock:
+            self.checkouts += 1
+            self._waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "peak_overflow": self.peak_overflow,
+                "wait_ms": {
+                    "avg": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+                    "p95": round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else 0.0,
+                    "max": round(self.max_wait * 1000, 3),
+                },
+            }
+
+class _InstrumentedPool:
+    """Pool mixin that times every checkout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            logger.warning(f"Connection pool exhausted: {self.status()}")
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started, max(self.overflow(), 0))
+        return connection
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+def _install_sqlite_statement_timeout(engine: Engine, timeout_ms: int):
+    """Interrupt SQLite statements that run longer than timeout_ms"""
+    limit = timeout_ms / 1000
+
+    @event.listens_for(engine, "connect")
+    def set_progress_handler(dbapi_connection, connection_record):
+        info = connection_record.info
+
+        def check_deadline():
+            deadline = info.get("statement_deadline")
+            return 1 if deadline is not None and time.monotonic() > deadline else 0
+
+        dbapi_connection.set_progress_handler(check_deadline, 1000)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_deadline(conn, cursor, statement, parameters, context, executemany):
+        conn.info["statement_deadline"] = time.monotonic() + limit
+
+    @event.listens_for(engine, "checkin")
+    def clear_deadline(dbapi_connection, connection_record):
+        connection_record.info.pop("statement_deadline", None)
+
+def _uses_queue_pool(parsed) -> bool:
+    # In-memory SQLite keeps its single-connection pool
+    return parsed.get_backend_name() != "sqlite" or parsed.database not in (None, "", ":memory:")
+
+def _apply_overrides(options: Dict[str, Any], overrides: Dict[str, Any]):
+    # Sizing only applies to the queue pools
+    if "poolclass" in overrides:
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            options.pop(key, None)
+    options.update(overrides)
+
+def _instrument(engine: Engine):
+    metrics = getattr(engine.pool, "metrics", None)
+    if metrics is not None:
+        event.listen(engine, "connect", lambda dbapi_connection, connection_record: metrics.record_connect())
+        event.listen(engine, "invalidate", lambda dbapi_connection, connection_record, exception: metrics.record_invalidation())
+        event.listen(engine, "soft_invalidate", lambda dbapi_connection, connection_record, exception: metrics.record_invalidation())
+
+def create_pooled_engine(url: str, statement_timeout_ms: Optional[int] = None, **overrides) -> Engine:
+    """
+    create_engine() with the configured pool, metrics and statement timeout.
+
+    Args:
+        url: Database URL
+        statement_timeout_ms: Overrides DB_STATEMENT_TIMEOUT_MS
+        **overrides: Extra or overriding create_engine() arguments
+    """
+    parsed = make_url(url)
+    timeout_ms = DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    options: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+
+    if _uses_queue_pool(parsed):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    if parsed.get_backend_name() == "postgresql" and timeout_ms > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+
+    _apply_overrides(options, overrides)
+    engine = create_engine(url, **options)
+    _instrument(engine)
+
+    if parsed.get_backend_name() == "sqlite" and timeout_ms > 0:
+        _install_sqlite_statement_timeout(engine, timeout_ms)
+
+    return engine
+
+def async_database_url(url: str) -> str:
+    """`url` with the backend's async driver, e.g. postgresql+asyncpg://"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+def create_pooled_async_engine(url: str, statement_timeout_ms: Optional[int] = None, **overrides) -> AsyncEngine:
+    """create_pooled_engine() for the async driver of the same database"""
+    parsed = make_url(async_database_url(url))
+    timeout_ms = DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    options: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+
+    if _uses_queue_pool(parsed):
+        options.update(
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    if parsed.get_backend_name() == "postgresql" and timeout_ms > 0:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+
+    _apply_overrides(options, overrides)
+    engine = create_async_engine(parsed, **options)
+    _instrument(engine.sync_engine)
+    return engine
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Current pool state plus the instrumented counters of an Engine or AsyncEngine"""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.stats())
+    return stats
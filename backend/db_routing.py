@@ -0,0 +1,180 @@
+"""
+Read replica routing
+
+With DATABASE_READ_URLS set (comma-separated), read-only endpoints get a
+session from get_async_read_db(). It is a RoutingSession that sends
+SELECTs to a replica and INSERT/UPDATE/DELETE and flushes to the primary.
+Once a session has written, every later statement in it uses the primary.
+
+Replicas are picked round-robin among the healthy ones. A replica is
+marked unhealthy when a request on it loses its connection. A background
+task started with the app probes every replica each
+DB_REPLICA_HEALTH_INTERVAL_SECONDS (default 10); requests never wait on a
+probe. With no healthy replica, reads go to the primary.
+
+Read-your-writes: after a client's successful write request, its reads go
+to the primary for DB_READ_STICKY_SECONDS (default 5) so it never sees a
+replica that has not caught up. Clients are identified by their token's
+user, or by IP address when anonymous. Stickiness is kept per process.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+from db_pool import create_pooled_async_engine, pool_stats
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+DB_READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+DB_REPLICA_HEALTH_INTERVAL_SECONDS = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL_SECONDS", "10"))
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return False
+
+class RoutingSession(Session):
+    """Session that reads from `info["replica"]` and writes to its own bind"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self.info.get("wrote"):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        return replica
+
+class ReplicaSet:
+    """Round-robin over healthy read replicas"""
+
+    def __init__(self, urls: List[str], health_interval: float = DB_REPLICA_HEALTH_INTERVAL_SECONDS, **engine_options):
+        self.engines: List[AsyncEngine] = [create_pooled_async_engine(url, **engine_options) for url in urls]
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._healthy = [True] * len(self.engines)
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """The next healthy replica, or None if there is none"""
+        if not self.engines:
+            return None
+        with self._lock:
+            for _ in range(len(self.engines)):
+                position = self._next
+                self._next = (self._next + 1) % len(self.engines)
+                if self._healthy[position]:
+                    return self.engines[position]
+        return None
+
+    def mark_unhealthy(self, engine: AsyncEngine):
+        with self._lock:
+            position = self.engines.index(engine)
+            if self._healthy[position]:
+                logger.warning(f"Read replica {engine.url!r} marked unhealthy")
+            self._healthy[position] = False
+
+    async def check_health(self, timeout: float = 2.0):
+        """Probe every replica with SELECT 1"""
+        async def probe(engine: AsyncEngine) -> bool:
+            try:
+                async with engine.connect() as connection:
+                    await asyncio.wait_for(connection.execute(text("SELECT 1")), timeout)
+                return True
+            except Exception as e:
+                logger.warning(f"Read replica {engine.url!r} health check failed: {e}")
+                return False
+
+        results = await asyncio.gather(*(probe(engine) for engine in self.engines))
+        with self._lock:
+            self._healthy = list(results)
+
+    async def _check_health_periodically(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"Read replica health check error: {e}")
+
+    def start_health_checks(self):
+        """Probe the replicas every health_interval from a task on the running event loop"""
+        if self.engines and self._health_task is None:
+            self._health_task = asyncio.get_running_loop().create_task(self._check_health_periodically())
+
+    async def stop_health_checks(self):
+        task, self._health_task = self._health_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            healthy = list(self._healthy)
+        return [
+            {"url": repr(engine.url), "healthy": healthy[position], "pool": pool_stats(engine)}
+            for position, engine in enumerate(self.engines)
+        ]
+
+class StickyReads:
+    """Clients that wrote recently and must read from the primary"""
+
+    def __init__(self, window: float = DB_READ_STICKY_SECONDS, max_entries: int = 10000):
+        self.window = window
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+
+    def mark(self, key: str):
+        with self._lock:
+            self._until[key] = time.monotonic() + self.window
+            self._until.move_to_end(key)
+            while len(self._until) > self.max_entries:
+                self._until.popitem(last=False)
+
+    def is_sticky(self, key: str) -> bool:
+        with self._lock:
+            until = self._until.get(key)
+            if until is None:
+                return False
+            if time.monotonic() >= until:
+                del self._until[key]
+                return False
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._until.clear()
+
+def client_key(request: Request) -> str:
+    """The authenticated user's name, or the client's IP address"""
+    from auth import decode_token
+
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return "user:" + decode_token(token)["sub"]
+        except Exception:
+            pass
+    return "ip:" + (request.client.host if request.client else "unknown")
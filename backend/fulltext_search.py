@@ -0,0 +1,167 @@
+"""
+Full-text search for tools
+
+Replaces the ILIKE '%q%' scan in /api/tools/search with an indexed,
+relevance-ranked search. Field weights: name > short_description >
+features > description.
+
+- PostgreSQL: a generated `search_vector` tsvector column with a GIN index,
+  matched with websearch_to_tsquery and ranked with ts_rank.
+- SQLite: an external-content FTS5 table (`tools_fts`) kept in sync by
+  triggers, ranked with bm25().
+
+The DDL runs whenever the tools table is created (including test databases)
+and for existing databases in migration 3 (migrations.py).
+Other databases fall back to the ILIKE filter.
+"""
+
+import logging
+import re
+from typing import Optional, Tuple
+from sqlalchemy import event, text, literal_column, func, desc, asc, false, String, Float
+from sqlalchemy.orm import Session, Query
+from models import Tool
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEARCH_CONFIG = "english"
+
+# Relative field weights for SQLite bm25(); PostgreSQL uses setweight A-D
+FTS5_WEIGHTS = (10.0, 5.0, 2.0, 1.0)  # name, short_description, features, description
+
+POSTGRES_DDL = [
+    f"""
+    ALTER TABLE tools ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(short_description, '')), 'B') ||
+        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(features, '')), 'C') ||
+        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_tools_search_vector ON tools USING GIN (search_vector)",
+]
+
+SQLITE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE tools_fts USING fts5(
+        name, short_description, features, description,
+        content='tools', content_rowid='rowid', tokenize='porter unicode61'
+    )
+"""
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS tools_fts_ai AFTER INSERT ON tools BEGIN
+        INSERT INTO tools_fts(rowid, name, short_description, features, description)
+        VALUES (new.rowid, new.name, new.short_description, new.features, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tools_fts_ad AFTER DELETE ON tools BEGIN
+        INSERT INTO tools_fts(tools_fts, rowid, name, short_description, features, description)
+        VALUES ('delete', old.rowid, old.name, old.short_description, old.features, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tools_fts_au AFTER UPDATE OF name, short_description, features, description ON tools BEGIN
+        INSERT INTO tools_fts(tools_fts, rowid, name, short_description, features, description)
+        VALUES ('delete', old.rowid, old.name, old.short_description, old.features, old.description);
+        INSERT INTO tools_fts(rowid, name, short_description, features, description)
+        VALUES (new.rowid, new.name, new.short_description, new.features, new.description);
+    END
+    """,
+]
+
+_sqlite_fts5_supported = None
+
+def _sqlite_has_fts5(connection) -> bool:
+    global _sqlite_fts5_supported
+    if _sqlite_fts5_supported is None:
+        options = [row[0] for row in connection.execute(text("PRAGMA compile_options"))]
+        _sqlite_fts5_supported = "ENABLE_FTS5" in options
+    return _sqlite_fts5_supported
+
+def install_search_index(connection):
+    """Create the full-text index objects for the connection's dialect (idempotent)"""
+    dialect_name = connection.dialect.name
+
+    if dialect_name == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.execute(text(statement))
+    elif dialect_name == "sqlite":
+        if not _sqlite_has_fts5(connection):
+            logger.warning("SQLite FTS5 not available; tool search falls back to LIKE")
+            return
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tools_fts'")
+        ).first()
+        if not exists:
+            connection.execute(text(SQLITE_FTS_TABLE))
+            # Index rows that existed before the FTS table
+            connection.execute(text("INSERT INTO tools_fts(tools_fts) VALUES ('rebuild')"))
+        for statement in SQLITE_TRIGGERS:
+            connection.execute(text(statement))
+
+def drop_search_index(connection):
+    """Drop objects that do not go away with the tools table"""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS tools_fts"))
+
+@event.listens_for(Tool.__table__, "after_create")
+def _tools_after_create(target, connection, **kw):
+    install_search_index(connection)
+
+@event.listens_for(Tool.__table__, "before_drop")
+def _tools_before_drop(target, connection, **kw):
+    drop_search_index(connection)
+
+def fulltext_backend(db: Session) -> Optional[str]:
+    """Return "postgresql", "sqlite" or None if full-text search is unavailable"""
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        return "postgresql"
+    # Detected on first use: already-migrated databases never run install_search_index
+    if dialect_name == "sqlite" and _sqlite_has_fts5(db.connection()):
+        return "sqlite"
+    return None
+
+def _fts5_match_expression(q: str) -> str:
+    """Turn free text into a safe FTS5 query: every term must match (as a prefix)"""
+    terms = re.findall(r"\w+", q, flags=re.UNICODE)
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+def apply_fulltext_search(query: Query, db: Session, q: str) -> Optional[Tuple[Query, object]]:
+    """
+    Filter a Tool query by a full-text match on `q`.
+
+    Args:
+        query: Query over Tool
+        db: Database session
+        q: Raw search text
+
+    Returns:
+        (filtered query, relevance ordering clause), or None when the database
+        has no full-text support and the caller should fall back to ILIKE
+    """
+    backend = fulltext_backend(db)
+
+    if backend == "postgresql":
+        search_vector = literal_column("tools.search_vector")
+        ts_query = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, q)
+        rank = func.ts_rank(search_vector, ts_query)
+        return query.filter(search_vector.op("@@")(ts_query)), desc(rank)
+
+    if backend == "sqlite":
+        match = _fts5_match_expression(q)
+        if not match:
+            return query.filter(false()), asc(Tool.id)
+        weights = ", ".join(str(weight) for weight in FTS5_WEIGHTS)
+        hits = text(
+            f"SELECT tools.id AS tool_id, bm25(tools_fts, {weights}) AS score "
+            "FROM tools_fts JOIN tools ON tools.rowid = tools_fts.rowid "
+            "WHERE tools_fts MATCH :fts_query"
+        ).bindparams(fts_query=match).columns(tool_id=String, score=Float).subquery("fts_hits")
+        # bm25() is lower-is-better
+        return query.join(hits, hits.c.tool_id == Tool.id), asc(hits.c.score)
+
+    return None
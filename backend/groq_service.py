@@ -1,8 +1,8 @@
 import os
 import asyncio
 from typing import Optional, Dict, Any
-from groq import Groq
 import logging
+from ai_clients import ai_clients
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +11,15 @@ class GroqAIService:
         self.api_key = os.getenv('ADMIN_GROQ_API_KEY')
         if not self.api_key:
             logger.warning("Groq API key not found in environment variables")
-            self.client = None
-        else:
-            self.client = Groq(api_key=self.api_key)
     
     def is_available(self) -> bool:
         """Check if Groq service is available"""
-        return self.client is not None and self.api_key is not None
+        return self.api_key is not None
+    
+    async def _complete(self, **kwargs):
+        """Chat completion on the shared async client, within Groq's concurrency limit"""
+        async with ai_clients.limit("groq"):
+            return await ai_clients.groq(self.api_key).chat.completions.create(**kwargs)
     
     async def generate_blog_content(
         self, 
@@ -54,7 +56,7 @@ class GroqAIService:
             )
             
             # Make API call to Groq
-            response = self.client.chat.completions.create(
+            response = await self._complete(
                 model="llama3-8b-8192",  # Using Llama 3 8B model
                 messages=[
                     {"role": "system", "content": system_message},
@@ -221,7 +223,7 @@ Return only the titles, one per line, without numbering or bullets."""
             if category:
                 user_message += f" (Category: {category})"
             
-            response = self.client.chat.completions.create(
+            response = await self._complete(
                 model="llama3-8b-8192",
                 messages=[
                     {"role": "system", "content": system_message},
@@ -271,7 +273,7 @@ Guidelines:
 - Ensure the content flows naturally
 - Keep the same general length unless expanding"""
             
-            response = self.client.chat.completions.create(
+            response = await self._complete(
                 model="llama3-8b-8192",
                 messages=[
                     {"role": "system", "content": system_message},
@@ -0,0 +1,82 @@
+"""
+Shared outbound HTTP client
+
+One long-lived aiohttp.ClientSession per process instead of a new session
+(and new DNS lookup, TCP and TLS handshake) per call. Its connector keeps
+connections alive and caps them per host.
+
+The app opens the session on startup and closes it on shutdown; session()
+also opens it on first use, and reopens it if it belongs to another event
+loop (e.g. a test client that runs each request on its own loop).
+
+Settings:
+
+    HTTP_MAX_CONNECTIONS             total pooled connections (default 100)
+    HTTP_MAX_CONNECTIONS_PER_HOST    connections per host (default 20)
+    HTTP_KEEPALIVE_SECONDS           idle keep-alive (default 30)
+    HTTP_DNS_CACHE_SECONDS           DNS cache TTL (default 300)
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, Optional
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+HTTP_DNS_CACHE_SECONDS = int(os.getenv("HTTP_DNS_CACHE_SECONDS", "300"))
+
+class SharedHTTPClient:
+    """Lazily created, connection-pooled aiohttp session"""
+
+    def __init__(
+        self,
+        limit: int = HTTP_MAX_CONNECTIONS,
+        limit_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout: float = HTTP_KEEPALIVE_SECONDS,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sessions_created = 0
+
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=HTTP_DNS_CACHE_SECONDS,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+            self.sessions_created += 1
+        return self._session
+
+    async def start(self):
+        self.session()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": self._session is not None and not self._session.closed,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "sessions_created": self.sessions_created,
+        }
+
+# Global shared client
+http_client = SharedHTTPClient()
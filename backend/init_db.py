@@ -4,13 +4,13 @@ Database initialization script for MarketMindAI
 """
 
 from database import engine
-from models import Base
+from migrations import run_migrations
 
 def init_database():
     """Initialize database tables"""
     try:
         print("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
         print("✅ Database tables created successfully!")
         return True
     except Exception as e:
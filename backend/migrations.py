@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Schema migrations
+
+Replaces the create_all() and ad-hoc ensure_* calls that ran at import.
+Each migration has a version number and runs once per database, in its own
+transaction; applied versions are recorded in `schema_migrations`. Every
+migration is idempotent so databases created before this table existed
+(which have some of the changes already) migrate cleanly.
+
+Workers booting together may all run the migrations. On PostgreSQL they
+take turns behind an advisory lock; elsewhere each migration re-checks
+its version inside its transaction and a lost race for the version row
+is ignored.
+
+Migrations can outlast a request, so the server runs them on
+create_migration_engine(), without DB_STATEMENT_TIMEOUT_MS. On PostgreSQL
+each migration's DDL waits at most DB_MIGRATION_LOCK_TIMEOUT_MS (default
+10000, 0 disables) for table locks instead of queueing every query behind
+it, and index-only migrations build with CREATE INDEX CONCURRENTLY outside
+a transaction so writes continue meanwhile.
+
+To change the schema, append a migration to MIGRATIONS; never edit or
+reorder one that has shipped. New indexes are declared on the model
+(`__table_args__`) so fresh databases get them from the initial schema,
+and created by name in a migration for existing ones.
+
+Usage:
+    cd backend && python migrations.py
+"""
+
+import logging
+import os
+from typing import Callable, List, Set, Tuple
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Dialect, Engine
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.sql import func
+from models import Base, SearchResultBlob
+from fulltext_search import install_search_index
+from review_ratings import RATED_MODELS, reconcile_review_ratings
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key shared by every migrating process
+MIGRATION_LOCK_KEY = 7316205
+
+DB_MIGRATION_LOCK_TIMEOUT_MS = int(os.getenv("DB_MIGRATION_LOCK_TIMEOUT_MS", "10000"))
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now())
+)
+
+def _initial_schema(connection: Connection):
+    # Only creates missing tables, so existing databases are left as they are
+    Base.metadata.create_all(bind=connection)
+
+def _rating_sum_columns(connection: Connection):
+    inspector = inspect(connection)
+    added = False
+    for model in RATED_MODELS:
+        columns = {column["name"] for column in inspector.get_columns(model.__tablename__)}
+        if "rating_sum" not in columns:
+            connection.execute(text(f"ALTER TABLE {model.__tablename__} ADD COLUMN rating_sum INTEGER DEFAULT 0"))
+            added = True
+
+    if added:
+        with Session(bind=connection) as db:
+            repaired = reconcile_review_ratings(db)
+        logger.info(f"Backfilled review rating sums: {repaired}")
+
+def concurrent_index_ddl(index: Index, dialect: Dialect) -> str:
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS for a model's index (PostgreSQL)"""
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    return ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+
+def _create_index_concurrently(connection: Connection, index: Index):
+    # A failed concurrent build leaves an invalid index that IF NOT EXISTS would keep
+    invalid = connection.execute(text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    ), {"name": index.name}).first()
+    if invalid:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY {connection.dialect.identifier_preparer.quote(index.name)}"))
+    connection.execute(text(concurrent_index_ddl(index, connection.dialect)))
+
+def _create_indexes(*names: str, concurrently: bool = False) -> Callable[[Connection], None]:
+    """
+    Migration creating model indexes by name.
+
+    With `concurrently`, the migration runs outside a transaction on
+    PostgreSQL and builds the indexes without blocking writes.
+    """
+    indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+
+    def migrate(connection: Connection):
+        for name in names:
+            if concurrently and connection.dialect.name == "postgresql":
+                _create_index_concurrently(connection, indexes[name])
+            else:
+                indexes[name].create(connection, checkfirst=True)
+
+    migrate.concurrently = concurrently
+    return migrate
+
+def _search_result_blobs(connection: Connection):
+    SearchResultBlob.__table__.create(connection, checkfirst=True)
+    columns = {column["name"] for column in inspect(connection).get_columns("search_history")}
+    if "results_blob_id" not in columns:
+        connection.execute(text(
+            "ALTER TABLE search_history ADD COLUMN results_blob_id VARCHAR REFERENCES search_result_blobs(id)"
+        ))
+    _create_indexes("ix_search_history_results_blob_id")(connection)
+
+# (version, description, migration); append only
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Initial schema", _initial_schema),
+    (2, "Review rating sums", _rating_sum_columns),
+    (3, "Tool full-text search index", install_search_index),
+    (4, "Indexes for tool, blog, review, comment and search history queries", _create_indexes(
+        "ix_tools_category_rating",
+        "ix_tools_category_trending_score",
+        "ix_tools_subcategory_id",
+        "ix_tools_assigned_admin_id",
+        "ix_tools_trending_score",
+        "ix_tools_rating",
+        "ix_tools_views",
+        "ix_tools_created_at",
+        "ix_tools_is_hot_trending_score",
+        "ix_tools_is_featured_trending_score",
+        "ix_blogs_status_created_at",
+        "ix_blogs_author_status",
+        "ix_blogs_category_status",
+        "ix_reviews_tool_created_at",
+        "ix_blog_reviews_blog_created_at",
+        "ix_comments_blog_created_at",
+        "ix_search_history_tool_created_at",
+        "ix_search_history_created_at",
+        concurrently=True,
+    )),
+    (5, "Deduplicated, compressed search results", _search_result_blobs),
+]
+
+def applied_versions(engine: Engine) -> Set[int]:
+    """Versions already applied to the database"""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_migrations.name):
+            return set()
+        return set(connection.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version)).scalars())
+
+def _lock(connection: Connection):
+    """Wait for other migrating processes; released when the transaction ends (PostgreSQL only)"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        # After the advisory lock, so waiting for another worker's migration is not cut short
+        connection.execute(text(f"SET LOCAL lock_timeout = {DB_MIGRATION_LOCK_TIMEOUT_MS}"))
+
+def _is_applied(connection: Connection, version: int) -> bool:
+    return connection.execute(
+        select(schema_migrations.c.version).where(schema_migrations.c.version == version)
+    ).first() is not None
+
+def _run_outside_transaction(engine: Engine, version: int, description: str, migrate: Callable[[Connection], None]) -> bool:
+    """Apply a migration in autocommit mode under the session-level advisory lock (PostgreSQL)"""
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT")
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            if _is_applied(connection, version):
+                return False
+            migrate(connection)
+            connection.execute(schema_migrations.insert().values(version=version, description=description))
+            return True
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def run_migrations(engine: Engine) -> List[int]:
+    """
+    Apply pending migrations in order.
+
+    A failing migration is rolled back and raised; later ones are not run.
+
+    Returns:
+        Versions applied by this call
+    """
+    try:
+        with engine.begin() as connection:
+            _lock(connection)
+            schema_migrations.create(connection, checkfirst=True)
+    except DBAPIError:
+        # Created by another process between the check and the CREATE
+        with engine.connect() as connection:
+            if not inspect(connection).has_table(schema_migrations.name):
+                raise
+    applied = applied_versions(engine)
+
+    newly_applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        if getattr(migrate, "concurrently", False) and engine.dialect.name == "postgresql":
+            if _run_outside_transaction(engine, version, description, migrate):
+                logger.info(f"Applied migration {version}: {description}")
+                newly_applied.append(version)
+            continue
+        try:
+            with engine.begin() as connection:
+                _lock(connection)
+                # Another process may have applied it since applied_versions()
+                if _is_applied(connection, version):
+                    continue
+                migrate(connection)
+                connection.execute(schema_migrations.insert().values(version=version, description=description))
+        except IntegrityError:
+            # Another process recorded the version first; its transaction applied the migration
+            if version not in applied_versions(engine):
+                raise
+            continue
+        logger.info(f"Applied migration {version}: {description}")
+        newly_applied.append(version)
+    return newly_applied
+
+if __name__ == "__main__":
+    from database import create_migration_engine
+
+    engine = create_migration_engine()
+    versions = run_migrations(engine)
+    engine.dispose()
+    if versions:
+        print(f"✅ Applied migrations: {', '.join(map(str, versions))}")
+    else:
+        print("✅ Database schema is up to date")
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Float, Table, JSON, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Float, Table, JSON, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -101,6 +101,7 @@ class Tool(Base):
     video_url = Column(String, nullable=True)
     rating = Column(Float, default=0.0)
     total_reviews = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0)  # sum of review ratings, kept in step with total_reviews
     views = Column(Integer, default=0)
     trending_score = Column(Float, default=0.0)
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
@@ -137,6 +138,20 @@ class Tool(Base):
     compared_by_users = relationship("User", secondary=user_tool_comparison, back_populates="compared_tools")
     seo_optimizations = relationship("SEOOptimization", back_populates="tool")
     assigned_admin = relationship("User", foreign_keys=[assigned_admin_id], backref="assigned_tools")
+    
+    # Indexes for the listing, filter and sort queries (created by migrations.py on existing databases)
+    __table_args__ = (
+        Index("ix_tools_category_rating", "category_id", "rating"),
+        Index("ix_tools_category_trending_score", "category_id", "trending_score"),
+        Index("ix_tools_subcategory_id", "subcategory_id"),
+        Index("ix_tools_assigned_admin_id", "assigned_admin_id"),
+        Index("ix_tools_trending_score", "trending_score", "id"),
+        Index("ix_tools_rating", "rating", "id"),
+        Index("ix_tools_views", "views", "id"),
+        Index("ix_tools_created_at", "created_at", "id"),
+        Index("ix_tools_is_hot_trending_score", "is_hot", "trending_score"),
+        Index("ix_tools_is_featured_trending_score", "is_featured", "trending_score"),
+    )
 
 class Blog(Base):
     __tablename__ = "blogs"
@@ -154,6 +169,7 @@ class Blog(Base):
     likes = Column(Integer, default=0)
     rating = Column(Float, default=0.0)
     total_reviews = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0)  # sum of review ratings, kept in step with total_reviews
     reading_time = Column(Integer, default=0)  # in minutes
     published_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -175,6 +191,12 @@ class Blog(Base):
     comments = relationship("Comment", back_populates="blog")
     reviews = relationship("BlogReview", back_populates="blog")
     liked_by_users = relationship("User", secondary=user_blog_likes, back_populates="liked_blogs")
+    
+    __table_args__ = (
+        Index("ix_blogs_status_created_at", "status", "created_at", "id"),
+        Index("ix_blogs_author_status", "author_id", "status"),
+        Index("ix_blogs_category_status", "category_id", "status"),
+    )
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -193,7 +215,10 @@ class Review(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Ensure one review per user per tool
-    __table_args__ = (UniqueConstraint('user_id', 'tool_id', name='unique_user_tool_review'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'tool_id', name='unique_user_tool_review'),
+        Index("ix_reviews_tool_created_at", "tool_id", "created_at", "id"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="reviews")
@@ -216,7 +241,10 @@ class BlogReview(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Ensure one review per user per blog
-    __table_args__ = (UniqueConstraint('user_id', 'blog_id', name='unique_user_blog_review'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'blog_id', name='unique_user_blog_review'),
+        Index("ix_blog_reviews_blog_created_at", "blog_id", "created_at", "id"),
+    )
     
     # Relationships
     user = relationship("User", backref="blog_reviews")
@@ -238,6 +266,8 @@ class Comment(Base):
     user = relationship("User", back_populates="comments")
     blog = relationship("Blog", back_populates="comments")
     parent = relationship("Comment", remote_side=[id])
+    
+    __table_args__ = (Index("ix_comments_blog_created_at", "blog_id", "created_at"),)
 
 class AIGeneratedContent(Base):
     __tablename__ = "ai_generated_content"
@@ -319,7 +349,8 @@ class SearchHistory(Base):
     search_engine = Column(String, nullable=False)  # google, bing
     query = Column(String, nullable=False)
     results_count = Column(Integer, default=0)
-    results = Column(Text, nullable=True)  # JSON string
+    results = Column(Text, nullable=True)  # JSON string (rows written before results_blob_id)
+    results_blob_id = Column(String, ForeignKey("search_result_blobs.id"), nullable=True)
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -327,6 +358,21 @@ class SearchHistory(Base):
     # Relationships
     tool = relationship("FreeTool", back_populates="search_history")
     user = relationship("User", backref="search_history")
+    
+    __table_args__ = (
+        Index("ix_search_history_tool_created_at", "tool_id", "created_at"),
+        Index("ix_search_history_created_at", "created_at"),
+        Index("ix_search_history_results_blob_id", "results_blob_id"),
+    )
+
+# Search results stored once and shared by every SearchHistory row that got them
+class SearchResultBlob(Base):
+    __tablename__ = "search_result_blobs"
+    
+    id = Column(String, primary_key=True)  # SHA-256 of the results JSON
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON list of results
+    results_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class ToolComparison(Base):
     __tablename__ = "tool_comparison"
@@ -0,0 +1,257 @@
+"""
+Keyset (cursor) pagination
+
+Listings opt in by passing a `cursor` query parameter (empty for the first
+page). Instead of OFFSET, the next page is found by seeking past the last row
+of the previous one:
+
+    WHERE (sort_key, id) < (:last_sort_key, :last_id)
+    ORDER BY sort_key DESC, id DESC
+    LIMIT :limit + 1
+
+The extra row tells whether there is a next page without counting.
+Cursors are opaque url-safe tokens holding the last row's sort values and
+the sort they belong to; a cursor from a different sort is rejected.
+
+Orders that are not columns (relevance rank) fall back to an offset carried
+in the cursor.
+
+SQLite keeps datetimes as text and compares them as strings, but the text
+differs by origin: "2024-01-01 10:00:00" from a func.now() server default,
+"2024-01-01 10:00:00.000000" when bound from Python. On SQLite, datetime
+sort keys are ordered and compared as strftime('%Y-%m-%d %H:%M:%f') on
+both sides so the seek matches the order.
+
+Totals are controlled by `count_mode`:
+
+- exact: COUNT(*) over the filtered query
+- estimate: the PostgreSQL planner's row estimate; elsewhere an exact count
+  cached per query for COUNT_CACHE_TTL_SECONDS (default 60)
+- none: no total; has_next comes from fetching one extra row
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, func, literal, or_, tuple_
+from sqlalchemy.orm import Query
+
+logger = logging.getLogger(__name__)
+
+def encode_cursor(sort: str, values: Optional[List[Any]] = None, offset: Optional[int] = None) -> str:
+    """Build an opaque cursor from sort key values or an offset"""
+    payload: Dict[str, Any] = {"s": sort}
+    if values is not None:
+        payload["k"] = [
+            {"d": value.isoformat()} if isinstance(value, datetime) else value
+            for value in values
+        ]
+    else:
+        payload["o"] = offset or 0
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str, sort: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Returns:
+        {"values": [...]} or {"offset": n}; an empty dict for the first page
+
+    Raises:
+        HTTPException 400 if the cursor is malformed or from another sort
+    """
+    if not token:
+        return {}
+
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if payload.get("s") != sort:
+            raise ValueError("sort mismatch")
+        if "k" in payload:
+            return {"values": [
+                datetime.fromisoformat(value["d"]) if isinstance(value, dict) else value
+                for value in payload["k"]
+            ]}
+        return {"offset": max(int(payload["o"]), 0)}
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+def _comparable_order(order: List[Tuple[Any, bool]], dialect_name: str) -> List[Tuple[Any, bool]]:
+    """The order with SQLite datetime columns normalized to one text format"""
+    if dialect_name != "sqlite":
+        return order
+    return [
+        (func.strftime(SQLITE_DATETIME_FORMAT, column), descending) if isinstance(column.type, DateTime)
+        else (column, descending)
+        for column, descending in order
+    ]
+
+def _comparable_values(order: List[Tuple[Any, bool]], values: List[Any], dialect_name: str) -> List[Any]:
+    if dialect_name != "sqlite":
+        return values
+    return [
+        func.strftime(SQLITE_DATETIME_FORMAT, literal(value, column.type)) if isinstance(column.type, DateTime)
+        else value
+        for (column, _), value in zip(order, values)
+    ]
+
+def _seek_condition(order: List[Tuple[Any, bool]], values: List[Any]):
+    if len(set(descending for _, descending in order)) == 1:
+        columns = tuple_(*[column for column, _ in order])
+        return columns < tuple_(*values) if order[0][1] else columns > tuple_(*values)
+
+    # Mixed directions: (a > x) OR (a = x AND b < y) ...
+    clauses = []
+    for position, (column, descending) in enumerate(order):
+        equal = [order[i][0] == values[i] for i in range(position)]
+        past = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*equal, past))
+    return or_(*clauses)
+
+def keyset_paginate(
+    query: Query,
+    order: List[Tuple[Any, bool]],
+    limit: int,
+    sort: str,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page of `query` by seeking past the cursor.
+
+    Args:
+        query: Unordered query over a mapped class
+        order: (column, descending) pairs; the last must be a unique column
+        limit: Page size
+        sort: Name of the sort, stored in the cursor
+        cursor: Cursor from the previous page ("" or None for the first)
+
+    Returns:
+        (rows, cursor for the next page or None on the last page)
+    """
+    decoded = decode_cursor(cursor, sort)
+    values = decoded.get("values")
+    dialect_name = query.session.get_bind().dialect.name
+    comparable = _comparable_order(order, dialect_name)
+    if values is not None:
+        if len(values) != len(order):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(_seek_condition(comparable, _comparable_values(order, values, dialect_name)))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in comparable])
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, [getattr(last, column.key) for column, _ in order])
+
+    return rows, next_cursor
+
+def offset_paginate(
+    query: Query,
+    limit: int,
+    sort: str,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """Cursor pagination for an already ordered query whose order is not a column"""
+    offset = decode_cursor(cursor, sort).get("offset", 0)
+    rows = query.offset(offset).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, offset=offset + limit)
+
+    return rows, next_cursor
+
+class CountCache:
+    """Short-lived exact counts keyed by the compiled query and its parameters"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1024):
+        self.ttl = ttl if ttl is not None else float(os.getenv("COUNT_CACHE_TTL_SECONDS", "60"))
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[float, int]] = {}
+
+    def get_or_count(self, query: Query) -> int:
+        compiled = query.statement.compile()
+        key = (str(compiled), repr(sorted(compiled.params.items())))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                return entry[1]
+
+        total = query.count()
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (now, total)
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        return total
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Global instance
+count_cache = CountCache()
+
+def explain_statement(query: Query, dialect) -> Tuple[str, Union[tuple, dict]]:
+    """
+    EXPLAIN (FORMAT JSON) for the query, as driver SQL and parameters.
+
+    IN lists are expanded inline, and parameters are ordered as the
+    driver's placeholders need them (positional `$1` for asyncpg, named for
+    psycopg2).
+    """
+    compiled = query.statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if dialect.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return "EXPLAIN (FORMAT JSON) " + str(compiled), params
+
+def _planner_estimate(query: Query) -> Optional[int]:
+    """Row estimate from PostgreSQL's EXPLAIN, or None if unavailable"""
+    connection = query.session.connection()
+    try:
+        statement, params = explain_statement(query, connection.dialect)
+        # Savepoint so a failed EXPLAIN does not abort the request's transaction
+        with connection.begin_nested():
+            plan = connection.exec_driver_sql(statement, params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"Planner row estimate failed: {e}")
+        return None
+
+def count_rows(query: Query, count_mode: str) -> Optional[int]:
+    """
+    Total rows of an unordered query according to `count_mode`.
+
+    Returns:
+        The exact or estimated total, or None for count_mode "none"
+    """
+    if count_mode == "exact":
+        return query.count()
+    if count_mode == "estimate":
+        if query.session.get_bind().dialect.name == "postgresql":
+            estimate = _planner_estimate(query)
+            if estimate is not None:
+                return estimate
+        return count_cache.get_or_count(query)
+    return None
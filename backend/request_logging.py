@@ -0,0 +1,213 @@
+"""
+Non-blocking, sampled request logging
+
+configure_logging() puts a QueueHandler on the root logger. Records are
+queued and a QueueListener thread writes them to the log file and the
+console, so request handling never waits on disk. When the queue is full
+records are dropped and counted instead of blocking.
+
+Each request produces at most one structured record on the "request"
+logger. Requests that fail (status >= 400 or an exception) or are slow
+are always logged; successful ones are sampled.
+
+Settings:
+
+    LOG_LEVEL                  root log level (default INFO)
+    LOG_FILE                   log file (default /tmp/logs/backend.log)
+    LOG_FORMAT                 "text" or "json" lines (default text)
+    LOG_QUEUE_SIZE             queued records before dropping (default 10000)
+    REQUEST_LOG_SAMPLE_RATE    share of successful requests logged (default 0.1)
+    REQUEST_LOG_SLOW_MS        always log requests slower than this (default 1000)
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Mapping, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "/tmp/logs/backend.log")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.1"))
+REQUEST_LOG_SLOW_MS = float(os.getenv("REQUEST_LOG_SLOW_MS", "1000"))
+
+# Header values that never reach the logs
+REDACTED_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie", "x-api-key"}
+
+request_logger = logging.getLogger("request")
+
+class StructuredFormatter(logging.Formatter):
+    """Renders a record's `fields` extra as JSON after the message, or the whole record as JSON"""
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        if not self.json_lines:
+            line = super().format(record)
+            return f"{line} {json.dumps(fields, default=str)}" if fields else line
+
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the arguments into the message and render the traceback to
+        exc_text, leaving both for the listener's formatter. The stock
+        prepare() formats the whole record into the message, so tracebacks
+        ended up in "message" instead of "exception".
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # Do not keep the traceback's frames alive while queued
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class RequestLogPolicy:
+    """Decides whether and at which level a finished request is logged"""
+
+    def __init__(self, sample_rate: float = REQUEST_LOG_SAMPLE_RATE, slow_ms: float = REQUEST_LOG_SLOW_MS):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    def level_for(self, status_code: int, duration_ms: float) -> Optional[int]:
+        """Log level for the request, or None to skip it"""
+        if status_code >= 500:
+            return logging.ERROR
+        if status_code >= 400 or duration_ms >= self.slow_ms:
+            return logging.WARNING
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            return logging.INFO
+        return None
+
+request_log_policy = RequestLogPolicy()
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+def redact_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    """Headers with credentials replaced; keeps the auth scheme"""
+    redacted = {}
+    for name, value in headers.items():
+        if name.lower() in REDACTED_HEADERS:
+            scheme, _, credentials = value.partition(" ")
+            value = f"{scheme} [REDACTED]" if credentials and name.lower().endswith("authorization") else "[REDACTED]"
+        redacted[name] = value
+    return redacted
+
+def log_request(
+    method: str,
+    path: str,
+    status_code: int,
+    duration_ms: float,
+    request_id: str,
+    headers: Mapping[str, str],
+    client: Optional[str] = None,
+    exc_info=None,
+):
+    """Log one finished request if the policy selects it"""
+    level = logging.ERROR if exc_info else request_log_policy.level_for(status_code, duration_ms)
+    if level is None or not request_logger.isEnabledFor(level):
+        return
+
+    fields: Dict[str, Any] = {
+        "request_id": request_id,
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(duration_ms, 2),
+        "client": client,
+        "origin": headers.get("origin"),
+    }
+    if level > logging.INFO:
+        fields["headers"] = redact_headers(headers)
+    request_logger.log(
+        level, f"{method} {path} {status_code} {duration_ms:.1f}ms",
+        extra={"fields": fields}, exc_info=exc_info
+    )
+
+def configure_logging():
+    """Route all logging through a queue to the file and console handlers (idempotent)"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    formatter = StructuredFormatter(json_lines=LOG_FORMAT == "json")
+    handlers = [logging.StreamHandler()]
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        handlers.insert(0, logging.FileHandler(LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(_queue_handler)
+
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue depth and dropped records"""
+    if _queue_handler is None:
+        return {"running": False}
+    return {
+        "running": True,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "sample_rate": request_log_policy.sample_rate,
+        "slow_ms": request_log_policy.slow_ms,
+    }
@@ -0,0 +1,107 @@
+"""
+Incremental review rating aggregates
+
+Tools and blogs keep `rating_sum` and `total_reviews` next to `rating`.
+Review writes apply a delta in one statement instead of reloading and
+re-averaging every review:
+
+    UPDATE tools
+    SET rating_sum = rating_sum + :sum_delta,
+        total_reviews = total_reviews + :count_delta,
+        rating = (rating_sum + :sum_delta) / (total_reviews + :count_delta)
+    WHERE id = :id
+    RETURNING rating, total_reviews
+
+so concurrent writes cannot lose each other's updates and each write is O(1).
+reconcile_review_ratings() recomputes the columns from the review tables and
+repairs any drift; the scheduler runs it every REVIEW_RECONCILE_INTERVAL_SECONDS
+(default 3600) and migration 2 uses it to backfill databases that predate
+`rating_sum`.
+"""
+
+import logging
+import os
+from typing import Dict, Tuple
+from sqlalchemy import case, cast, func, select, or_, Float
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from models import Tool, Blog, Review, BlogReview
+
+logger = logging.getLogger(__name__)
+
+REVIEW_RECONCILE_INTERVAL_SECONDS = int(os.getenv("REVIEW_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+# Rated model -> (review model, foreign key column on the review)
+RATED_MODELS = {
+    Tool: (Review, Review.tool_id),
+    Blog: (BlogReview, BlogReview.blog_id),
+}
+
+def apply_rating_delta(db: Session, target, sum_delta: int, count_delta: int) -> Tuple[float, int]:
+    """
+    Atomically adjust a tool's or blog's rating aggregates.
+
+    Args:
+        db: Database session (the caller commits)
+        target: Tool or Blog instance
+        sum_delta: Change in the sum of review ratings
+        count_delta: Change in the number of reviews (-1, 0 or 1)
+
+    Returns:
+        (new rating, new total_reviews); also set on `target` without
+        marking it dirty
+    """
+    table = type(target).__table__
+    new_sum = func.coalesce(table.c.rating_sum, 0) + sum_delta
+    new_count = func.coalesce(table.c.total_reviews, 0) + count_delta
+
+    stmt = (
+        table.update()
+        .where(table.c.id == target.id)
+        .values(
+            rating_sum=new_sum,
+            total_reviews=new_count,
+            rating=case((new_count > 0, cast(new_sum, Float) / new_count), else_=0.0)
+        )
+        .returning(table.c.rating, table.c.total_reviews, table.c.rating_sum)
+    )
+    rating, total_reviews, rating_sum = db.execute(stmt).one()
+
+    set_committed_value(target, "rating", rating)
+    set_committed_value(target, "total_reviews", total_reviews)
+    set_committed_value(target, "rating_sum", rating_sum)
+    return rating, total_reviews
+
+def reconcile_review_ratings(db: Session) -> Dict[str, int]:
+    """
+    Recompute rating_sum, total_reviews and rating from the review tables.
+
+    Only rows whose stored aggregates differ are written.
+
+    Returns:
+        Number of repaired rows per table
+    """
+    repaired = {}
+    for model, (review_model, foreign_key) in RATED_MODELS.items():
+        table = model.__table__
+        actual_sum = func.coalesce(
+            select(func.sum(review_model.rating)).where(foreign_key == table.c.id).scalar_subquery(), 0
+        )
+        actual_count = select(func.count()).where(foreign_key == table.c.id).scalar_subquery()
+
+        result = db.execute(
+            table.update()
+            .where(or_(
+                func.coalesce(table.c.rating_sum, -1) != actual_sum,
+                func.coalesce(table.c.total_reviews, -1) != actual_count
+            ))
+            .values(
+                rating_sum=actual_sum,
+                total_reviews=actual_count,
+                rating=case((actual_count > 0, cast(actual_sum, Float) / actual_count), else_=0.0)
+            )
+        )
+        repaired[table.name] = result.rowcount
+
+    db.commit()
+    return repaired
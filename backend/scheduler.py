@@ -7,7 +7,8 @@ import threading
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from database import get_db
-from trending_calculator import update_trending_scores
+from trending_calculator import update_trending_scores, after_trending_recompute
+from review_ratings import reconcile_review_ratings, REVIEW_RECONCILE_INTERVAL_SECONDS
 import time
 
 class TrendingUpdater:
@@ -15,6 +16,7 @@ class TrendingUpdater:
         self.running = False
         self.thread = None
         self.interval = 300  # 5 minutes
+        self.last_rating_reconcile = None
         
     def start(self):
         """Start the trending updater background task"""
@@ -35,11 +37,7 @@ class TrendingUpdater:
         """Run the scheduler loop"""
         while self.running:
             try:
-                # Update trending scores
-                db = next(get_db())
-                result = update_trending_scores(db)
-                print(f"✅ Updated trending scores for {result['updated_tools']} tools at {datetime.utcnow()}")
-                db.close()
+                self.run_cycle()
                 
                 # Sleep for the interval
                 time.sleep(self.interval)
@@ -48,11 +46,35 @@ class TrendingUpdater:
                 print(f"❌ Error updating trending scores: {e}")
                 time.sleep(60)  # Wait 1 minute before retrying
     
+    def run_cycle(self):
+        """One scheduled update"""
+        db = next(get_db())
+        try:
+            # Repair drift in the incremental review rating aggregates
+            if (self.last_rating_reconcile is None or
+                    time.time() - self.last_rating_reconcile >= REVIEW_RECONCILE_INTERVAL_SECONDS):
+                repaired = reconcile_review_ratings(db)
+                self.last_rating_reconcile = time.time()
+                if any(repaired.values()):
+                    print(f"🔧 Repaired review rating aggregates: {repaired}")
+            
+            # Update trending scores (also reconciles the running
+            # aggregates used for per-view rescoring)
+            result = update_trending_scores(db)
+            print(f"✅ Updated trending scores for {result['updated_tools']} tools at {datetime.utcnow()}")
+            
+            # Full search index rebuild: picks up rows written by other
+            # processes along with the new scores
+            after_trending_recompute(db, rebuild_search_indexes=True)
+        finally:
+            db.close()
+    
     def update_now(self):
         """Manually trigger an update"""
         try:
             db = next(get_db())
             result = update_trending_scores(db)
+            after_trending_recompute(db)
             db.close()
             return result
         except Exception as e:
@@ -255,12 +255,14 @@ class AdvancedSearchRequest(BaseModel):
 
 class PaginatedToolsResponse(BaseModel):
     tools: List[ToolResponse]
-    total: int
+    total: Optional[int]  # None when not counted (cursor pagination)
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int]
     has_next: bool
     has_prev: bool
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+    next_cursor: Optional[str] = None
 
 # Analytics Schemas
 class ToolAnalytics(BaseModel):
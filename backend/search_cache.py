@@ -0,0 +1,216 @@
+"""
+Free-tool web search result cache
+
+SearchService looks up Google/Bing results here before calling the
+upstream API. Entries are keyed by (engine, normalized query,
+num_results) and expire after SEARCH_CACHE_TTL_SECONDS (default 300).
+
+Concurrent requests for the same key share one upstream call
+(single-flight); the others wait for its result. Failed calls are not
+cached.
+
+Backends (SEARCH_CACHE_BACKEND):
+
+- memory (default): per-process LRU of SEARCH_CACHE_SIZE entries (default 1024)
+- redis: shared by every worker, at REDIS_URL; needs the `redis` package.
+  Redis evicts by TTL and its own maxmemory policy.
+
+Coalescing is per process with either backend.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from schemas import SearchResponse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "memory").lower()
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+class _SearchCancelled(Exception):
+    """The coalesced search was cancelled by the caller running it"""
+
+class MemorySearchCacheBackend:
+    """In-process TTL + LRU store"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> Optional[int]:
+        with self._lock:
+            return len(self._entries)
+
+class RedisSearchCacheBackend:
+    """Redis (or any server speaking its protocol) shared across workers"""
+
+    name = "redis"
+
+    def __init__(self, url: str = REDIS_URL, client=None, prefix: str = "search-cache:"):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+class SearchResultCache:
+    """Cached, coalesced search results on a pluggable backend"""
+
+    def __init__(self, backend, ttl: int = SEARCH_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.backend_errors = 0
+
+    @staticmethod
+    def key(engine: str, query: str, num_results: int) -> str:
+        normalized = " ".join(query.lower().split())
+        return json.dumps([engine, normalized, num_results])
+
+    async def get_or_search(
+        self,
+        engine: str,
+        query: str,
+        num_results: int,
+        search: Callable[[], Awaitable[SearchResponse]],
+    ) -> SearchResponse:
+        """
+        Cached result for the search, or the result of `search()`.
+
+        Every caller gets its own SearchResponse instance.
+        """
+        key = self.key(engine, query, num_results)
+
+        cached = await self._backend_get(key)
+        if cached is not None:
+            self.hits += 1
+            return SearchResponse(**json.loads(cached))
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            self.coalesced += 1
+            try:
+                return SearchResponse(**json.loads(await asyncio.shield(inflight)))
+            except _SearchCancelled:
+                # The caller doing the search gave up; search again
+                return await self.get_or_search(engine, query, num_results, search)
+
+        self.misses += 1
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await search()
+            value = json.dumps(result.dict())
+            await self._backend_set(key, value)
+            future.set_result(value)
+            return SearchResponse(**json.loads(value))
+        except asyncio.CancelledError:
+            future.set_exception(_SearchCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            self.errors += 1
+            future.set_exception(e)
+            # Retrieved here so an error nobody waited for is not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    # An unavailable backend makes every lookup a miss instead of failing searches
+    async def _backend_get(self, key: str) -> Optional[str]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+
+    async def _backend_set(self, key: str, value: str):
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning(f"Search cache write failed: {e}")
+
+    async def clear(self):
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "backend_errors": self.backend_errors,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+def _create_backend():
+    if SEARCH_CACHE_BACKEND == "redis":
+        return RedisSearchCacheBackend(REDIS_URL)
+    return MemorySearchCacheBackend(SEARCH_CACHE_SIZE)
+
+# Global search result cache
+search_cache = SearchResultCache(_create_backend())
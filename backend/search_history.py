@@ -0,0 +1,303 @@
+"""
+Batched, compact search history
+
+Free-tool searches record their history here instead of inserting a
+SearchHistory row (and bumping FreeTool.searches_count) in the request's
+transaction. Entries are buffered per process and written by a background
+thread in multi-row INSERTs:
+
+- every SEARCH_HISTORY_FLUSH_INTERVAL_SECONDS (default 5)
+- early, once SEARCH_HISTORY_BATCH_SIZE entries are pending (default 500)
+- on shutdown
+
+If the database is unavailable the buffer keeps at most 10 batches; older
+entries are dropped and counted.
+
+Result lists are not stored per row. Each distinct list is written once to
+search_result_blobs as zlib-compressed JSON, keyed by its SHA-256, and rows
+reference it; repeated searches with the same results share one blob.
+
+Retention: every SEARCH_HISTORY_COMPACT_INTERVAL_SECONDS (default 3600)
+rows older than SEARCH_HISTORY_RETENTION_DAYS (default 90, 0 keeps
+everything) are deleted, then blobs no row references.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, exists, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import FreeTool, SearchHistory, SearchResultBlob
+
+SEARCH_HISTORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("SEARCH_HISTORY_FLUSH_INTERVAL_SECONDS", "5"))
+SEARCH_HISTORY_BATCH_SIZE = int(os.getenv("SEARCH_HISTORY_BATCH_SIZE", "500"))
+SEARCH_HISTORY_RETENTION_DAYS = int(os.getenv("SEARCH_HISTORY_RETENTION_DAYS", "90"))
+SEARCH_HISTORY_COMPACT_INTERVAL_SECONDS = float(os.getenv("SEARCH_HISTORY_COMPACT_INTERVAL_SECONDS", "3600"))
+
+# Long user agents are cut to this many characters
+USER_AGENT_MAX_LENGTH = 256
+
+def encode_results(results: List[Dict[str, Any]]) -> Tuple[str, bytes]:
+    """(blob id, compressed data) for a result list"""
+    payload = json.dumps(results, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(payload).hexdigest(), zlib.compress(payload)
+
+def decode_results(data: bytes) -> List[Dict[str, Any]]:
+    return json.loads(zlib.decompress(data))
+
+def load_results(db: Session, history: SearchHistory) -> List[Dict[str, Any]]:
+    """Stored results of a search history row"""
+    if history.results_blob_id:
+        data = db.query(SearchResultBlob.data).filter(SearchResultBlob.id == history.results_blob_id).scalar()
+        return decode_results(data) if data is not None else []
+    return json.loads(history.results) if history.results else []
+
+def _insert_ignoring_duplicates(db: Session, table, rows: List[Dict[str, Any]]):
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        db.execute(postgresql.insert(table).values(rows).on_conflict_do_nothing())
+    elif dialect_name == "sqlite":
+        db.execute(sqlite.insert(table).values(rows).on_conflict_do_nothing())
+    else:
+        existing = set(db.scalars(select(table.c.id).where(table.c.id.in_([row["id"] for row in rows]))))
+        missing = [row for row in rows if row["id"] not in existing]
+        if missing:
+            db.execute(table.insert().values(missing))
+
+class SearchHistoryWriter:
+    def __init__(
+        self,
+        interval: float = SEARCH_HISTORY_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = SEARCH_HISTORY_BATCH_SIZE,
+        retention_days: int = SEARCH_HISTORY_RETENTION_DAYS,
+        compact_interval: float = SEARCH_HISTORY_COMPACT_INTERVAL_SECONDS,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self.running = False
+        self.thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = deque(maxlen=batch_size * 10)
+        self.total_flushed = 0
+        self.dropped = 0
+        self.last_flush_at = None
+        self.last_compact_at = None
+
+    def record(
+        self,
+        tool_id: str,
+        engine: str,
+        query: str,
+        results: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ):
+        """Buffer one search for the history"""
+        entry = {
+            "id": str(uuid.uuid4()),
+            "tool_id": tool_id,
+            "user_id": user_id,
+            "search_engine": engine,
+            "query": query,
+            "results": results,
+            "ip_address": ip_address,
+            "user_agent": (user_agent or "")[:USER_AGENT_MAX_LENGTH],
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(entry)
+            should_wake = len(self._pending) >= self.batch_size
+
+        if should_wake:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def clear(self):
+        """Discard buffered searches"""
+        self._drain()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            drained = list(self._pending)
+            self._pending.clear()
+        return drained
+
+    def _restore(self, drained: List[Dict[str, Any]]):
+        """Put entries back after a failed flush so they are retried"""
+        with self._lock:
+            newer = list(self._pending)
+            self._pending.clear()
+            for entry in drained + newer:
+                if len(self._pending) == self._pending.maxlen:
+                    self.dropped += 1
+                self._pending.append(entry)
+
+    def flush(self, db: Optional[Session] = None) -> Dict[str, int]:
+        """
+        Write all buffered searches to the database.
+
+        Args:
+            db: Session to use; a new one is opened (and closed) if omitted
+
+        Returns:
+            Number of rows written and of distinct result blobs
+        """
+        drained = self._drain()
+        if not drained:
+            return {"rows": 0, "blobs": 0}
+
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+
+        try:
+            # Searches of tools deleted meanwhile are not recorded
+            tool_ids = {entry["tool_id"] for entry in drained}
+            existing_tools = set(db.scalars(select(FreeTool.id).where(FreeTool.id.in_(tool_ids))))
+            recorded = [entry for entry in drained if entry["tool_id"] in existing_tools]
+
+            blobs = {}
+            rows = []
+            for entry in recorded:
+                blob_id, data = encode_results(entry["results"])
+                blobs[blob_id] = {"id": blob_id, "data": data, "results_count": len(entry["results"])}
+                row = {key: value for key, value in entry.items() if key != "results"}
+                rows.append(dict(row, results_count=len(entry["results"]), results_blob_id=blob_id))
+
+            blob_rows = list(blobs.values())
+            for start in range(0, len(blob_rows), self.batch_size):
+                _insert_ignoring_duplicates(db, SearchResultBlob.__table__, blob_rows[start:start + self.batch_size])
+            for start in range(0, len(rows), self.batch_size):
+                db.execute(SearchHistory.__table__.insert().values(rows[start:start + self.batch_size]))
+
+            if recorded:
+                table = FreeTool.__table__
+                searches = Counter(entry["tool_id"] for entry in recorded)
+                db.execute(
+                    table.update()
+                    .where(table.c.id == bindparam("row_id"))
+                    .values(searches_count=func.coalesce(table.c.searches_count, 0) + bindparam("increment")),
+                    [{"row_id": tool_id, "increment": count} for tool_id, count in searches.items()]
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._restore(drained)
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+        self.total_flushed += len(rows)
+        self.last_flush_at = datetime.utcnow()
+        return {"rows": len(rows), "blobs": len(blobs)}
+
+    def compact(self, db: Optional[Session] = None, retention_days: Optional[int] = None) -> Dict[str, int]:
+        """Delete history past the retention period and blobs no longer referenced"""
+        retention_days = self.retention_days if retention_days is None else retention_days
+        if retention_days <= 0:
+            return {"rows": 0, "blobs": 0}
+
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=retention_days)
+            rows = db.execute(delete(SearchHistory).where(SearchHistory.created_at < cutoff)).rowcount
+            blobs = db.execute(
+                delete(SearchResultBlob).where(
+                    ~exists().where(SearchHistory.results_blob_id == SearchResultBlob.id)
+                )
+            ).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+        self.last_compact_at = datetime.utcnow()
+        return {"rows": rows, "blobs": blobs}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending": self.pending(),
+            "total_flushed": self.total_flushed,
+            "dropped": self.dropped,
+            "last_flush_at": self.last_flush_at,
+            "last_compact_at": self.last_compact_at,
+            "retention_days": self.retention_days,
+        }
+
+    def start(self):
+        """Start the background flush thread"""
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            print(f"🚀 Search history writer started - flushing every {self.interval:g} seconds")
+
+    def stop(self):
+        """Stop the flush thread and write out anything still buffered"""
+        if self.running:
+            self.running = False
+            self._wake.set()
+            if self.thread:
+                self.thread.join()
+            print("🛑 Search history writer stopped")
+
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ Error flushing search history on shutdown: {e}")
+
+    def _run(self):
+        """Flush loop; compacts every compact_interval"""
+        last_compact = time.monotonic()
+        while self.running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self.running:
+                break
+            try:
+                self.flush()
+                if time.monotonic() - last_compact >= self.compact_interval:
+                    last_compact = time.monotonic()
+                    removed = self.compact()
+                    if removed["rows"]:
+                        print(f"🧹 Compacted search history: {removed}")
+            except Exception as e:
+                print(f"❌ Error writing search history: {e}")
+                time.sleep(self.interval)
+
+# Global instance
+search_history_writer = SearchHistoryWriter()
+
+def start_search_history_writer():
+    """Start the search history flush thread"""
+    search_history_writer.start()
+
+def stop_search_history_writer():
+    """Stop the search history writer and flush pending searches"""
+    search_history_writer.stop()
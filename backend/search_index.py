@@ -0,0 +1,570 @@
+"""
+In-process search index for tools and free tools
+
+For deployments without PostgreSQL full-text search, /api/tools/search and
+/api/free-tools answer text queries and facet filters from memory:
+
+- Text fields are tokenized into an inverted index whose posting lists are
+  compact `array` pairs (document slot, weighted term frequency).
+- Ranking is BM25 over field-weighted term frequencies
+  (name > short_description > features > description).
+- Facet filters (category_id, pricing_model, industry, ...) are bitsets
+  stored as Python ints, so combining filters is a handful of AND operations.
+  Scoring checks membership in a byte copy of the combined mask, and only
+  the requested page is ordered (a heap of offset + limit entries).
+
+Only the ids of the requested page are looked up in the database afterwards.
+The indexes are built at startup and updated incrementally by this
+process's tool write routes and bulk uploaders. Each worker process holds
+its own copy, so rows written elsewhere (other workers, seed scripts,
+direct database edits) are picked up by the full rebuild the trending
+updater runs every cycle (scheduler.py, every 5 minutes). Rebuilds happen
+off to the side and are swapped in, so searches are not blocked meanwhile.
+
+TOOL_SEARCH_BACKEND selects the engine: "auto" (memory unless the database
+is PostgreSQL), "memory" or "database".
+"""
+
+import heapq
+import os
+import re
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models import Tool, FreeTool
+
+TOOL_SEARCH_BACKEND = os.getenv("TOOL_SEARCH_BACKEND", "auto")
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# A prefix matches at most this many terms, the most frequent ones (plus the
+# prefix itself if it is a term); one- or two-letter prefixes otherwise
+# score most of the index
+MAX_PREFIX_EXPANSIONS = int(os.getenv("SEARCH_INDEX_MAX_PREFIX_EXPANSIONS", "50"))
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Lowercase word tokens of a text value"""
+    if not value:
+        return []
+    return TOKEN_PATTERN.findall(str(value).lower())
+
+def _iter_bits(bits: int) -> Iterable[int]:
+    """Yield the positions of set bits, lowest first"""
+    # Byte by byte: shifting and masking the whole int per bit is O(N) each
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
+
+class _SlotMask:
+    """Constant-time membership test over a bitset"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, bits: int):
+        self.data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+    def __contains__(self, slot: int) -> bool:
+        index = slot >> 3
+        return index < len(self.data) and (self.data[index] >> (slot & 7)) & 1 == 1
+
+def _sort_timestamp(value: Optional[datetime]) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _database_key(db: Session) -> str:
+    """The database `db` is bound to, the same for its sync and async drivers"""
+    url = db.get_bind().url
+    return str(url.set(drivername=url.get_backend_name()))
+
+class InvertedIndex:
+    """
+    BM25 inverted index with facet bitsets over one model's rows.
+
+    Documents live in integer slots. Deleted slots are masked out of the live
+    bitset immediately and purged from the posting lists by compact(), which
+    runs once enough dead slots accumulate.
+    """
+
+    def __init__(
+        self,
+        model,
+        text_fields: Dict[str, float],
+        facets: List[str],
+        sort_fields: List[str],
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.model = model
+        self.text_fields = text_fields
+        self.facets = facets
+        self.sort_fields = sort_fields
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.bind_url = None
+        self.built_at = None
+        self._reset()
+
+    def _reset(self):
+        self._slot_ids: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._live = 0
+        self._live_count = 0
+        self._dead_count = 0
+        self._doc_len = array("f")
+        self._total_len = 0.0
+        self._doc_terms: List[Optional[Dict[str, float]]] = []
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._df: Dict[str, int] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._facet_bits: Dict[str, Dict[Any, int]] = {facet: {} for facet in self.facets}
+        self._facet_values: List[Optional[Dict[str, Any]]] = []
+        self._sort_values: List[Optional[Dict[str, Any]]] = []
+
+    # Lifecycle
+
+    @property
+    def ready(self) -> bool:
+        return self.bind_url is not None
+
+    def ready_for(self, db: Session) -> bool:
+        """Whether this index was built from the database `db` is bound to"""
+        return self.bind_url is not None and self.bind_url == _database_key(db)
+
+    def clear(self):
+        """Drop all documents and detach from the database"""
+        with self._lock:
+            self._reset()
+            self.bind_url = None
+            self.built_at = None
+
+    def rebuild(self, db: Session):
+        """Index every row of the model from scratch"""
+        rows = db.query(self.model).all()
+        fresh = InvertedIndex(self.model, self.text_fields, self.facets, self.sort_fields, self.k1, self.b)
+        for row in rows:
+            fresh._add(row)
+        with self._lock:
+            # Swap in the new documents; searches meanwhile used the old ones
+            for name, value in vars(fresh).items():
+                if name.startswith("_") and name != "_lock":
+                    setattr(self, name, value)
+            self.bind_url = _database_key(db)
+            self.built_at = datetime.utcnow()
+
+    # Incremental updates
+
+    def index(self, db: Session, obj):
+        """Add or replace one row (no-op unless the index serves this database)"""
+        if not self.ready_for(db):
+            return
+        with self._lock:
+            self._remove(obj.id)
+            self._add(obj)
+
+    def unindex(self, db: Session, obj_id: str):
+        """Remove one row (no-op unless the index serves this database)"""
+        if not self.ready_for(db):
+            return
+        with self._lock:
+            self._remove(obj_id)
+
+    def update_sort_values(self, db: Session, obj_id: str, **values):
+        """Refresh numeric sort keys (views, trending_score, ...) for one row"""
+        if not self.ready_for(db):
+            return
+        with self._lock:
+            slot = self._slots.get(obj_id)
+            if slot is not None:
+                self._sort_values[slot].update(
+                    {key: value for key, value in values.items() if key in self.sort_fields}
+                )
+
+    def _add(self, obj):
+        slot = len(self._slot_ids)
+        self._slot_ids.append(obj.id)
+        self._slots[obj.id] = slot
+        self._live |= 1 << slot
+        self._live_count += 1
+
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.text_fields.items():
+            tokens = tokenize(getattr(obj, field, None))
+            length += weight * len(tokens)
+            for token in tokens:
+                terms[token] = terms.get(token, 0.0) + weight
+
+        for term, frequency in terms.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = (array("I"), array("f"))
+                self._postings[term] = posting
+                self._vocabulary_dirty = True
+            posting[0].append(slot)
+            posting[1].append(frequency)
+            self._df[term] = self._df.get(term, 0) + 1
+
+        self._doc_terms.append(terms)
+        self._doc_len.append(length)
+        self._total_len += length
+
+        facet_values = {}
+        for facet in self.facets:
+            value = getattr(obj, facet, None)
+            facet_values[facet] = value
+            bits = self._facet_bits[facet]
+            bits[value] = bits.get(value, 0) | (1 << slot)
+        self._facet_values.append(facet_values)
+
+        sort_values = {}
+        for field in self.sort_fields:
+            value = getattr(obj, field, None)
+            if isinstance(value, datetime):
+                value = _sort_timestamp(value)
+            sort_values[field] = value
+        self._sort_values.append(sort_values)
+
+    def _remove(self, obj_id: str):
+        slot = self._slots.pop(obj_id, None)
+        if slot is None:
+            return
+
+        self._live &= ~(1 << slot)
+        self._live_count -= 1
+        self._dead_count += 1
+        self._slot_ids[slot] = None
+
+        for term in self._doc_terms[slot]:
+            self._df[term] -= 1
+        self._doc_terms[slot] = None
+        self._total_len -= self._doc_len[slot]
+
+        for facet, value in self._facet_values[slot].items():
+            bits = self._facet_bits[facet]
+            bits[value] &= ~(1 << slot)
+            if not bits[value]:
+                del bits[value]
+        self._facet_values[slot] = None
+        self._sort_values[slot] = None
+
+        if self._dead_count > max(64, self._live_count):
+            self._compact()
+
+    def _compact(self):
+        """Renumber live slots and drop dead entries from every posting list"""
+        remap = {}
+        for slot in _iter_bits(self._live):
+            remap[slot] = len(remap)
+
+        slot_ids, doc_len, doc_terms, facet_values, sort_values = [], array("f"), [], [], []
+        for old_slot in remap:
+            slot_ids.append(self._slot_ids[old_slot])
+            doc_len.append(self._doc_len[old_slot])
+            doc_terms.append(self._doc_terms[old_slot])
+            facet_values.append(self._facet_values[old_slot])
+            sort_values.append(self._sort_values[old_slot])
+
+        postings = {}
+        for term, (slots, frequencies) in self._postings.items():
+            new_slots, new_frequencies = array("I"), array("f")
+            for slot, frequency in zip(slots, frequencies):
+                new_slot = remap.get(slot)
+                if new_slot is not None:
+                    new_slots.append(new_slot)
+                    new_frequencies.append(frequency)
+            if new_slots:
+                postings[term] = (new_slots, new_frequencies)
+
+        facet_bits = {facet: {} for facet in self.facets}
+        for slot, values in enumerate(facet_values):
+            for facet, value in values.items():
+                facet_bits[facet][value] = facet_bits[facet].get(value, 0) | (1 << slot)
+
+        self._slot_ids = slot_ids
+        self._slots = {obj_id: slot for slot, obj_id in enumerate(slot_ids)}
+        self._live = (1 << len(slot_ids)) - 1
+        self._dead_count = 0
+        self._doc_len = doc_len
+        self._doc_terms = doc_terms
+        self._postings = postings
+        self._df = {term: count for term, count in self._df.items() if count > 0}
+        self._vocabulary_dirty = True
+        self._facet_bits = facet_bits
+        self._facet_values = facet_values
+        self._sort_values = sort_values
+
+    # Querying
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(term for term, count in self._df.items() if count > 0)
+            self._vocabulary_dirty = False
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def filter_mask(self, filters: Dict[str, Any], contains: Optional[Dict[str, str]] = None) -> int:
+        """
+        Bitset of live documents matching every facet filter.
+
+        Args:
+            filters: Exact facet matches ({facet: value}); None values are ignored
+            contains: Case-insensitive substring matches on facet values
+        """
+        with self._lock:
+            mask = self._live
+            for facet, value in filters.items():
+                if value is None:
+                    continue
+                mask &= self._facet_bits[facet].get(value, 0)
+            for facet, needle in (contains or {}).items():
+                if not needle:
+                    continue
+                needle = needle.lower()
+                matched = 0
+                for value, bits in self._facet_bits[facet].items():
+                    if value and needle in str(value).lower():
+                        matched |= bits
+                mask &= matched
+            return mask
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        contains: Optional[Dict[str, str]] = None,
+        min_values: Optional[Dict[str, float]] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = 20
+    ) -> Tuple[List[str], int]:
+        """
+        Run a query against the index.
+
+        Every query term must match (the last one as a prefix). Results are
+        ordered by BM25 score when `sort_by` is None and `q` is given,
+        otherwise by the named sort field.
+
+        Returns:
+            (ids of the requested page, total number of matches)
+        """
+        with self._lock:
+            mask = self.filter_mask(filters or {}, contains)
+            scores = self._score(q, mask) if q is not None else None
+
+            sort_values = self._sort_values
+            # Slots in ascending order, or {slot: score} for a text query
+            candidates = list(_iter_bits(mask)) if scores is None else scores
+
+            for field, minimum in (min_values or {}).items():
+                if minimum is None:
+                    continue
+                if scores is None:
+                    candidates = [slot for slot in candidates if (sort_values[slot].get(field) or 0) >= minimum]
+                else:
+                    candidates = {
+                        slot: score for slot, score in candidates.items()
+                        if (sort_values[slot].get(field) or 0) >= minimum
+                    }
+
+            # Only the first offset + limit entries are ordered
+            wanted = offset + limit if limit is not None else None
+
+            def top(slots, key=None, reverse=False):
+                if wanted is not None and wanted < len(slots):
+                    return (heapq.nlargest if reverse else heapq.nsmallest)(wanted, slots, key=key)
+                return sorted(slots, key=key, reverse=reverse)
+
+            if sort_by is None and scores is not None:
+                ordered = top(candidates, key=lambda slot: (-candidates[slot], slot))
+            elif sort_by is None:
+                ordered = candidates[:wanted] if wanted is not None else candidates
+            else:
+                present = [slot for slot in candidates if sort_values[slot].get(sort_by) is not None]
+                ordered = top(present, key=lambda slot: sort_values[slot][sort_by], reverse=descending)
+                if wanted is None or len(ordered) < wanted:
+                    ordered += sorted(slot for slot in candidates if sort_values[slot].get(sort_by) is None)
+
+            total = len(candidates)
+            page = ordered[offset:offset + limit] if limit is not None else ordered[offset:]
+            return [self._slot_ids[slot] for slot in page], total
+
+    def facet_counts(
+        self,
+        facets: List[str],
+        q: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        contains: Optional[Dict[str, str]] = None,
+        min_values: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Dict[Any, int]]:
+        """
+        Count matches per facet value for a query.
+
+        Each facet's counts apply every filter except that facet's own, so
+        the counts show what selecting another value would return.
+        """
+        filters = filters or {}
+        contains = contains or {}
+
+        with self._lock:
+            base = self._live
+            if q is not None:
+                base = self._slots_to_bits(self._score(q, base))
+            for field, minimum in (min_values or {}).items():
+                if minimum is None:
+                    continue
+                base = self._slots_to_bits(
+                    slot for slot in _iter_bits(base)
+                    if (self._sort_values[slot].get(field) or 0) >= minimum
+                )
+
+            counts = {}
+            for facet in facets:
+                mask = base & self.filter_mask(
+                    {name: value for name, value in filters.items() if name != facet},
+                    {name: value for name, value in contains.items() if name != facet}
+                )
+                counts[facet] = {}
+                for value, bits in self._facet_bits[facet].items():
+                    count = (mask & bits).bit_count()
+                    if count and value is not None and value != "":
+                        counts[facet][value] = count
+            return counts
+
+    def _slots_to_bits(self, slots: Iterable[int]) -> int:
+        data = bytearray((len(self._slot_ids) + 7) // 8)
+        for slot in slots:
+            data[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(data, "little")
+
+    def _score(self, q: str, mask: int) -> Dict[int, float]:
+        terms = tokenize(q)
+        if not terms:
+            return {}
+
+        live_count = max(self._live_count, 1)
+        avg_len = self._total_len / live_count if self._total_len > 0 else 1.0
+
+        allowed = _SlotMask(mask)
+
+        # Each query term contributes the best score among its expansions
+        scores: Dict[int, float] = {}
+        for position, term in enumerate(terms):
+            expansions = self._expand_prefix(term) if position == len(terms) - 1 else [term]
+            if len(expansions) > MAX_PREFIX_EXPANSIONS:
+                expansions = heapq.nlargest(
+                    MAX_PREFIX_EXPANSIONS, expansions, key=lambda expansion: (expansion == term, self._df[expansion])
+                )
+            term_scores: Dict[int, float] = {}
+            for expansion in expansions:
+                posting = self._postings.get(expansion)
+                df = self._df.get(expansion, 0)
+                if posting is None or df <= 0:
+                    continue
+                idf = math.log(1 + (live_count - df + 0.5) / (df + 0.5))
+                for slot, frequency in zip(*posting):
+                    if slot not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[slot] / avg_len)
+                    score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    if score > term_scores.get(slot, 0.0):
+                        term_scores[slot] = score
+
+            if position == 0:
+                scores = term_scores
+            else:
+                scores = {slot: scores[slot] + score for slot, score in term_scores.items() if slot in scores}
+            if not scores:
+                break
+
+        return scores
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "documents": self._live_count,
+                "dead_slots": self._dead_count,
+                "terms": len(self._postings),
+                "postings": sum(len(slots) for slots, _ in self._postings.values()),
+                "built_at": self.built_at
+            }
+
+TOOL_TEXT_FIELDS = {
+    "name": 3.0,
+    "short_description": 2.0,
+    "features": 1.5,
+    "description": 1.0,
+}
+
+TOOL_FACETS = [
+    "category_id",
+    "subcategory_id",
+    "pricing_model",
+    "company_size",
+    "industry",
+    "employee_size",
+    "revenue_range",
+    "location",
+    "is_hot",
+    "is_featured",
+]
+
+TOOL_SORT_FIELDS = ["rating", "trending_score", "views", "created_at", "name"]
+
+FREE_TOOL_TEXT_FIELDS = {
+    "name": 3.0,
+    "short_description": 2.0,
+    "features": 1.5,
+    "description": 1.0,
+}
+
+FREE_TOOL_FACETS = ["category", "is_active"]
+
+FREE_TOOL_SORT_FIELDS = ["name", "views", "created_at"]
+
+# Global instances
+tool_index = InvertedIndex(Tool, TOOL_TEXT_FIELDS, TOOL_FACETS, TOOL_SORT_FIELDS)
+free_tool_index = InvertedIndex(FreeTool, FREE_TOOL_TEXT_FIELDS, FREE_TOOL_FACETS, FREE_TOOL_SORT_FIELDS)
+
+def use_memory_index(db: Session, index: InvertedIndex) -> bool:
+    """Whether a search on `db` should be answered by `index`"""
+    if TOOL_SEARCH_BACKEND == "database":
+        return False
+    if TOOL_SEARCH_BACKEND == "auto" and db.get_bind().dialect.name == "postgresql":
+        return False
+    return index.ready_for(db)
+
+def build_search_indexes(db: Session):
+    """Build (or rebuild) both indexes from the database"""
+    if TOOL_SEARCH_BACKEND == "database":
+        return
+    if TOOL_SEARCH_BACKEND == "auto" and db.get_bind().dialect.name == "postgresql":
+        return
+    tool_index.rebuild(db)
+    free_tool_index.rebuild(db)
+
+def refresh_tool_sort_values(db: Session):
+    """Reload views/rating/trending_score after a bulk recompute"""
+    if not tool_index.ready_for(db):
+        return
+    rows = db.query(Tool.id, Tool.rating, Tool.views, Tool.trending_score).all()
+    for tool_id, rating, views, trending_score in rows:
+        tool_index.update_sort_values(db, tool_id, rating=rating, views=views, trending_score=trending_score)
@@ -7,120 +7,171 @@ import asyncio
 import aiohttp
 from datetime import datetime
 import json
+from http_client import http_client
+from search_cache import search_cache
+from circuit_breaker import CircuitBreaker, UpstreamGuard
 
 load_dotenv()
 
+SEARCH_ENGINE_TIMEOUT_SECONDS = float(os.getenv("SEARCH_ENGINE_TIMEOUT_SECONDS", "10"))
+# combined_search returns whatever engines answered within this
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "5"))
+
+# Per-engine circuit breaker and timeouts, see circuit_breaker.py
+SEARCH_BREAKER_FAILURE_RATE = float(os.getenv("SEARCH_BREAKER_FAILURE_RATE", "0.5"))
+SEARCH_BREAKER_MIN_CALLS = int(os.getenv("SEARCH_BREAKER_MIN_CALLS", "10"))
+SEARCH_BREAKER_WINDOW = int(os.getenv("SEARCH_BREAKER_WINDOW", "20"))
+SEARCH_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("SEARCH_BREAKER_SLOW_CALL_SECONDS", "3"))
+SEARCH_BREAKER_OPEN_SECONDS = float(os.getenv("SEARCH_BREAKER_OPEN_SECONDS", "30"))
+SEARCH_MIN_TIMEOUT_SECONDS = float(os.getenv("SEARCH_MIN_TIMEOUT_SECONDS", "1"))
+# Hedged requests cost extra API quota, so they are off unless enabled
+SEARCH_HEDGE_ENABLED = os.getenv("SEARCH_HEDGE_ENABLED", "false").lower() == "true"
+
+GOOGLE_SEARCH_URL = os.getenv("GOOGLE_SEARCH_URL", "https://www.googleapis.com/customsearch/v1")
+BING_SEARCH_URL = os.getenv("BING_SEARCH_URL", "https://api.bing.microsoft.com/v7.0/search")
+
+def create_engine_guard(engine: str) -> UpstreamGuard:
+    breaker = CircuitBreaker(
+        engine,
+        failure_rate=SEARCH_BREAKER_FAILURE_RATE,
+        min_calls=SEARCH_BREAKER_MIN_CALLS,
+        window=SEARCH_BREAKER_WINDOW,
+        slow_call_seconds=SEARCH_BREAKER_SLOW_CALL_SECONDS,
+        open_seconds=SEARCH_BREAKER_OPEN_SECONDS,
+    )
+    return UpstreamGuard(
+        breaker,
+        max_timeout=SEARCH_ENGINE_TIMEOUT_SECONDS,
+        min_timeout=SEARCH_MIN_TIMEOUT_SECONDS,
+        hedge=SEARCH_HEDGE_ENABLED,
+    )
+
 class SearchService:
     def __init__(self):
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
         self.google_cse_id = os.getenv("GOOGLE_CSE_ID")
         self.bing_api_key = os.getenv("BING_API_KEY")
+        self.deadline = SEARCH_DEADLINE_SECONDS
+        self.google_url = GOOGLE_SEARCH_URL
+        self.bing_url = BING_SEARCH_URL
+        # While an engine's circuit is open its searches fall back to mock results at once
+        self.reset_guards()
         
     async def search_google(self, query: str, num_results: int = 10) -> SearchResponse:
-        """Search using Google Custom Search Engine API"""
+        """Search using Google Custom Search Engine API (cached, see search_cache.py; guarded, see circuit_breaker.py)"""
         if not self.google_api_key or not self.google_cse_id:
             # Return mock results if API keys are not configured
             return self._get_mock_google_results(query, num_results)
         
         try:
-            params = {
-                "key": self.google_api_key,
-                "cx": self.google_cse_id,
-                "q": query,
-                "num": min(num_results, 10)  # Google CSE max is 10
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://www.googleapis.com/customsearch/v1",
-                    params=params,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-            
-            if "items" not in data:
-                return SearchResponse(
-                    engine="google",
-                    query=query,
-                    results=[],
-                    total_results=0
-                )
-            
-            results = []
-            for item in data["items"]:
-                results.append(SearchResult(
-                    title=item.get("title", ""),
-                    link=item.get("link", ""),
-                    snippet=item.get("snippet", ""),
-                    displayLink=item.get("displayLink", "")
-                ))
-            
-            return SearchResponse(
-                engine="google",
-                query=query,
-                results=results,
-                total_results=int(data.get("searchInformation", {}).get("totalResults", 0))
+            return await search_cache.get_or_search(
+                "google", query, num_results,
+                lambda: self.guards["google"].call(lambda: self._fetch_google(query, num_results))
             )
-            
         except Exception as e:
             print(f"Google search error: {str(e)}")
             return self._get_mock_google_results(query, num_results)
     
+    async def _fetch_google(self, query: str, num_results: int) -> SearchResponse:
+        """Call the Google API (uncached; raises on failure)"""
+        params = {
+            "key": self.google_api_key,
+            "cx": self.google_cse_id,
+            "q": query,
+            "num": min(num_results, 10)  # Google CSE max is 10
+        }
+        
+        async with http_client.session().get(
+            self.google_url,
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=SEARCH_ENGINE_TIMEOUT_SECONDS)
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        
+        if "items" not in data:
+            return SearchResponse(
+                engine="google",
+                query=query,
+                results=[],
+                total_results=0
+            )
+        
+        results = []
+        for item in data["items"]:
+            results.append(SearchResult(
+                title=item.get("title", ""),
+                link=item.get("link", ""),
+                snippet=item.get("snippet", ""),
+                displayLink=item.get("displayLink", "")
+            ))
+        
+        return SearchResponse(
+            engine="google",
+            query=query,
+            results=results,
+            total_results=int(data.get("searchInformation", {}).get("totalResults", 0))
+        )
+    
     async def search_bing(self, query: str, num_results: int = 10) -> SearchResponse:
-        """Search using Bing Search API"""
+        """Search using Bing Search API (cached, see search_cache.py; guarded, see circuit_breaker.py)"""
         if not self.bing_api_key:
             # Return mock results if API key is not configured
             return self._get_mock_bing_results(query, num_results)
         
         try:
-            headers = {
-                "Ocp-Apim-Subscription-Key": self.bing_api_key
-            }
-            params = {
-                "q": query,
-                "count": min(num_results, 50),  # Bing max is 50
-                "responseFilter": "Webpages"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://api.bing.microsoft.com/v7.0/search",
-                    headers=headers,
-                    params=params,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-            
-            if "webPages" not in data or "value" not in data["webPages"]:
-                return SearchResponse(
-                    engine="bing",
-                    query=query,
-                    results=[],
-                    total_results=0
-                )
-            
-            results = []
-            for item in data["webPages"]["value"]:
-                results.append(SearchResult(
-                    title=item.get("name", ""),
-                    link=item.get("url", ""),
-                    snippet=item.get("snippet", ""),
-                    displayLink=item.get("displayUrl", "")
-                ))
-            
-            return SearchResponse(
-                engine="bing",
-                query=query,
-                results=results,
-                total_results=data["webPages"].get("totalEstimatedMatches", 0)
+            return await search_cache.get_or_search(
+                "bing", query, num_results,
+                lambda: self.guards["bing"].call(lambda: self._fetch_bing(query, num_results))
             )
-            
         except Exception as e:
             print(f"Bing search error: {str(e)}")
             return self._get_mock_bing_results(query, num_results)
     
+    async def _fetch_bing(self, query: str, num_results: int) -> SearchResponse:
+        """Call the Bing API (uncached; raises on failure)"""
+        headers = {
+            "Ocp-Apim-Subscription-Key": self.bing_api_key
+        }
+        params = {
+            "q": query,
+            "count": min(num_results, 50),  # Bing max is 50
+            "responseFilter": "Webpages"
+        }
+        
+        async with http_client.session().get(
+            self.bing_url,
+            headers=headers,
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=SEARCH_ENGINE_TIMEOUT_SECONDS)
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        
+        if "webPages" not in data or "value" not in data["webPages"]:
+            return SearchResponse(
+                engine="bing",
+                query=query,
+                results=[],
+                total_results=0
+            )
+        
+        results = []
+        for item in data["webPages"]["value"]:
+            results.append(SearchResult(
+                title=item.get("name", ""),
+                link=item.get("url", ""),
+                snippet=item.get("snippet", ""),
+                displayLink=item.get("displayUrl", "")
+            ))
+        
+        return SearchResponse(
+            engine="bing",
+            query=query,
+            results=results,
+            total_results=data["webPages"].get("totalEstimatedMatches", 0)
+        )
+    
     def _get_mock_google_results(self, query: str, num_results: int) -> SearchResponse:
         """Return mock Google search results when API is not configured"""
         mock_results = []
@@ -157,23 +208,40 @@ class SearchService:
             total_results=2000000  # Mock total
         )
     
+    def reset_guards(self):
+        """Close every circuit and forget observed latencies"""
+        self.guards = {"google": create_engine_guard("google"), "bing": create_engine_guard("bing")}
+    
+    def engine_stats(self) -> Dict[str, Dict]:
+        return {engine: guard.stats() for engine, guard in self.guards.items()}
+    
     async def combined_search(self, query: str, engines: List[str] = ["google", "bing"], num_results: int = 10) -> Dict[str, any]:
-        """Perform search across multiple engines"""
-        tasks = []
-        results = {}
-        errors = {}
+        """
+        Search several engines concurrently.
         
+        Engines still running after `self.deadline` seconds are cancelled and
+        reported in "errors"; the others' results are returned.
+        """
+        searches = {}
         if "google" in engines:
-            tasks.append(("google", self.search_google(query, num_results)))
+            searches["google"] = self.search_google(query, num_results)
         if "bing" in engines:
-            tasks.append(("bing", self.search_bing(query, num_results)))
-        
-        for engine_name, task in tasks:
-            try:
-                result = await task
-                results[engine_name] = result
-            except Exception as e:
-                errors[engine_name] = str(e)
+            searches["bing"] = self.search_bing(query, num_results)
+        
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(search, self.deadline) for search in searches.values()),
+            return_exceptions=True
+        )
+        
+        results = {}
+        errors = {}
+        for engine_name, outcome in zip(searches, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                errors[engine_name] = f"timed out after {self.deadline:g}s"
+            elif isinstance(outcome, Exception):
+                errors[engine_name] = str(outcome)
+            else:
+                results[engine_name] = outcome
         
         return {
             **results,
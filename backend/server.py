@@ -1,14 +1,24 @@
-from fastapi import FastAPI, HTTPException, Request, Response, Depends
-from sqlalchemy.orm import Session
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, HTTPException, Request, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from sqlalchemy import create_engine, text
-from database import get_db, engine
-from models import Base
+from sqlalchemy import create_engine, select, text
+from database import get_async_read_db, engine, SessionLocal, read_replicas, sticky_reads, create_migration_engine
+from search_index import build_search_indexes
+from migrations import run_migrations
 from scheduler import start_trending_updater
+from view_counter import start_view_counter, stop_view_counter
+from search_history import search_history_writer, start_search_history_writer, stop_search_history_writer
+from auth import password_hasher
+from db_pool import pool_stats
+from db_routing import client_key
+from request_logging import configure_logging, log_request, logging_stats
+from http_client import http_client
+from ai_clients import ai_clients
+from search_cache import search_cache
+from search_service import search_service
+from cors import CORS_ALLOW_ALL_ORIGINS, CORS_ORIGINS, MatchedOriginCORSMiddleware, OriginMatcher
 import os
 import logging
-import traceback
 import time
 from datetime import datetime
 from dotenv import load_dotenv
@@ -21,17 +31,8 @@ from tools_routes import get_tools_routes
 from blogs_routes import router as blogs_router
 from ai_blog_routes import router as ai_blog_router
 
-# Configure logging
-import os
-os.makedirs('/tmp/logs', exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/tmp/logs/backend.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (queued; written by a background thread)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 load_dotenv()
@@ -54,37 +55,45 @@ app = FastAPI(
     debug=True
 )
 
-# Custom middleware for request logging and CORS debugging
+# Read-your-writes: a client's reads skip the replicas briefly after it writes
+@app.middleware("http")
+async def stick_reads_after_writes(request: Request, call_next):
+    response = await call_next(request)
+    if read_replicas and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        sticky_reads.mark(client_key(request))
+    return response
+
+# Request logging: errors and slow requests always, successful ones sampled
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    origin = request.headers.get('origin', 'No origin header')
-    
-    logger.info(f"Request: {request.method} {request.url} from origin: {origin}")
-    logger.info(f"Headers: {dict(request.headers)}")
+    start_time = time.perf_counter()
+    request_id = str(int(time.time() * 1000000))
+    client = request.client.host if request.client else None
     
     try:
         response = await call_next(request)
-        process_time = time.time() - start_time
-        
-        logger.info(f"Response: {response.status_code} - Time: {process_time:.4f}s")
-        
-        # Add debugging headers
-        response.headers["X-Request-ID"] = str(int(time.time() * 1000000))
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
     except Exception as e:
-        logger.error(f"Request failed: {e}")
-        logger.error(traceback.format_exc())
+        log_request(
+            request.method, request.url.path, 500, (time.perf_counter() - start_time) * 1000,
+            request_id, request.headers, client, exc_info=e
+        )
         raise
+    
+    process_time = time.perf_counter() - start_time
+    log_request(request.method, request.url.path, response.status_code, process_time * 1000, request_id, request.headers, client)
+    
+    # Add debugging headers
+    response.headers["X-Request-ID"] = request_id
+    response.headers["X-Process-Time"] = str(process_time)
+    
+    return response
 
 # Get environment variables
 FRONTEND_URL = os.getenv('APP_URL', 'http://localhost:3000')
 BACKEND_URL = os.getenv('API_URL', 'http://localhost:8001')
 CODESPACE_NAME = os.getenv('CODESPACE_NAME', '')
 
-# Enhanced CORS middleware with comprehensive origins
+# Known frontend origins; *.emergentagent.com and *.github.dev are matched by pattern (cors.py)
 allowed_origins = [
     # Local development
     "http://localhost:3000",
@@ -97,9 +106,7 @@ allowed_origins = [
     # Environment variables
     FRONTEND_URL,
     BACKEND_URL,
-    
-    # Wildcard for development (NOT for production)
-    "*"
+    *CORS_ORIGINS,
 ]
 
 # Add codespace-specific origins
@@ -111,58 +118,26 @@ if CODESPACE_NAME:
         f"https://{CODESPACE_NAME}-8001.preview.app.github.dev",
     ])
 
-# Add all emergentagent.com subdomains
-allowed_origins.extend([
-    "https://fictional-happiness-jjgp7p5p4gp4hq9rw-3000.app.github.dev",
-    "https://fictional-happiness-jjgp7p5p4gp4hq9rw-8001.app.github.dev",
-    "https://93364546-03cb-4ae8-a6a0-909ce7700a55.preview.emergentagent.com",
-    "https://psychic-space-potato-x54gpgwg9pw626rpp-3000.app.github.dev",
-    "https://psychic-space-potato-x54gpgwg9pw626rpp-8001.app.github.dev",
-])
-
-# Enhanced dynamic pattern matching for any github.dev and emergentagent.com domains
-import re
-@app.middleware("http")
-async def dynamic_cors(request: Request, call_next):
-    origin = request.headers.get('origin')
-    
-    if origin:
-        # Allow all emergentagent.com subdomains
-        if re.match(r'https://.*\.emergentagent\.com$', origin):
-            logger.info(f"Allowing emergentagent.com origin: {origin}")
-            if origin not in allowed_origins:
-                allowed_origins.append(origin)
-        
-        # Allow all github.dev subdomains
-        if re.match(r'https://.*\.github\.dev$', origin):
-            logger.info(f"Allowing github.dev origin: {origin}")
-            if origin not in allowed_origins:
-                allowed_origins.append(origin)
-        
-        # Allow all app.github.dev subdomains 
-        if re.match(r'https://.*\.app\.github\.dev$', origin):
-            logger.info(f"Allowing app.github.dev origin: {origin}")
-            if origin not in allowed_origins:
-                allowed_origins.append(origin)
-    
-    response = await call_next(request)
-    return response
-
-# Remove duplicates and None values
-allowed_origins = list(set(filter(None, allowed_origins)))
-logger.info(f"Allowed CORS origins: {allowed_origins}")
+# Wildcard for development (NOT for production): CORS_ALLOW_ALL_ORIGINS=false turns it off
+cors_origins = OriginMatcher(allowed_origins, allow_all=CORS_ALLOW_ALL_ORIGINS)
+logger.info(f"Allowed CORS origins: {cors_origins.stats()}")
 
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins,
+    MatchedOriginCORSMiddleware,
+    matcher=cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    expose_headers=["*"],
+    max_age=86400
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or upgrade the database schema
+migration_engine = create_migration_engine()
+try:
+    run_migrations(migration_engine)
+finally:
+    migration_engine.dispose()
 
 # Test database connection on startup
 if test_database_connection():
@@ -170,9 +145,50 @@ if test_database_connection():
 else:
     logger.error("Database connection failed during startup")
 
+# In-process search index for tools and free tools (skipped on PostgreSQL)
+try:
+    startup_db = SessionLocal()
+    try:
+        build_search_indexes(startup_db)
+    finally:
+        startup_db.close()
+except Exception as e:
+    logger.error(f"Failed to build in-process search index: {e}")
+
 # Start the trending updater background task
 start_trending_updater()
 
+# Start the write-behind view counter
+start_view_counter()
+
+# Start the batched search history writer
+start_search_history_writer()
+
+@app.on_event("shutdown")
+async def flush_view_counts():
+    """Flush buffered view counts and search history before the worker exits"""
+    stop_view_counter()
+    stop_search_history_writer()
+
+@app.on_event("startup")
+async def open_http_client():
+    """Open the pooled client for outbound API calls"""
+    await http_client.start()
+
+@app.on_event("startup")
+async def start_replica_health_checks():
+    """Probe read replicas in the background, off the request path"""
+    read_replicas.start_health_checks()
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await http_client.close()
+    await ai_clients.close()
+
+@app.on_event("shutdown")
+async def stop_replica_health_checks():
+    await read_replicas.stop_health_checks()
+
 # Enhanced health check endpoint with database connectivity
 @app.get("/api/health")
 async def health_check():
@@ -216,8 +232,16 @@ async def debug_connectivity():
             "BACKEND_URL": BACKEND_URL,
             "CODESPACE_NAME": CODESPACE_NAME or "Not set"
         },
-        "cors_origins": allowed_origins,
+        "cors_origins": cors_origins.stats(),
         "database_test": "failed",
+        "password_hashing": password_hasher.stats(),
+        "read_replicas": read_replicas.stats(),
+        "logging": logging_stats(),
+        "http_client": http_client.stats(),
+        "ai_clients": ai_clients.stats(),
+        "search_cache": search_cache.stats(),
+        "search_engines": search_service.engine_stats(),
+        "search_history": search_history_writer.stats(),
         "recent_logs": []
     }
     
@@ -227,11 +251,13 @@ async def debug_connectivity():
             result = conn.execute(text("SELECT COUNT(*) FROM users"))
             user_count = result.fetchone()[0]
             debug_info["database_test"] = "success"
+            stats = pool_stats(engine)
             debug_info["database_info"] = {
                 "user_count": user_count,
-                "engine_pool_size": engine.pool.size(),
-                "engine_pool_checked_in": engine.pool.checkedin(),
-                "engine_pool_checked_out": engine.pool.checkedout()
+                "engine_pool_size": stats.get("size"),
+                "engine_pool_checked_in": stats.get("checked_in"),
+                "engine_pool_checked_out": stats.get("checked_out"),
+                "pool": stats
             }
     except Exception as e:
         debug_info["database_test"] = f"error: {str(e)}"
@@ -239,23 +265,6 @@ async def debug_connectivity():
     
     return debug_info
 
-# Enhanced CORS preflight endpoint
-@app.options("/api/{path:path}")
-async def cors_preflight(path: str, request: Request):
-    origin = request.headers.get('origin', '*')
-    
-    return Response(
-        content="",
-        headers={
-            "Access-Control-Allow-Origin": origin,
-            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization, Accept, Origin, X-Requested-With",
-            "Access-Control-Allow-Credentials": "true",
-            "Access-Control-Max-Age": "86400",
-            "Vary": "Origin"
-        }
-    )
-
 # Include route modules
 app.include_router(superadmin_router, prefix="", tags=["superadmin"])
 app.include_router(admin_router, prefix="", tags=["admin"])
@@ -266,11 +275,11 @@ app.include_router(ai_blog_router, prefix="", tags=["ai-blog"])
 
 # Global Categories Route
 @app.get("/api/categories")
-async def get_categories_global(db: Session = Depends(get_db)):
+async def get_categories_global(db: AsyncSession = Depends(get_async_read_db)):
     """Get all categories - Global endpoint"""
     from models import Category
-    categories = db.query(Category).all()
-    return categories
+    result = await db.execute(select(Category))
+    return result.scalars().all()
 
 # Root endpoint
 @app.get("/")
@@ -4,7 +4,10 @@ from sqlalchemy import func, desc, create_engine, text
 from database import get_db
 from models import *
 from schemas import *
-from auth import require_superadmin, get_password_hash
+from auth import require_superadmin, get_password_hash, auth_user_cache
+from trending_calculator import update_trending_scores, after_trending_recompute, trending_aggregates, analytics_snapshot
+from search_index import tool_index
+from category_stats import tool_category_analytics
 from typing import Optional, List
 import uuid
 from datetime import datetime
@@ -146,6 +149,7 @@ async def update_user(
         setattr(user, field, value)
     
     db.commit()
+    auth_user_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
@@ -168,6 +172,7 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    auth_user_cache.invalidate(user_id)
     return {"message": "User deleted successfully"}
 
 @router.post("/users", response_model=UserResponse)
@@ -225,6 +230,7 @@ async def promote_user_to_admin(
     
     user.user_type = "admin"
     db.commit()
+    auth_user_cache.invalidate(user.id)
     return {"message": f"User {user.username} promoted to admin"}
 
 @router.post("/users/{user_id}/demote")
@@ -252,6 +258,7 @@ async def demote_admin_to_user(
     
     user.user_type = "user"
     db.commit()
+    auth_user_cache.invalidate(user.id)
     return {"message": f"Admin {user.username} demoted to user"}
 
 # Advanced Analytics Routes
@@ -434,9 +441,9 @@ async def update_tools_trending_scores(
     db: Session = Depends(get_db)
 ):
     """Update trending scores for all tools (Super Admin only)"""
-    from trending_calculator import update_trending_scores
     
     result = update_trending_scores(db)
+    after_trending_recompute(db)
     return {
         "message": "Trending scores updated successfully",
         "details": result
@@ -524,6 +531,11 @@ async def create_tool(
     db.commit()
     db.refresh(db_tool)
     
+    trending_aggregates.record_tool_added(db_tool)
+    analytics_snapshot.invalidate()
+    tool_index.index(db, db_tool)
+    tool_category_analytics.invalidate(db_tool.category_id)
+    
     # Get category name for response
     category_name = category.name if category else None
     
@@ -591,6 +603,7 @@ async def bulk_upload_tools(
         csv_reader = csv.DictReader(io.StringIO(content))
         
         created_tools = []
+        created_objects = []
         errors = []
         
         for row_num, row in enumerate(csv_reader, start=2):  # Start from row 2 (after header)
@@ -676,6 +689,7 @@ async def bulk_upload_tools(
                 
                 db.add(db_tool)
                 created_tools.append(db_tool.name)
+                created_objects.append(db_tool)
                 
             except Exception as e:
                 errors.append(f"Row {row_num}: Error processing row: {str(e)}")
@@ -683,6 +697,14 @@ async def bulk_upload_tools(
         # Commit all valid tools
         if created_tools:
             db.commit()
+            
+            # Catalog totals changed in bulk; reconcile on next use
+            trending_aggregates.invalidate()
+            analytics_snapshot.invalidate()
+            
+            for db_tool in created_objects:
+                tool_index.index(db, db_tool)
+                tool_category_analytics.invalidate(db_tool.category_id)
         
         return {
             "message": f"Bulk upload completed. Created {len(created_tools)} tools.",
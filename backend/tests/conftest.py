@@ -1,14 +1,31 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from database import get_db
+from sqlalchemy.pool import NullPool
+from database import get_db, get_async_db, get_async_read_db
 from models import Base
 from server import app
 from models import User, Category, Tool, Blog, FreeTool, ToolAccessRequest
 from auth import get_password_hash
+from trending_calculator import trending_aggregates, analytics_snapshot
+from view_counter import view_counter
+from search_history import search_history_writer
+from search_index import tool_index, free_tool_index
+from pagination import count_cache
+from category_stats import tool_category_analytics, blog_category_stats
+from auth import auth_user_cache
+from database import sticky_reads
+from search_cache import search_cache
+from search_service import search_service
+import asyncio
 import uuid
 
+# Buffered views and search history are flushed explicitly against the test session
+view_counter.stop()
+search_history_writer.stop()
+
 # Test database URL - use in-memory SQLite for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
@@ -17,10 +34,26 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def db():
     """Create a test database session"""
     Base.metadata.create_all(bind=engine)
+    trending_aggregates.invalidate()
+    analytics_snapshot.invalidate()
+    tool_index.clear()
+    free_tool_index.clear()
+    count_cache.clear()
+    tool_category_analytics.clear()
+    blog_category_stats.clear()
+    auth_user_cache.clear()
+    sticky_reads.clear()
+    asyncio.run(search_cache.clear())
+    search_history_writer.clear()
+    search_service.reset_guards()
     db = TestingSessionLocal()
     try:
         yield db
@@ -37,7 +70,13 @@ def client(db):
         finally:
             pass  # Don't close the db session here
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -0,0 +1,121 @@
+"""
+Local stand-in for the Google and Bing search APIs and Groq chat completions
+
+Serves the APIs' response shapes from 127.0.0.1 on a free port, in a
+thread with its own event loop, so it answers requests from any test
+client or asyncio.run(). Latency and failures are set per test:
+
+    upstream.delay = 0.5          # every response takes 0.5s
+    upstream.delays.extend([2])   # ...except the next one, which takes 2s
+    upstream.status = 503         # respond with this error status
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Optional
+from aiohttp import web
+
+class FakeUpstream:
+    def __init__(self):
+        self.delay = 0.0
+        self.delays = deque()
+        self.status = 200
+        self.requests = 0
+        self.port = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/search"
+
+    async def _respond(self) -> Optional[web.Response]:
+        """Delay; an error response if one is configured"""
+        self.requests += 1
+        delay = self.delays.popleft() if self.delays else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        if self.status >= 400:
+            return web.json_response({"error": "fake upstream failure"}, status=self.status)
+        return None
+
+    async def _handle_chat(self, request: web.Request) -> web.Response:
+        error = await self._respond()
+        if error is not None:
+            return error
+        body = await request.json()
+        return web.json_response({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": f"Generated: {body['messages'][-1]['content'][:40]}"},
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        })
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        error = await self._respond()
+        if error is not None:
+            return error
+
+        query = request.query.get("q", "")
+        return web.json_response({
+            # Google
+            "items": [{"title": f"Result for {query}", "link": "https://example.org/", "snippet": "", "displayLink": "example.org"}],
+            "searchInformation": {"totalResults": "42"},
+            # Bing
+            "webPages": {
+                "value": [{"name": f"Result for {query}", "url": "https://example.org/", "snippet": "", "displayUrl": "example.org"}],
+                "totalEstimatedMatches": 42,
+            },
+        })
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get("/search", self._handle)
+        # Groq SDK (base_url) and OpenAI SDK (base_url + "/openai/v1") paths
+        app.router.add_post("/openai/v1/chat/completions", self._handle_chat)
+        self._runner = web.AppRunner(app, shutdown_timeout=0.1)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def start(self) -> "FakeUpstream":
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._serve())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait(5)
+        return self
+
+    async def _shutdown(self):
+        await self._runner.cleanup()
+        # Handlers still sleeping on a delay
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from models import Blog, Comment
+from datetime import datetime, timedelta
 import uuid
 
 class TestBlogsRetrieval:
@@ -49,6 +50,66 @@ class TestBlogsRetrieval:
         data = response.json()
         assert isinstance(data, list)
     
+    def test_get_blogs_with_cursor(self, client, db, test_user, test_category):
+        """Test keyset pagination over blogs sorted by views"""
+        for i in range(5):
+            db.add(Blog(
+                id=str(uuid.uuid4()),
+                title=f"Blog {i}",
+                content="Content",
+                author_id=test_user.id,
+                category_id=test_category.id,
+                status="published",
+                views=i % 3,
+                slug=f"blog-{i}"
+            ))
+        db.commit()
+        
+        expected = [b["title"] for b in client.get("/api/blogs?sort_by=views&limit=10&cursor=").json()]
+        assert len(expected) == 5
+        
+        titles, cursor = [], ""
+        while cursor is not None:
+            response = client.get("/api/blogs", params={"sort_by": "views", "limit": 2, "cursor": cursor})
+            assert response.status_code == 200
+            titles += [b["title"] for b in response.json()]
+            cursor = response.headers.get("x-next-cursor")
+        assert titles == expected
+        
+        response = client.get("/api/blogs", params={"sort_by": "likes", "cursor": "not-a-cursor"})
+        assert response.status_code == 400
+    
+    def test_get_blogs_with_cursor_default_sort(self, client, db, test_user, test_category):
+        """Test keyset pagination on created_at, stored by the database with and without fractions"""
+        for i in range(5):
+            db.add(Blog(
+                id=str(uuid.uuid4()),
+                title=f"Blog {i}",
+                content="Content",
+                author_id=test_user.id,
+                category_id=test_category.id,
+                status="published",
+                slug=f"blog-{i}",
+                # Most rows get the server default (whole seconds), like create_blog
+                created_at=datetime.utcnow() - timedelta(days=1, microseconds=i) if i == 4 else None
+            ))
+        db.commit()
+        
+        expected = [b["title"] for b in client.get("/api/blogs?limit=10").json()]
+        assert len(expected) == 5
+        
+        titles, cursor = [], ""
+        for _ in range(5):
+            response = client.get("/api/blogs", params={"limit": 2, "cursor": cursor})
+            assert response.status_code == 200
+            titles += [b["title"] for b in response.json()]
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert cursor is None
+        assert sorted(titles) == sorted(expected)
+        assert titles[-1] == "Blog 4"
+    
     def test_get_blog_by_id(self, client, test_blog):
         """Test getting blog by ID"""
         response = client.get(f"/api/blogs/{test_blog.id}")
@@ -59,6 +120,20 @@ class TestBlogsRetrieval:
         assert data["title"] == test_blog.title
         assert data["content"] == test_blog.content
     
+    def test_get_blog_views_are_buffered(self, client, test_blog, db):
+        """Test that blog views are written by the view counter flush"""
+        from view_counter import view_counter
+        
+        client.get(f"/api/blogs/{test_blog.id}")
+        client.get(f"/api/blogs/slug/{test_blog.slug}")
+        
+        db.refresh(test_blog)
+        assert test_blog.views == 0
+        
+        view_counter.flush(db)
+        db.refresh(test_blog)
+        assert test_blog.views == 2
+    
     def test_get_blog_by_id_not_found(self, client):
         """Test getting non-existent blog"""
         fake_blog_id = str(uuid.uuid4())
@@ -413,6 +488,19 @@ class TestBlogsAnalytics:
         data = response.json()
         assert isinstance(data, list)
     
+    def test_blog_category_stats_follow_likes(self, client, test_blog, test_category, auth_headers):
+        """Test that category stats are grouped and refreshed after a like"""
+        def category_entry():
+            data = client.get("/api/blogs/categories/stats").json()
+            return next(entry for entry in data if entry["category_id"] == test_category.id)
+        
+        entry = category_entry()
+        assert entry["blog_count"] == 1
+        assert entry["total_likes"] == 0
+        
+        assert client.post(f"/api/blogs/{test_blog.id}/like", headers=auth_headers).status_code == 200
+        assert category_entry()["total_likes"] == 1
+    
     def test_get_author_stats(self, client, auth_headers):
         """Test getting author statistics"""
         response = client.get("/api/blogs/authors/stats", headers=auth_headers)
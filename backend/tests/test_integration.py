@@ -1,6 +1,31 @@
 import pytest
 from fastapi.testclient import TestClient
-from models import User, Tool, Blog, Category, FreeTool
+from fastapi import Request
+from sqlalchemy import create_engine, desc, inspect, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.pool import NullPool
+from models import Base, User, Tool, Blog, Category, FreeTool, Review, Comment, SearchHistory
+from db_pool import create_pooled_engine, async_database_url, pool_stats
+from db_routing import ReplicaSet, RoutingSession
+from migrations import MIGRATIONS, applied_versions, run_migrations
+from cors import OriginMatcher
+from ai_clients import AIClients, ProviderBusyError, ai_clients
+from ai_services import GroqService
+from groq_service import groq_service
+from tests.fake_upstream import FakeUpstream
+from request_logging import DroppingQueueHandler, StructuredFormatter, redact_headers, request_log_policy
+import asyncio
+import database
+import fulltext_search
+import migrations
+import json
+import logging
+import queue
+import server
+import time
 import uuid
 
 class TestIntegration:
@@ -308,4 +333,485 @@ class TestIntegration:
         # Admin should not access superadmin endpoints
         for endpoint in superadmin_accessible:
             response = client.get(endpoint, headers=admin_headers)
-            assert response.status_code == 403, f"Admin should not access {endpoint}"
\ No newline at end of file
+            assert response.status_code == 403, f"Admin should not access {endpoint}"
+
+class TestDatabasePool:
+    """Test the configured connection pool"""
+    
+    def test_pool_metrics_reported_by_debug_endpoint(self, client):
+        """Test that /api/debug/connectivity reports the instrumented pool"""
+        response = client.get("/api/debug/connectivity")
+        assert response.status_code == 200
+        
+        pool = response.json()["database_info"]["pool"]
+        assert pool["pool_class"] == "InstrumentedQueuePool"
+        assert pool["checkouts"] >= 1
+        assert pool["size"] == response.json()["database_info"]["engine_pool_size"]
+        assert set(pool["wait_ms"]) == {"avg", "p95", "max"}
+    
+    def test_statement_timeout_interrupts_long_queries(self, tmp_path):
+        """Test that statements past the timeout are interrupted"""
+        engine = create_pooled_engine(f"sqlite:///{tmp_path}/timeout.db", statement_timeout_ms=50)
+        endless = text("WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r) SELECT count(*) FROM r")
+        
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(endless).scalar()
+            # The connection stays usable
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+        
+        assert pool_stats(engine)["checked_out"] == 0
+        engine.dispose()
+    
+    def test_async_database_url(self):
+        """Test that the async engine uses each backend's async driver"""
+        assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+        assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        assert async_database_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+
+class TestReadReplicas:
+    """Test read replica routing"""
+    
+    @staticmethod
+    def _database(path, category_name):
+        engine = create_engine(f"sqlite:///{path}")
+        Category.__table__.create(engine)
+        with engine.begin() as conn:
+            conn.execute(Category.__table__.insert().values(id=str(uuid.uuid4()), name=category_name))
+        engine.dispose()
+        return f"sqlite:///{path}"
+    
+    def test_routing_session_reads_replica_until_first_write(self, tmp_path):
+        """Test that reads go to the replica and everything after a write to the primary"""
+        primary = create_engine(self._database(tmp_path / "primary.db", "Primary"))
+        replica = create_engine(self._database(tmp_path / "replica.db", "Replica"))
+        
+        with RoutingSession(bind=primary, info={"replica": replica}) as session:
+            assert session.execute(select(Category.name)).scalar() == "Replica"
+            session.execute(update(Category).values(description="written"))
+            assert session.execute(select(Category.name)).scalar() == "Primary"
+            session.commit()
+        
+        with primary.connect() as conn:
+            assert conn.execute(select(Category.description)).scalar() == "written"
+        primary.dispose()
+        replica.dispose()
+    
+    def test_read_dependency_uses_replica_unless_sticky(self, tmp_path, monkeypatch):
+        """Test replica selection, read-your-writes and unhealthy replicas"""
+        primary = create_async_engine(
+            self._database(tmp_path / "primary.db", "Primary").replace("sqlite:", "sqlite+aiosqlite:"), poolclass=NullPool
+        )
+        replicas = ReplicaSet([self._database(tmp_path / "replica.db", "Replica")], poolclass=NullPool)
+        monkeypatch.setattr(database, "read_replicas", replicas)
+        monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(primary))
+        monkeypatch.setattr(database, "AsyncReadSessionLocal", async_sessionmaker(primary, sync_session_class=RoutingSession))
+        request = Request({"type": "http", "headers": [], "client": ("10.0.0.1", 1234)})
+        
+        async def read_category_name():
+            dependency = database.get_async_read_db(request)
+            db = await dependency.__anext__()
+            try:
+                return (await db.execute(select(Category.name))).scalar()
+            finally:
+                await dependency.aclose()
+        
+        assert asyncio.run(read_category_name()) == "Replica"
+        
+        database.sticky_reads.mark("ip:10.0.0.1")
+        assert asyncio.run(read_category_name()) == "Primary"
+        database.sticky_reads.clear()
+        
+        replicas.mark_unhealthy(replicas.engines[0])
+        assert asyncio.run(read_category_name()) == "Primary"
+        assert replicas.stats()[0]["healthy"] is False
+        
+        asyncio.run(replicas.check_health())
+        assert asyncio.run(read_category_name()) == "Replica"
+
+    def test_replica_health_checked_in_background(self, tmp_path, monkeypatch):
+        """Test that choosing a replica never probes and the background task restores one"""
+        replicas = ReplicaSet([self._database(tmp_path / "replica.db", "Replica")], health_interval=0.01, poolclass=NullPool)
+        probes = []
+        check_health = replicas.check_health
+
+        async def counted_check_health():
+            probes.append(1)
+            await check_health()
+
+        monkeypatch.setattr(replicas, "check_health", counted_check_health)
+        replicas.mark_unhealthy(replicas.engines[0])
+
+        async def run():
+            time.sleep(0.02)
+            assert replicas.choose() is None
+            assert probes == []
+
+            replicas.start_health_checks()
+            for _ in range(100):
+                if replicas.choose() is not None:
+                    break
+                await asyncio.sleep(0.01)
+            await replicas.stop_health_checks()
+
+        asyncio.run(run())
+        assert probes
+        assert replicas.stats()[0]["healthy"] is True
+
+    def test_category_caches_recomputed_on_primary(self, client, test_tool, test_category, tmp_path):
+        """Test that a replica missing a write never ends up in the category caches"""
+        # The replica has the category but not the tool written to the primary
+        url = self._database(tmp_path / "replica.db", test_category.name)
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(update(Category).values(id=test_category.id))
+        engine.dispose()
+        replica = create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:"), poolclass=NullPool)
+
+        async def replica_db():
+            async with async_sessionmaker(replica)() as db:
+                yield db
+
+        server.app.dependency_overrides[database.get_async_read_db] = replica_db
+        analytics = client.get("/api/tools/categories/analytics").json()
+        assert [(entry["category_name"], entry["tool_count"]) for entry in analytics] == [(test_category.name, 1)]
+        stats = client.get("/api/blogs/categories/stats").json()
+        assert [entry["category_name"] for entry in stats] == [test_category.name]
+
+    def test_successful_write_makes_client_sticky(self, client, auth_headers, tmp_path, monkeypatch):
+        """Test that a user's write pins their reads to the primary"""
+        monkeypatch.setattr(server, "read_replicas", ReplicaSet([f"sqlite:///{tmp_path}/replica.db"], poolclass=NullPool))
+        
+        assert not database.sticky_reads.is_sticky("user:testuser")
+        response = client.put("/api/auth/me", json={"full_name": "Renamed"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert database.sticky_reads.is_sticky("user:testuser")
+
+class TestSchemaMigrations:
+    """Test versioned migrations and the query indexes they manage"""
+    
+    def test_migrations_upgrade_existing_database(self, tmp_path):
+        """Test that a database created before the migrations gets the indexes once"""
+        engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_blogs_status_created_at"))
+            conn.execute(text("DROP INDEX ix_tools_category_rating"))
+        
+        assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+        assert run_migrations(engine) == []
+        assert applied_versions(engine) == {version for version, _, _ in MIGRATIONS}
+        
+        inspector = inspect(engine)
+        assert "ix_blogs_status_created_at" in {index["name"] for index in inspector.get_indexes("blogs")}
+        assert "ix_tools_category_rating" in {index["name"] for index in inspector.get_indexes("tools")}
+        engine.dispose()
+    
+    def test_migrations_applied_concurrently_are_skipped(self, tmp_path, monkeypatch):
+        """Test that a worker whose pending list is stale skips migrations another worker applied"""
+        engine = create_engine(f"sqlite:///{tmp_path}/shared.db")
+        run_migrations(engine)
+        
+        # This worker read the applied versions before the other one finished
+        monkeypatch.setattr(migrations, "applied_versions", lambda engine: set())
+        assert run_migrations(engine) == []
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar() == len(MIGRATIONS)
+        engine.dispose()
+    
+    def test_fulltext_search_detected_on_migrated_database(self, tmp_path, monkeypatch):
+        """Test that a process booting against an already-migrated database still uses FTS5"""
+        engine = create_engine(f"sqlite:///{tmp_path}/migrated.db")
+        run_migrations(engine)
+        
+        # A later boot: migrations have nothing to do, so FTS5 was never probed
+        monkeypatch.setattr(fulltext_search, "_sqlite_fts5_supported", None)
+        assert run_migrations(engine) == []
+        with Session(engine) as session:
+            assert fulltext_search.fulltext_backend(session) == "sqlite"
+        engine.dispose()
+
+    def test_migration_engine_has_no_statement_timeout(self, tmp_path, monkeypatch):
+        """Test that migrations are not interrupted by the request statement timeout"""
+        url = f"sqlite:///{tmp_path}/slow.db"
+        monkeypatch.setattr(database, "DATABASE_URL", url)
+        slow = text("WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < 1000000) SELECT count(*) FROM r")
+
+        engine = create_pooled_engine(url, statement_timeout_ms=1)
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(slow).scalar()
+        engine.dispose()
+
+        engine = database.create_migration_engine()
+        with engine.connect() as conn:
+            assert conn.execute(slow).scalar() == 1000000
+        engine.dispose()
+
+    def test_index_migration_builds_concurrently_on_postgresql(self):
+        """Test that the index migration creates its indexes without blocking writes on PostgreSQL"""
+        (migrate,) = [migrate for version, _, migrate in MIGRATIONS if version == 4]
+        assert migrate.concurrently
+
+        index = next(index for index in Tool.__table__.indexes if index.name == "ix_tools_category_rating")
+        assert migrations.concurrent_index_ddl(index, psycopg2.dialect()) == (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tools_category_rating ON tools (category_id, rating)"
+        )
+
+    @pytest.mark.parametrize("shape, index", [
+        (lambda db: db.query(Blog).filter(Blog.status == "published").order_by(desc(Blog.created_at), desc(Blog.id)).limit(20),
+         "ix_blogs_status_created_at"),
+        (lambda db: db.query(Blog).filter(Blog.author_id == "a", Blog.status == "published"), "ix_blogs_author_status"),
+        (lambda db: db.query(Tool).filter(Tool.category_id == "c").order_by(desc(Tool.rating)).limit(20), "ix_tools_category_rating"),
+        (lambda db: db.query(Tool).order_by(desc(Tool.trending_score)).limit(10), "ix_tools_trending_score"),
+        (lambda db: db.query(Tool).filter(Tool.is_hot == True).order_by(desc(Tool.trending_score)).limit(10),
+         "ix_tools_is_hot_trending_score"),
+        (lambda db: db.query(Tool).filter(Tool.assigned_admin_id == "a"), "ix_tools_assigned_admin_id"),
+        (lambda db: db.query(Review).filter(Review.tool_id == "t").order_by(desc(Review.created_at), desc(Review.id)).limit(20),
+         "ix_reviews_tool_created_at"),
+        (lambda db: db.query(Comment).filter(Comment.blog_id == "b", Comment.is_approved == True).limit(50),
+         "ix_comments_blog_created_at"),
+        (lambda db: db.query(SearchHistory).filter(SearchHistory.tool_id == "t").order_by(desc(SearchHistory.created_at)).limit(20),
+         "ix_search_history_tool_created_at"),
+    ])
+    def test_query_plan_uses_index(self, db, shape, index):
+        """Test that EXPLAIN QUERY PLAN reads each listing query from its index without sorting"""
+        statement = shape(db).statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+        plan = " | ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+        
+        assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+class TestRequestLogging:
+    """Test sampled, redacted request logging"""
+    
+    @staticmethod
+    def _request_records(caplog):
+        return [record for record in caplog.records if record.name == "request"]
+    
+    def test_successful_requests_are_sampled(self, client, caplog, monkeypatch):
+        """Test that successful requests are skipped at sample rate 0 and logged at 1"""
+        monkeypatch.setattr(request_log_policy, "sample_rate", 0.0)
+        with caplog.at_level(logging.INFO, logger="request"):
+            assert client.get("/api/health").status_code == 200
+        assert self._request_records(caplog) == []
+        
+        monkeypatch.setattr(request_log_policy, "sample_rate", 1.0)
+        with caplog.at_level(logging.INFO, logger="request"):
+            response = client.get("/api/health")
+        records = self._request_records(caplog)
+        assert len(records) == 1
+        assert records[0].levelno == logging.INFO
+        assert records[0].fields["request_id"] == response.headers["X-Request-ID"]
+        assert "headers" not in records[0].fields
+    
+    def test_errors_and_slow_requests_always_logged_with_redacted_headers(self, client, caplog, monkeypatch):
+        """Test that failed and slow requests bypass sampling and never log credentials"""
+        monkeypatch.setattr(request_log_policy, "sample_rate", 0.0)
+        with caplog.at_level(logging.INFO, logger="request"):
+            client.get("/api/auth/me", headers={"Authorization": "Bearer secret-token"})
+        record, = self._request_records(caplog)
+        assert record.levelno == logging.WARNING
+        assert record.fields["status"] == 401
+        assert record.fields["headers"]["authorization"] == "Bearer [REDACTED]"
+        assert "secret-token" not in StructuredFormatter(json_lines=True).format(record)
+        
+        caplog.clear()
+        monkeypatch.setattr(request_log_policy, "slow_ms", 0.0)
+        with caplog.at_level(logging.INFO, logger="request"):
+            client.get("/api/health")
+        record, = self._request_records(caplog)
+        assert record.levelno == logging.WARNING
+        assert record.fields["status"] == 200
+    
+    def test_redact_headers(self):
+        """Test that credentials are removed from logged headers"""
+        redacted = redact_headers({"Authorization": "Basic dXNlcjpwYXNz", "Cookie": "session=abc", "Accept": "*/*"})
+        assert redacted == {"Authorization": "Basic [REDACTED]", "Cookie": "[REDACTED]", "Accept": "*/*"}
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test that logging never blocks when the listener falls behind"""
+        handler = DroppingQueueHandler(queue.Queue(1))
+        logger = logging.getLogger("test-dropping-queue")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            logger.warning("first")
+            logger.warning("second")
+        finally:
+            logger.removeHandler(handler)
+        
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+
+    def test_exception_survives_the_queue(self):
+        """Test that a logged exception reaches the listener's formatter as its own field"""
+        handler = DroppingQueueHandler(queue.Queue())
+        logger = logging.getLogger("test-queued-exception")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logger.exception("Search failed for %s", "crm")
+        finally:
+            logger.removeHandler(handler)
+
+        record = handler.queue.get_nowait()
+        entry = json.loads(StructuredFormatter(json_lines=True).format(record))
+        assert entry["message"] == "Search failed for crm"
+        assert "ZeroDivisionError" in entry["exception"]
+
+        line = StructuredFormatter().format(record)
+        assert line.count("Traceback") == 1
+
+    def test_json_lines_format(self):
+        """Test that structured fields are written as one JSON object"""
+        record = logging.LogRecord("request", logging.INFO, __file__, 1, "GET /api/health 200 1.0ms", None, None)
+        record.fields = {"status": 200, "path": "/api/health"}
+        entry = json.loads(StructuredFormatter(json_lines=True).format(record))
+        assert entry["message"] == "GET /api/health 200 1.0ms"
+        assert entry["status"] == 200
+        assert entry["level"] == "INFO"
+
+class TestCORS:
+    """Test the CORS layer and its origin matching"""
+    
+    def test_preflight_answered_for_pattern_origin(self, client, monkeypatch):
+        """Test that preflights are answered by the middleware and echo matched origins"""
+        monkeypatch.setattr(server.cors_origins, "allow_all", False)
+        origin = "https://my-space-3000.app.github.dev"
+        response = client.options("/api/tools/search", headers={
+            "Origin": origin,
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "Authorization, Content-Type"
+        })
+        
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == origin
+        assert response.headers["access-control-allow-credentials"] == "true"
+        assert response.headers["access-control-allow-headers"] == "Authorization, Content-Type"
+        assert response.headers["access-control-max-age"] == "86400"
+        assert "x-request-id" not in response.headers  # never reached the app
+    
+    def test_unknown_origin_rejected_without_wildcard(self, client, monkeypatch):
+        """Test that origins outside the list and patterns get no CORS headers"""
+        monkeypatch.setattr(server.cors_origins, "allow_all", False)
+        
+        response = client.get("/api/health", headers={"Origin": "https://evil.example.com"})
+        assert response.status_code == 200
+        assert "access-control-allow-origin" not in response.headers
+        
+        response = client.get("/api/health", headers={"Origin": "http://localhost:3000"})
+        assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+        
+        response = client.options("/api/health", headers={
+            "Origin": "https://github.dev.evil.example.com", "Access-Control-Request-Method": "GET"
+        })
+        assert response.status_code == 400
+    
+    def test_origin_decisions_cached_and_bounded(self):
+        """Test that pattern decisions are cached in a bounded LRU"""
+        matcher = OriginMatcher(["http://localhost:3000"], cache_size=2)
+        
+        assert matcher.is_allowed("https://a.emergentagent.com")
+        assert matcher.is_allowed("https://a.emergentagent.com")
+        assert not matcher.is_allowed("https://a.emergentagent.com.evil.io")
+        assert not matcher.is_allowed("http://a.github.dev")
+        assert matcher.is_allowed("http://localhost:3000")
+        
+        stats = matcher.stats()
+        assert stats["cached"] == 2
+        assert stats["hits"] == 1
+        assert stats["misses"] == 3
+
+class TestAIClients:
+    """Test async LLM clients, their shared pools and per-provider limits"""
+    
+    @pytest.fixture
+    def upstream(self):
+        fake = FakeUpstream().start()
+        yield fake
+        fake.stop()
+    
+    def test_generation_does_not_block_event_loop(self, upstream, monkeypatch):
+        """Test that other work keeps running while a completion is awaited"""
+        monkeypatch.setenv("GROQ_BASE_URL", upstream.base_url)
+        monkeypatch.setattr(groq_service, "api_key", "test-key")
+        upstream.delay = 0.3
+        
+        async def scenario():
+            ai_clients.groq("warm-up")  # one-off SDK and pool setup
+            gaps = []
+            done = asyncio.Event()
+            
+            async def ticker():
+                last = time.perf_counter()
+                while not done.is_set():
+                    await asyncio.sleep(0.01)
+                    now = time.perf_counter()
+                    gaps.append(now - last)
+                    last = now
+            
+            ticks = asyncio.create_task(ticker())
+            results = await asyncio.gather(
+                groq_service.generate_blog_content("CRM tools", title="CRM"),
+                groq_service.generate_blog_title("CRM tools"),
+            )
+            done.set()
+            await ticks
+            await ai_clients.close()
+            return results, gaps
+        
+        (content, titles), gaps = asyncio.run(scenario())
+        assert content["success"], content
+        assert content["content"].startswith("Generated:")
+        assert titles["success"], titles
+        assert upstream.requests == 2
+        assert len(gaps) > 10
+        assert max(gaps) < 0.1
+    
+    def test_openai_compatible_groq_service(self, upstream):
+        """Test the OpenAI-SDK Groq service on the shared pool"""
+        service = GroqService("test-key")
+        service.base_url = f"{upstream.base_url}/openai/v1"
+        
+        async def scenario():
+            first = await service.generate_content("Describe a CRM", "tool_description")
+            # Clients for different keys share one connection pool
+            assert ai_clients.openai("a")._client is ai_clients.openai("b")._client
+            await ai_clients.close()
+            return first
+        
+        result = asyncio.run(scenario())
+        assert result["provider"] == "groq"
+        assert result["tokens_used"] == 15
+    
+    def test_provider_concurrency_limit(self):
+        """Test that calls beyond the provider limit queue, and time out when stuck"""
+        clients = AIClients({"groq": 2}, queue_timeout=0.05)
+        active = []
+        peak = []
+        
+        async def call():
+            async with clients.limit("groq"):
+                active.append(1)
+                peak.append(len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+        
+        async def scenario():
+            await asyncio.gather(*(call() for _ in range(6)))
+            async with clients.limit("groq"), clients.limit("groq"):
+                with pytest.raises(ProviderBusyError):
+                    async with clients.limit("groq"):
+                        pass
+        
+        asyncio.run(scenario())
+        assert max(peak) == 2
+        stats = clients.stats()["providers"]["groq"]
+        assert stats["calls"] == 8
+        assert stats["rejected"] == 1
+        assert stats["in_flight"] == 0
@@ -176,6 +176,23 @@ class TestSuperAdminRoleManagement:
         assert response.status_code == 200
         assert f"Admin {test_admin.username} demoted to user" in response.json()["message"]
     
+    def test_demote_takes_effect_on_cached_token(self, client, db, test_admin, admin_headers, superadmin_headers):
+        """Test that demoting an admin evicts their cached authentication"""
+        response = client.get("/api/admin/reviews", headers=admin_headers)
+        assert response.status_code == 200
+        
+        # Served from the cache: no users row needed in the session
+        db.expunge_all()
+        response = client.get("/api/admin/reviews", headers=admin_headers)
+        assert response.status_code == 200
+        
+        response = client.post(f"/api/superadmin/users/{test_admin.id}/demote", headers=superadmin_headers)
+        assert response.status_code == 200
+        
+        db.expunge_all()
+        response = client.get("/api/admin/reviews", headers=admin_headers)
+        assert response.status_code == 403
+    
     def test_demote_user_not_found(self, client, superadmin_headers):
         """Test demoting non-existent user"""
         fake_user_id = str(uuid.uuid4())
@@ -1,7 +1,26 @@
 import pytest
 from fastapi.testclient import TestClient
-from models import Tool, Review, FreeTool, SearchHistory
+from models import User, Tool, Review, FreeTool, SearchHistory, SearchResultBlob
+from search_index import tool_index, free_tool_index
+import search_index
+import scheduler
+from scheduler import TrendingUpdater
+from search_service import search_service
+from http_client import SharedHTTPClient, http_client
+from search_history import search_history_writer, load_results
+from search_cache import search_cache, SearchResultCache, MemorySearchCacheBackend, RedisSearchCacheBackend
+from circuit_breaker import CircuitBreaker, CircuitOpenError, UpstreamGuard
+from tests.fake_upstream import FakeUpstream
+from pagination import explain_statement
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg2
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta
 import uuid
+import database
 
 class TestToolsAnalytics:
     """Test tools analytics endpoints"""
@@ -23,13 +42,51 @@ class TestToolsAnalytics:
         for field in data:
             assert isinstance(data[field], list)
     
-    def test_get_tools_analytics_with_recalculation(self, client):
+    def test_get_tools_analytics_with_recalculation(self, client, admin_headers):
         """Test getting tools analytics with recalculation"""
-        response = client.get("/api/tools/analytics?recalculate=true")
+        response = client.get("/api/tools/analytics?recalculate=true", headers=admin_headers)
         assert response.status_code == 200
         
         data = response.json()
         assert "trending_tools" in data
+    
+    def test_tools_analytics_recalculation_requires_admin(self, client, auth_headers):
+        """Test that only admins can force a full trending recompute"""
+        assert client.get("/api/tools/analytics?recalculate=true").status_code == 401
+        assert client.get("/api/tools/analytics?recalculate=true", headers=auth_headers).status_code == 403
+        assert client.get("/api/tools/analytics", headers=auth_headers).status_code == 200
+    
+    def test_tools_analytics_conditional_get(self, client, test_tool):
+        """Test that repeat visitors get 304 from the analytics snapshot"""
+        response = client.get("/api/tools/analytics")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+        
+        response = client.get("/api/tools/analytics", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        
+        response = client.get("/api/tools/analytics", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+    
+    def test_tools_analytics_invalidated_on_tool_write(self, client, test_tool, test_category, superadmin_headers):
+        """Test that creating a tool rebuilds the analytics snapshot"""
+        etag = client.get("/api/tools/analytics").headers["etag"]
+        
+        response = client.post("/api/tools", json={
+            "name": "Featured Tool",
+            "description": "A featured tool",
+            "category_id": test_category.id,
+            "is_featured": True,
+            "slug": "featured-tool"
+        }, headers=superadmin_headers)
+        assert response.status_code == 200
+        
+        response = client.get("/api/tools/analytics", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert any(t["slug"] == "featured-tool" for t in response.json()["featured_tools"])
 
 class TestToolsSearch:
     """Test tools search endpoints"""
@@ -57,6 +114,145 @@ class TestToolsSearch:
         data = response.json()
         assert isinstance(data["tools"], list)
     
+    def test_advanced_search_relevance_ranking(self, client, db, test_category):
+        """Test that full-text relevance weights name above other fields"""
+        for name, short_description, features, description in [
+            ("Ledger Pro", "Accounting suite", None, "Invoices and payroll"),
+            ("Acme Books", "Invoicing for teams", None, "Bookkeeping with a ledger view"),
+            ("Acme Sheets", "Ledger tracking", None, "Spreadsheets"),
+            ("Unrelated", "Chat app", None, "Team messaging"),
+        ]:
+            db.add(Tool(
+                id=str(uuid.uuid4()),
+                name=name,
+                short_description=short_description,
+                features=features,
+                description=description,
+                category_id=test_category.id,
+                slug=name.lower().replace(" ", "-")
+            ))
+        db.commit()
+        
+        response = client.get("/api/tools/search?q=ledger")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["total"] == 3
+        assert [t["name"] for t in data["tools"]] == ["Ledger Pro", "Acme Sheets", "Acme Books"]
+    
+    def test_advanced_search_index_follows_updates(self, client, db, test_tool):
+        """Test that the search index tracks tool edits"""
+        assert client.get("/api/tools/search?q=quasar").json()["total"] == 0
+        
+        test_tool.short_description = "Quasar analytics"
+        db.commit()
+        assert client.get("/api/tools/search?q=quasar").json()["total"] == 1
+        
+        db.delete(test_tool)
+        db.commit()
+        assert client.get("/api/tools/search?q=quasar").json()["total"] == 0
+    
+    def test_advanced_search_facet_counts(self, client, db, test_category):
+        """Test facet counts: each facet ignores its own filter"""
+        for name, pricing_model, is_hot in [
+            ("Ledger Free", "Free", True),
+            ("Ledger Plus", "Freemium", False),
+            ("Ledger Max", "Paid", False),
+            ("Chat Hub", "Free", False),
+        ]:
+            db.add(Tool(
+                id=str(uuid.uuid4()),
+                name=name,
+                description="Business software",
+                pricing_model=pricing_model,
+                is_hot=is_hot,
+                category_id=test_category.id,
+                slug=name.lower().replace(" ", "-")
+            ))
+        db.commit()
+        
+        data = client.get("/api/tools/search?q=ledger&pricing_model=Free&include_facets=true").json()
+        assert data["total"] == 1
+        assert data["facets"]["pricing_model"] == {"Free": 1, "Freemium": 1, "Paid": 1}
+        assert data["facets"]["is_hot"] == {"true": 1}
+        
+        assert client.get("/api/tools/search").json()["facets"] is None
+    
+    def test_advanced_search_with_cursor(self, client, db, test_category):
+        """Test keyset pagination walks every tool exactly once"""
+        for i in range(5):
+            db.add(Tool(
+                id=str(uuid.uuid4()),
+                name=f"Tool {i}",
+                description="Business software",
+                views=i % 2,
+                category_id=test_category.id,
+                slug=f"tool-{i}"
+            ))
+        db.commit()
+        
+        expected = [t["name"] for t in client.get("/api/tools/search?sort_by=views&per_page=10&cursor=").json()["tools"]]
+        assert len(expected) == 5
+        
+        names, cursor = [], ""
+        while cursor is not None:
+            data = client.get("/api/tools/search", params={"sort_by": "views", "per_page": 2, "cursor": cursor}).json()
+            assert data["total"] is None
+            names += [t["name"] for t in data["tools"]]
+            cursor = data["next_cursor"]
+            assert data["has_next"] == (cursor is not None)
+        assert names == expected
+        
+        # A cursor only works with the sort it came from
+        cursor = client.get("/api/tools/search?sort_by=views&per_page=2&cursor=").json()["next_cursor"]
+        response = client.get("/api/tools/search", params={"sort_by": "name", "cursor": cursor})
+        assert response.status_code == 400
+    
+    def test_advanced_search_count_modes(self, client, db, test_category):
+        """Test totals for each count_mode"""
+        for i in range(5):
+            db.add(Tool(
+                id=str(uuid.uuid4()),
+                name=f"Tool {i}",
+                description="Business software",
+                category_id=test_category.id,
+                slug=f"tool-{i}"
+            ))
+        db.commit()
+        
+        data = client.get("/api/tools/search?per_page=2&count_mode=none").json()
+        assert data["total"] is None and data["total_pages"] is None
+        assert data["has_next"] is True
+        assert client.get("/api/tools/search?per_page=2&page=3&count_mode=none").json()["has_next"] is False
+        
+        data = client.get("/api/tools/search?per_page=2&count_mode=estimate").json()
+        assert data["total"] == 5 and data["total_pages"] == 3
+        
+        # Estimates are cached briefly; the last page is always exact
+        db.add(Tool(id=str(uuid.uuid4()), name="Tool 5", description="Business software",
+                    category_id=test_category.id, slug="tool-5"))
+        db.commit()
+        assert client.get("/api/tools/search?per_page=2&count_mode=estimate").json()["total"] == 5
+        assert client.get("/api/tools/search?per_page=2&page=3&count_mode=estimate").json()["total"] == 6
+        
+        assert client.get("/api/tools/search?count_mode=sometimes").status_code == 422
+    
+    def test_planner_estimate_statement_for_asyncpg(self, db):
+        """Test that the EXPLAIN for count_mode=estimate binds positionally on asyncpg"""
+        query = db.query(Tool).filter(Tool.category_id.in_(["a", "b"]), Tool.name.ilike("%crm%"))
+        
+        statement, params = explain_statement(query, asyncpg.dialect())
+        assert statement.startswith("EXPLAIN (FORMAT JSON) SELECT")
+        assert "POSTCOMPILE" not in statement
+        assert isinstance(params, tuple) and len(params) == 3
+        # $n placeholders take the n-th parameter, whatever their order in the text
+        in_list = re.search(r"IN \(\$(\d+)::VARCHAR, \$(\d+)::VARCHAR\)", statement).groups()
+        assert [params[int(n) - 1] for n in in_list] == ["a", "b"]
+        assert params[int(re.search(r"ILIKE \$(\d+)", statement).group(1)) - 1] == "%crm%"
+        
+        statement, params = explain_statement(query, psycopg2.dialect())
+        assert set(params.values()) == {"a", "b", "%crm%"}
+    
     def test_advanced_search_with_filters(self, client, test_category):
         """Test advanced search with filters"""
         response = client.get(f"/api/tools/search?category_id={test_category.id}&pricing_model=Freemium")
@@ -102,6 +298,180 @@ class TestToolsSearch:
         data = response.json()
         assert isinstance(data["tools"], list)
 
+class TestToolSearchIndex:
+    """Test the in-process search index behind /search"""
+    
+    def _add_tools(self, db, category, rows):
+        for name, short_description, pricing_model in rows:
+            db.add(Tool(
+                id=str(uuid.uuid4()),
+                name=name,
+                short_description=short_description,
+                description="Business software",
+                pricing_model=pricing_model,
+                category_id=category.id,
+                slug=name.lower().replace(" ", "-")
+            ))
+        db.commit()
+    
+    def test_memory_index_relevance_ranking(self, client, db, test_category):
+        """Test that BM25 ranking weights name above other fields"""
+        self._add_tools(db, test_category, [
+            ("Ledger Pro", "Accounting suite", "Paid"),
+            ("Acme Sheets", "Ledger tracking", "Free"),
+            ("Unrelated", "Chat app", "Free"),
+        ])
+        tool_index.rebuild(db)
+        
+        data = client.get("/api/tools/search?q=ledger").json()
+        assert data["total"] == 2
+        assert [t["name"] for t in data["tools"]] == ["Ledger Pro", "Acme Sheets"]
+        
+        # Last term matches as a prefix; every term must match
+        assert client.get("/api/tools/search?q=acme she").json()["total"] == 1
+        assert client.get("/api/tools/search?q=ledger chat").json()["total"] == 0
+    
+    def test_memory_index_serves_async_sessions(self, db, test_tool):
+        """Test that an index built through the sync driver serves the async one"""
+        tool_index.rebuild(db)
+        
+        async def ready_for_async_session():
+            async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+            try:
+                async with AsyncSession(async_engine) as async_db:
+                    return await async_db.run_sync(tool_index.ready_for)
+            finally:
+                await async_engine.dispose()
+        
+        assert asyncio.run(ready_for_async_session())
+    
+    def test_memory_index_facets_and_sorting(self, client, db, test_category):
+        """Test facet filters and non-relevance sorts from the index"""
+        self._add_tools(db, test_category, [
+            ("Zeta CRM", "Customer tool", "Free"),
+            ("Alpha CRM", "Customer tool", "Free"),
+            ("Beta CRM", "Customer tool", "Paid"),
+        ])
+        tool_index.rebuild(db)
+        
+        data = client.get("/api/tools/search?q=crm&pricing_model=Free&sort_by=name").json()
+        assert data["total"] == 2
+        assert [t["name"] for t in data["tools"]] == ["Alpha CRM", "Zeta CRM"]
+        
+        data = client.get(f"/api/tools/search?category_id={test_category.id}&per_page=2&page=2&sort_by=name").json()
+        assert data["total"] == 3
+        assert [t["name"] for t in data["tools"]] == ["Zeta CRM"]
+        assert data["has_prev"] is True and data["has_next"] is False
+    
+    def test_memory_index_facet_counts(self, client, db, test_category):
+        """Test facet counts computed from the index bitsets"""
+        self._add_tools(db, test_category, [
+            ("Ledger Free", "Books", "Free"),
+            ("Ledger Plus", "Books", "Freemium"),
+            ("Chat Hub", "Messaging", "Free"),
+        ])
+        tool_index.rebuild(db)
+        
+        data = client.get("/api/tools/search?q=ledger&pricing_model=Free&include_facets=true").json()
+        assert data["total"] == 1
+        assert data["facets"]["pricing_model"] == {"Free": 1, "Freemium": 1}
+        assert data["facets"]["is_featured"] == {"false": 1}
+    
+    def test_memory_index_follows_tool_writes(self, client, db, test_category, superadmin_headers):
+        """Test that create/update/delete routes update the index incrementally"""
+        tool_index.rebuild(db)
+        
+        response = client.post("/api/tools", json={
+            "name": "Nebula Desk",
+            "description": "Help desk",
+            "website_url": "https://example.com",
+            "pricing_model": "Free",
+            "category_id": test_category.id,
+            "slug": "nebula-desk"
+        }, headers=superadmin_headers)
+        assert response.status_code == 200
+        tool_id = response.json()["id"]
+        assert client.get("/api/tools/search?q=nebula").json()["total"] == 1
+        
+        response = client.put(f"/api/tools/{tool_id}", json={"name": "Orbit Desk"}, headers=superadmin_headers)
+        assert response.status_code == 200
+        assert client.get("/api/tools/search?q=nebula").json()["total"] == 0
+        assert client.get("/api/tools/search?q=orbit").json()["total"] == 1
+        
+        response = client.delete(f"/api/tools/{tool_id}", headers=superadmin_headers)
+        assert response.status_code == 200
+        assert client.get("/api/tools/search?q=orbit").json()["total"] == 0
+    
+    def test_memory_index_rebuilt_by_trending_cycle(self, client, db, test_category, monkeypatch):
+        """Test that tools written outside the routes become searchable after the next scheduled cycle"""
+        tool_index.rebuild(db)
+        self._add_tools(db, test_category, [("Quasar Desk", "Help desk", "Free")])  # e.g. a seed script
+        assert client.get("/api/tools/search?q=quasar").json()["total"] == 0
+        
+        monkeypatch.setattr(scheduler, "get_db", lambda: iter([db]))
+        TrendingUpdater().run_cycle()
+        assert client.get("/api/tools/search?q=quasar").json()["total"] == 1
+    
+    def test_memory_index_compaction(self, db, test_category):
+        """Test that purging deleted slots keeps results intact"""
+        self._add_tools(db, test_category, [
+            (f"Tool {i}", "Widget" if i % 10 == 0 else "Gadget", "Free") for i in range(80)
+        ])
+        tool_index.rebuild(db)
+        
+        for tool in db.query(Tool).filter(Tool.short_description == "Gadget").all():
+            tool_index.unindex(db, tool.id)
+        
+        assert tool_index.stats()["dead_slots"] < 72
+        ids, total = tool_index.search(q="widget", filters={"pricing_model": "Free"}, sort_by="name", descending=False)
+        assert total == 8
+        assert tool_index.search(q="gadget")[1] == 0
+        assert tool_index.stats()["documents"] == 8
+    
+    def test_memory_index_pages_match_full_ordering(self, db, test_category, monkeypatch):
+        """Test that pages taken from a bounded heap equal slices of the full ordering"""
+        self._add_tools(db, test_category, [
+            (f"Tool {i}", f"Gizmo w{min(i % 5, 2)}", "Free" if i % 2 else "Paid") for i in range(40)
+        ])
+        for i, tool in enumerate(db.query(Tool).order_by(Tool.name)):
+            tool.views = i % 7  # plenty of ties
+        db.commit()
+        tool_index.rebuild(db)
+        tool_index.unindex(db, db.query(Tool).filter(Tool.name == "Tool 3").one().id)
+        
+        for query in (
+            dict(sort_by="views"),
+            dict(sort_by="views", descending=False, filters={"pricing_model": "Free"}),
+            dict(q="gizmo"),
+            dict(q="w1", sort_by="name", descending=False),
+        ):
+            everything, total = tool_index.search(limit=None, **query)
+            pages = [tool_index.search(offset=offset, limit=5, **query) for offset in range(0, total, 5)]
+            assert [tool_id for ids, _ in pages for tool_id in ids] == everything
+            assert {page_total for _, page_total in pages} == {total}
+        
+        # Short prefixes only expand to the most frequent terms
+        assert tool_index.search(q="w")[1] == 39
+        monkeypatch.setattr(search_index, "MAX_PREFIX_EXPANSIONS", 1)
+        assert tool_index.search(q="w")[1] == 23  # "w2" only
+    
+    def test_free_tools_search_uses_index(self, client, db):
+        """Test that free tool text search is ranked by the index"""
+        for name, description in [("Word Counter", "Count words"), ("Case Converter", "Convert word case")]:
+            db.add(FreeTool(
+                id=str(uuid.uuid4()),
+                name=name,
+                description=description,
+                slug=name.lower().replace(" ", "-"),
+                is_active=True
+            ))
+        db.commit()
+        free_tool_index.rebuild(db)
+        
+        response = client.get("/api/free-tools?search=word")
+        assert response.status_code == 200
+        assert [t["name"] for t in response.json()] == ["Word Counter", "Case Converter"]
+
 class TestToolsRetrieval:
     """Test individual tool retrieval endpoints"""
     
@@ -137,6 +507,128 @@ class TestToolsRetrieval:
         assert response.status_code == 404
         assert "Tool not found" in response.json()["detail"]
 
+class TestToolsTrending:
+    """Test incremental trending score updates"""
+    
+    def test_view_rescores_tool_from_running_aggregates(self, client, test_tool, db):
+        """Test that a flushed page view bumps views and rescores via aggregates"""
+        from trending_calculator import trending_aggregates
+        from view_counter import view_counter
+        
+        response = client.get(f"/api/tools/{test_tool.id}")
+        assert response.status_code == 200
+        view_counter.flush(db)
+        
+        db.refresh(test_tool)
+        assert test_tool.views == 1
+        assert test_tool.trending_score > 0
+        assert trending_aggregates.loaded
+        assert trending_aggregates.tool_count == 1
+        assert trending_aggregates.total_views == 1
+    
+    def test_running_aggregates_match_reconcile(self, client, test_tool, test_category, db):
+        """Test that O(1) updates agree with a full reconcile"""
+        from trending_calculator import trending_aggregates
+        from view_counter import view_counter
+        
+        other = Tool(
+            id=str(uuid.uuid4()),
+            name="Other Tool",
+            description="Another tool",
+            category_id=test_category.id,
+            slug="other-tool",
+            views=10,
+            rating=4.0,
+            total_reviews=2
+        )
+        db.add(other)
+        db.commit()
+        
+        for _ in range(3):
+            client.get(f"/api/tools/{test_tool.id}")
+        client.get(f"/api/tools/slug/{other.slug}")
+        view_counter.flush(db)
+        
+        running = trending_aggregates.averages()
+        trending_aggregates.reconcile(db)
+        assert trending_aggregates.averages() == pytest.approx(running)
+        assert trending_aggregates.total_views == 14
+
+    def test_set_based_recompute_matches_python_formula(self, db, test_category):
+        """Test that the SQL trending recompute agrees with calculate_trending_score"""
+        from datetime import datetime, timedelta
+        from trending_calculator import calculate_trending_score, update_trending_scores
+        
+        now = datetime.utcnow()
+        specs = [
+            (0, 0.0, 0, 2, False, False),
+            (150, 4.5, 12, 10, True, False),
+            (40, 3.0, 3, 45, False, True),
+            (900, 5.0, 40, 200, True, True),
+        ]
+        for i, (views, rating, reviews, age_days, is_hot, is_featured) in enumerate(specs):
+            db.add(Tool(
+                id=str(uuid.uuid4()),
+                name=f"Scored Tool {i}",
+                description="Scored",
+                category_id=test_category.id,
+                slug=f"scored-tool-{i}",
+                views=views,
+                rating=rating,
+                total_reviews=reviews,
+                is_hot=is_hot,
+                is_featured=is_featured,
+                created_at=now - timedelta(days=age_days, hours=6)
+            ))
+        db.commit()
+        
+        result = update_trending_scores(db)
+        assert result["mode"] == "set_based"
+        assert result["updated_tools"] == len(specs)
+        assert "score_changes" not in result
+        
+        tools = db.query(Tool).populate_existing().all()
+        avg_views = sum(t.views for t in tools) / len(tools)
+        avg_reviews = sum(t.total_reviews for t in tools) / len(tools)
+        for tool in tools:
+            expected = calculate_trending_score(tool, avg_views, 0, avg_reviews)
+            assert tool.trending_score == pytest.approx(expected)
+        assert result["score_summary"]["max"] == pytest.approx(max(t.trending_score for t in tools))
+
+class TestViewCounter:
+    """Test write-behind view counting"""
+    
+    def test_detail_reads_do_not_write(self, client, test_tool, db):
+        """Test that views are buffered until the counter is flushed"""
+        from view_counter import view_counter
+        
+        for _ in range(3):
+            assert client.get(f"/api/tools/{test_tool.id}").status_code == 200
+        
+        db.refresh(test_tool)
+        assert test_tool.views == 0
+        assert view_counter.pending("tools", test_tool.id) == 3
+        
+        result = view_counter.flush(db)
+        assert result["views"] == 3
+        
+        db.refresh(test_tool)
+        assert test_tool.views == 3
+        assert view_counter.pending("tools", test_tool.id) == 0
+    
+    def test_free_tool_views_batched(self, client, test_free_tool, db):
+        """Test that free tool views by id and slug are combined in one flush"""
+        from view_counter import view_counter
+        
+        client.get(f"/api/free-tools/{test_free_tool.id}")
+        client.get(f"/api/free-tools/slug/{test_free_tool.slug}")
+        
+        result = view_counter.flush(db)
+        assert result["free_tools"] == 1
+        
+        db.refresh(test_free_tool)
+        assert test_free_tool.views == 2
+
 class TestToolsReviews:
     """Test tool review endpoints"""
     
@@ -161,6 +653,21 @@ class TestToolsReviews:
         assert data["user_id"] == test_user.id
         assert data["tool_id"] == test_tool.id
     
+    def test_review_listing_resolves_optional_user_from_request_session(self, client, test_tool, auth_headers):
+        """Test that optional auth marks own reviews without opening another session"""
+        review_data = {"rating": 4, "title": "Mine", "content": "My review.", "tool_id": test_tool.id}
+        assert client.post(f"/api/tools/{test_tool.id}/reviews", json=review_data, headers=auth_headers).status_code == 200
+        
+        checked_out = database.engine.pool.checkedout()
+        for _ in range(5):
+            response = client.get(f"/api/tools/{test_tool.id}/reviews", headers=auth_headers)
+            assert response.status_code == 200
+            assert response.json()[0]["is_own_review"] is True
+        
+        anonymous = client.get(f"/api/tools/{test_tool.id}/reviews")
+        assert anonymous.json()[0]["is_own_review"] is False
+        assert database.engine.pool.checkedout() == checked_out
+    
     def test_create_review_tool_not_found(self, client, auth_headers):
         """Test creating review for non-existent tool"""
         fake_tool_id = str(uuid.uuid4())
@@ -221,6 +728,28 @@ class TestToolsReviews:
         data = response.json()
         assert isinstance(data, list)
     
+    def test_get_tool_reviews_with_cursor(self, client, db, test_tool):
+        """Test keyset pagination over reviews, newest first, with created_at set by the database"""
+        for i in range(5):
+            user = User(
+                id=str(uuid.uuid4()), email=f"reviewer{i}@example.com", username=f"reviewer{i}",
+                full_name="Reviewer", hashed_password="x", is_active=True, is_verified=True
+            )
+            db.add(user)
+            db.add(Review(rating=4, title=f"Review {i}", content="Good", user_id=user.id, tool_id=test_tool.id))
+        db.commit()
+        
+        ids, cursor = [], ""
+        for _ in range(5):
+            response = client.get(f"/api/tools/{test_tool.id}/reviews", params={"limit": 2, "cursor": cursor})
+            assert response.status_code == 200
+            ids += [review["id"] for review in response.json()]
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert cursor is None
+        assert len(ids) == len(set(ids)) == 5
+    
     def test_update_review_not_found(self, client, auth_headers):
         """Test updating non-existent review"""
         fake_review_id = str(uuid.uuid4())
@@ -241,6 +770,57 @@ class TestToolsReviews:
         response = client.delete(f"/api/tools/reviews/{fake_review_id}", headers=auth_headers)
         assert response.status_code == 404
         assert "Review not found" in response.json()["detail"]
+    
+    def test_review_writes_apply_rating_deltas(self, client, db, test_tool, auth_headers, admin_headers):
+        """Test that review create/update/delete keep rating aggregates exact"""
+        def post_review(rating, headers):
+            response = client.post(f"/api/tools/{test_tool.id}/reviews", json={
+                "rating": rating, "title": "Review", "content": "Content", "tool_id": test_tool.id
+            }, headers=headers)
+            assert response.status_code == 200
+            return response.json()["id"]
+        
+        def tool_stats():
+            db.expire_all()
+            tool = db.query(Tool).filter(Tool.id == test_tool.id).first()
+            return tool.rating, tool.total_reviews, tool.rating_sum
+        
+        review_id = post_review(5, auth_headers)
+        post_review(2, admin_headers)
+        assert tool_stats() == (3.5, 2, 7)
+        
+        response = client.put(f"/api/tools/reviews/{review_id}", json={
+            "rating": 3, "title": "Review", "content": "Content", "tool_id": test_tool.id
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        assert tool_stats() == (2.5, 2, 5)
+        
+        assert client.delete(f"/api/tools/reviews/{review_id}", headers=auth_headers).status_code == 200
+        assert tool_stats() == (2.0, 1, 2)
+    
+    def test_reconcile_review_ratings_repairs_drift(self, db, test_tool, test_user):
+        """Test that reconciliation recomputes aggregates from the reviews"""
+        from review_ratings import reconcile_review_ratings
+        
+        db.add(Review(
+            id=str(uuid.uuid4()),
+            user_id=test_user.id,
+            tool_id=test_tool.id,
+            rating=4,
+            title="Review",
+            content="Content"
+        ))
+        test_tool.rating = 1.0
+        test_tool.total_reviews = 9
+        test_tool.rating_sum = 9
+        db.commit()
+        
+        repaired = reconcile_review_ratings(db)
+        assert repaired["tools"] == 1
+        
+        db.refresh(test_tool)
+        assert (test_tool.rating, test_tool.total_reviews, test_tool.rating_sum) == (4.0, 1, 4)
+        assert reconcile_review_ratings(db)["tools"] == 0
 
 class TestToolsCategories:
     """Test tool categories endpoints"""
@@ -271,6 +851,40 @@ class TestToolsCategories:
             assert "total_views" in analytics
             assert "recommended_tools" in analytics
 
+    def test_category_analytics_ranked_and_cached(self, client, db, test_category, test_tool, auth_headers):
+        """Test grouped category analytics and invalidation on review writes"""
+        for i, rating in enumerate([1.0, 4.5, 3.0, 5.0, 2.0, 4.0]):
+            db.add(Tool(
+                id=str(uuid.uuid4()),
+                name=f"Ranked {i}",
+                description="Business software",
+                rating=rating,
+                views=10,
+                category_id=test_category.id,
+                slug=f"ranked-{i}"
+            ))
+        db.commit()
+        
+        def category_entry():
+            data = client.get("/api/tools/categories/analytics").json()
+            return next(entry for entry in data if entry["category_id"] == test_category.id)
+        
+        entry = category_entry()
+        assert entry["tool_count"] == 7
+        assert entry["total_views"] == 60
+        assert [t["rating"] for t in entry["recommended_tools"]] == [5.0, 4.5, 4.0, 3.0, 2.0]
+        
+        # Served from cache until a tool in the category changes
+        db.query(Tool).filter(Tool.slug == "ranked-0").update({"views": 1000})
+        db.commit()
+        assert category_entry()["total_views"] == entry["total_views"]
+        
+        response = client.post(f"/api/tools/{test_tool.id}/reviews", json={
+            "rating": 5, "title": "Great", "content": "Works well", "tool_id": test_tool.id
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        assert category_entry()["total_views"] == entry["total_views"] + 990
+
 class TestFreeTools:
     """Test free tools endpoints"""
     
@@ -377,6 +991,355 @@ class TestFreeToolsSearch:
         assert response.status_code == 404
         assert "Free tool not found" in response.json()["detail"]
 
+    def test_combined_search_returns_partial_results_at_deadline(self, client, db, test_free_tool, monkeypatch):
+        """Test that engines run concurrently and a slow one is cut off at the deadline"""
+        async def slow_bing(query, num_results=10):
+            await asyncio.sleep(5)
+        
+        async def slow_google(query, num_results=10):
+            await asyncio.sleep(0.1)
+            return search_service._get_mock_google_results(query, num_results)
+        
+        monkeypatch.setattr(search_service, "deadline", 0.3)
+        monkeypatch.setattr(search_service, "search_google", slow_google)
+        monkeypatch.setattr(search_service, "search_bing", slow_bing)
+        
+        started = time.perf_counter()
+        response = client.post(
+            f"/api/free-tools/{test_free_tool.id}/search/combined", json={"query": "crm", "engine": "google", "num_results": 3}
+        )
+        assert time.perf_counter() - started < 1
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert len(data["google"]["results"]) == 3
+        assert "bing" not in data
+        assert data["errors"]["bing"] == "timed out after 0.3s"
+        
+        search_history_writer.flush(db)
+        db.refresh(test_free_tool)
+        assert test_free_tool.searches_count == 1
+        assert db.query(SearchHistory).filter(SearchHistory.tool_id == test_free_tool.id).count() == 1
+    
+    def test_shared_http_client_reuses_session(self):
+        """Test that outbound calls share one pooled session per event loop"""
+        http = SharedHTTPClient(limit=10, limit_per_host=2)
+        
+        async def sessions():
+            first, second = http.session(), http.session()
+            assert first is second
+            assert first.connector.limit_per_host == 2
+            await http.close()
+            assert first.closed
+        
+        asyncio.run(sessions())
+        asyncio.run(sessions())
+        assert http.sessions_created == 2
+
+class TestSearchResultCache:
+    """Test the free-tool web search result cache"""
+    
+    @staticmethod
+    def _counting_search(calls, delay=0.0, fail=False):
+        async def search():
+            calls.append(1)
+            await asyncio.sleep(delay)
+            if fail:
+                raise RuntimeError("upstream down")
+            return search_service._get_mock_google_results("crm", 3)
+        return search
+    
+    def test_repeated_queries_served_from_cache(self, client, test_free_tool, monkeypatch):
+        """Test that the same normalized query calls the upstream API once"""
+        calls = []
+        monkeypatch.setattr(search_service, "google_api_key", "key")
+        monkeypatch.setattr(search_service, "google_cse_id", "cse")
+        monkeypatch.setattr(search_service, "_fetch_google", lambda query, num_results: self._counting_search(calls)())
+        hits = search_cache.hits
+        
+        for query in ("CRM  tools", "crm tools"):
+            response = client.post(
+                f"/api/free-tools/{test_free_tool.id}/search", json={"query": query, "engine": "google", "num_results": 3}
+            )
+            assert response.status_code == 200
+            assert response.json()["tool_id"] == test_free_tool.id
+        
+        assert len(calls) == 1
+        assert search_cache.hits == hits + 1
+        assert client.get("/api/debug/connectivity").json()["search_cache"]["entries"] == 1
+    
+    def test_concurrent_identical_searches_coalesced(self):
+        """Test that a burst of the same query makes one upstream call"""
+        cache = SearchResultCache(MemorySearchCacheBackend(), ttl=60)
+        calls = []
+        
+        async def burst():
+            search = self._counting_search(calls, delay=0.05)
+            return await asyncio.gather(*(cache.get_or_search("google", "crm", 3, search) for _ in range(20)))
+        
+        results = asyncio.run(burst())
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 19
+        assert len({id(result) for result in results}) == 20  # callers never share an instance
+    
+    def test_failures_not_cached_and_entries_expire(self):
+        """Test that errors are retried, and that entries expire and are LRU-bounded"""
+        calls = []
+        cache = SearchResultCache(MemorySearchCacheBackend(max_entries=2), ttl=60)
+        
+        async def scenario():
+            for _ in range(2):
+                with pytest.raises(RuntimeError):
+                    await cache.get_or_search("bing", "crm", 3, self._counting_search(calls, fail=True))
+            for query in ("a", "b", "c"):
+                await cache.get_or_search("bing", query, 3, self._counting_search(calls))
+        
+        asyncio.run(scenario())
+        assert len(calls) == 5
+        assert cache.backend.size() == 2
+        
+        expiring = SearchResultCache(MemorySearchCacheBackend(), ttl=0)
+        for _ in range(2):
+            asyncio.run(expiring.get_or_search("bing", "crm", 3, self._counting_search(calls)))
+        assert expiring.stats()["misses"] == 2
+    
+    def test_redis_backend_shares_entries(self):
+        """Test the Redis backend against a local stand-in speaking the same client API"""
+        class StandInRedis:
+            def __init__(self):
+                self.data = {}
+            async def get(self, key):
+                return self.data.get(key)
+            async def set(self, key, value, ex=None):
+                self.data[key] = value.encode()
+            async def scan_iter(self, match):
+                for key in list(self.data):
+                    if key.startswith(match.rstrip("*")):
+                        yield key
+            async def delete(self, key):
+                self.data.pop(key, None)
+        
+        server = StandInRedis()
+        calls = []
+        worker_a = SearchResultCache(RedisSearchCacheBackend(client=server))
+        worker_b = SearchResultCache(RedisSearchCacheBackend(client=server))
+        
+        first = asyncio.run(worker_a.get_or_search("google", "crm", 3, self._counting_search(calls)))
+        second = asyncio.run(worker_b.get_or_search("google", " CRM", 3, self._counting_search(calls)))
+        assert len(calls) == 1
+        assert second.results == first.results
+        
+        asyncio.run(worker_a.clear())
+        assert server.data == {}
+
+class TestSearchHistoryWriter:
+    """Test batched, deduplicated search history"""
+    
+    def test_searches_buffered_and_flushed_in_batches(self, client, db, test_free_tool):
+        """Test that searches are written on flush and identical results share one blob"""
+        for _ in range(3):
+            response = client.post(
+                f"/api/free-tools/{test_free_tool.id}/search",
+                json={"query": "crm", "engine": "google", "num_results": 3},
+                headers={"User-Agent": "x" * 1000}
+            )
+            assert response.status_code == 200
+        
+        assert db.query(SearchHistory).count() == 0
+        assert search_history_writer.pending() == 3
+        
+        assert search_history_writer.flush(db) == {"rows": 3, "blobs": 1}
+        history = db.query(SearchHistory).all()
+        assert len(history) == 3
+        assert {row.results_blob_id for row in history} == {history[0].results_blob_id}
+        assert history[0].results is None
+        assert len(history[0].user_agent) == 256
+        assert [result["title"] for result in load_results(db, history[0])] == [
+            result.title for result in search_service._get_mock_google_results("crm", 3).results
+        ]
+        
+        db.refresh(test_free_tool)
+        assert test_free_tool.searches_count == 3
+    
+    def test_deleted_tools_skipped(self, db, test_free_tool):
+        """Test that searches of a tool deleted before the flush are dropped"""
+        search_history_writer.record(test_free_tool.id, "google", "crm", [])
+        search_history_writer.record(str(uuid.uuid4()), "google", "crm", [])
+        
+        assert search_history_writer.flush(db)["rows"] == 1
+        assert search_history_writer.pending() == 0
+    
+    def test_compaction_removes_expired_rows_and_orphaned_blobs(self, db, test_free_tool):
+        """Test retention compaction"""
+        search_history_writer.record(test_free_tool.id, "google", "old", [{"title": "old"}])
+        search_history_writer.record(test_free_tool.id, "google", "new", [{"title": "new"}])
+        search_history_writer.flush(db)
+        old = db.query(SearchHistory).filter(SearchHistory.query == "old").one()
+        old.created_at = datetime.utcnow() - timedelta(days=100)
+        db.commit()
+        
+        assert search_history_writer.compact(db, retention_days=90) == {"rows": 1, "blobs": 1}
+        assert [row.query for row in db.query(SearchHistory)] == ["new"]
+        assert db.query(SearchResultBlob).count() == 1
+
+class TestSearchEngineCircuitBreaker:
+    """Test per-engine circuit breakers, adaptive timeouts and hedging against a fake upstream"""
+    
+    @pytest.fixture
+    def upstream(self):
+        fake = FakeUpstream().start()
+        yield fake
+        fake.stop()
+    
+    @staticmethod
+    def _guard(hedge=False, max_timeout=10.0, min_timeout=1.0, **breaker_settings):
+        settings = dict(failure_rate=0.5, min_calls=4, window=4, open_seconds=0.2)
+        settings.update(breaker_settings)
+        return UpstreamGuard(CircuitBreaker("google", **settings), max_timeout=max_timeout, min_timeout=min_timeout, hedge=hedge)
+    
+    @staticmethod
+    def _use_upstream(monkeypatch, upstream, guard):
+        monkeypatch.setattr(search_service, "google_api_key", "key")
+        monkeypatch.setattr(search_service, "google_cse_id", "cse")
+        monkeypatch.setattr(search_service, "google_url", upstream.url)
+        monkeypatch.setitem(search_service.guards, "google", guard)
+    
+    def test_breaker_opens_on_failures_and_closes_after_probe(self, client, test_free_tool, upstream, monkeypatch):
+        """Test closed -> open -> half-open -> closed as the upstream fails and recovers"""
+        guard = self._guard()
+        self._use_upstream(monkeypatch, upstream, guard)
+        upstream.status = 503
+        
+        def search(query):
+            response = client.post(
+                f"/api/free-tools/{test_free_tool.id}/search", json={"query": query, "engine": "google", "num_results": 3}
+            )
+            assert response.status_code == 200
+            return response.json()
+        
+        for i in range(4):
+            assert search(f"failing {i}")["total_results"] == 1000000  # mock fallback
+        assert upstream.requests == 4
+        assert client.get("/api/debug/connectivity").json()["search_engines"]["google"]["state"] == "open"
+        
+        # Open: falls back without calling the upstream
+        assert search("rejected")["total_results"] == 1000000
+        assert upstream.requests == 4
+        assert guard.rejected == 1
+        
+        # Half-open: a failed probe opens it again
+        time.sleep(0.25)
+        search("failed probe")
+        assert upstream.requests == 5
+        assert guard.breaker.state == CircuitBreaker.OPEN
+        
+        # Half-open: a good probe closes it
+        upstream.status = 200
+        time.sleep(0.25)
+        assert search("good probe")["total_results"] == 42
+        assert guard.breaker.state == CircuitBreaker.CLOSED
+        assert guard.breaker.times_opened == 2
+    
+    def test_slow_upstream_times_out_then_fails_fast(self, upstream, monkeypatch):
+        """Test that timeouts open the circuit so later searches do not wait"""
+        guard = self._guard(max_timeout=0.1)
+        self._use_upstream(monkeypatch, upstream, guard)
+        upstream.delay = 0.5
+        
+        async def scenario():
+            for i in range(4):
+                assert (await search_service.search_google(f"slow {i}", 3)).total_results == 1000000
+            started = time.perf_counter()
+            await search_service.search_google("fast fail", 3)
+            elapsed = time.perf_counter() - started
+            await http_client.close()
+            return elapsed
+        
+        assert asyncio.run(scenario()) < 0.05
+        assert guard.timeouts == 4
+        assert guard.rejected == 1
+        assert guard.breaker.state == CircuitBreaker.OPEN
+    
+    def test_latency_step_is_relearned_after_circuit_opens(self, upstream, monkeypatch):
+        """Test that an upstream settling at a higher latency recovers instead of timing out for good"""
+        guard = self._guard(max_timeout=2.0, min_timeout=0.1)
+        self._use_upstream(monkeypatch, upstream, guard)
+        upstream.delay = 0.01
+        
+        async def scenario():
+            fetch = lambda: search_service._fetch_google("step", 3)
+            for _ in range(20):
+                await guard.call(fetch)
+            assert guard.timeout() == 0.1
+            
+            # The upstream moves to 300ms: calls time out and the circuit opens
+            upstream.delay = 0.3
+            for _ in range(4):
+                with pytest.raises((asyncio.TimeoutError, CircuitOpenError)):
+                    await guard.call(fetch)
+            assert guard.breaker.state == CircuitBreaker.OPEN
+            assert guard.timeout() == 2.0
+            
+            # The probe runs with max_timeout and later calls relearn the latency
+            await asyncio.sleep(0.25)
+            results = [await guard.call(fetch) for _ in range(5)]
+            await http_client.close()
+            return results
+        
+        results = asyncio.run(scenario())
+        assert all(result.total_results == 42 for result in results)
+        assert guard.breaker.state == CircuitBreaker.CLOSED
+        assert guard.breaker.times_opened == 1
+        assert guard.timeouts == 2
+    
+    def test_hedged_request_after_p95(self, upstream, monkeypatch):
+        """Test that a call slower than the p95 latency is raced by a second one"""
+        guard = self._guard(hedge=True)
+        self._use_upstream(monkeypatch, upstream, guard)
+        for _ in range(20):
+            guard.latency.record(0.02)
+        upstream.delays.append(2.0)  # only the first request is slow
+        
+        async def scenario():
+            started = time.perf_counter()
+            result = await guard.call(lambda: search_service._fetch_google("hedged", 3))
+            elapsed = time.perf_counter() - started
+            await http_client.close()
+            return result, elapsed
+        
+        result, elapsed = asyncio.run(scenario())
+        assert result.total_results == 42
+        assert elapsed < 1
+        assert guard.hedged == 1
+        assert upstream.requests == 2
+    
+    def test_adaptive_timeout_tracks_observed_latency(self):
+        """Test that the timeout follows p99 latency within its bounds"""
+        guard = UpstreamGuard(CircuitBreaker("bing"), max_timeout=10.0, min_timeout=0.5, timeout_multiplier=2.0)
+        assert guard.timeout() == 10.0  # not enough samples yet
+        assert guard.hedge_delay() is None
+        
+        for _ in range(20):
+            guard.latency.record(0.1)
+        assert guard.timeout() == 0.5
+        
+        for _ in range(20):
+            guard.latency.record(2.0)
+        assert guard.timeout() == 4.0
+        
+        for _ in range(20):
+            guard.latency.record(8.0)
+        assert guard.timeout() == 10.0
+    
+    def test_slow_successes_count_against_breaker(self):
+        """Test that calls slower than the slow-call threshold open the circuit"""
+        breaker = CircuitBreaker("google", failure_rate=0.5, min_calls=4, window=4, slow_call_seconds=1.0)
+        for seconds in (0.1, 0.1, 1.5, 1.5):
+            assert breaker.allow()
+            breaker.record(seconds)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
 class TestToolsPublicAccess:
     """Test public access to tools endpoints"""
     
@@ -1,6 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
+from passlib.context import CryptContext
 from models import User
+from auth import password_hasher
 
 class TestUserAuthentication:
     """Test user authentication endpoints"""
@@ -94,6 +96,26 @@ class TestUserAuthentication:
         assert response.status_code == 401
         assert "Incorrect email or password" in response.json()["detail"]
     
+    def test_login_rehashes_password_at_configured_cost(self, client, db, test_user):
+        """Test that login upgrades hashes made with a different bcrypt cost"""
+        test_user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpass123")
+        db.commit()
+        
+        response = client.post("/api/auth/login", json={"email": test_user.email, "password": "testpass123"})
+        assert response.status_code == 200
+        
+        db.refresh(test_user)
+        assert not test_user.hashed_password.startswith("$2b$04$")
+        assert password_hasher.stats()["in_flight"] == 0
+    
+    def test_login_rejected_when_hash_pool_saturated(self, client, test_user, monkeypatch):
+        """Test that a full hashing queue answers 503 instead of queueing"""
+        monkeypatch.setattr(password_hasher, "in_flight", password_hasher.workers + password_hasher.max_queue)
+        
+        response = client.post("/api/auth/login", json={"email": test_user.email, "password": "testpass123"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+    
     def test_get_current_user(self, client, test_user, auth_headers):
         """Test getting current user info"""
         response = client.get("/api/auth/me", headers=auth_headers)
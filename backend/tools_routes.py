@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, asc
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, asc, cast, literal, select, String
+from database import get_db, get_async_db, get_async_read_db
 from models import *
 from schemas import *
-from auth import get_current_verified_user, get_current_user_optional, require_admin, require_superadmin
+from auth import get_current_verified_user, get_current_user_optional, require_admin
 from search_service import search_service
-from trending_calculator import get_trending_analytics, increment_view_and_update_trending
+from search_history import search_history_writer
+from trending_calculator import analytics_snapshot, update_trending_scores, after_trending_recompute, rescore_tool, trending_aggregates
+from view_counter import view_counter
+from fulltext_search import apply_fulltext_search
+from search_index import tool_index, free_tool_index, use_memory_index
+from category_stats import tool_category_analytics, category_names
+from review_ratings import apply_rating_delta
+from pagination import keyset_paginate, offset_paginate, encode_cursor, decode_cursor, count_rows
 from typing import Optional, List
 import uuid
-import json
 import math
-from jose import JWTError, jwt
 from datetime import datetime
 
 router = APIRouter(prefix="/api/tools", tags=["tools"])
@@ -19,23 +26,33 @@ router = APIRouter(prefix="/api/tools", tags=["tools"])
 # Enhanced Tools Routes with Advanced Filtering
 @router.get("/analytics")
 async def get_tools_analytics(
+    request: Request,
     recalculate: bool = False,
-    db: Session = Depends(get_db)
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get tools analytics for landing page with optional recalculation"""
-    
-    # Always recalculate trending scores to ensure fresh data
-    analytics = get_trending_analytics(db, recalculate=True)
-    
-    # Convert to the expected response format
-    return ToolAnalytics(
-        trending_tools=analytics["trending_tools"],
-        top_rated_tools=analytics["top_rated_tools"],
-        most_viewed_tools=analytics["most_viewed_tools"],
-        newest_tools=analytics["newest_tools"],
-        featured_tools=analytics["featured_tools"],
-        hot_tools=analytics["hot_tools"]
-    )
+    """Get tools analytics for landing page with optional recalculation (admins only)"""
+    # The snapshot is served from memory and rebuilt on the primary, never
+    # from a lagging replica; the session only connects to rebuild it
+    
+    # Scores are recomputed by the scheduler; admins can force a full recompute
+    if recalculate:
+        if current_user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+        if current_user.user_type not in ["admin", "superadmin"]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        await db.run_sync(update_trending_scores)
+        await db.run_sync(after_trending_recompute)
+    
+    snapshot = await db.run_sync(analytics_snapshot.get)
+    
+    if snapshot.not_modified(
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since")
+    ):
+        return Response(status_code=304, headers=snapshot.headers())
+    
+    return JSONResponse(content=snapshot.payload, headers=snapshot.headers())
 
 @router.get("/search")
 async def advanced_search_tools(
@@ -54,45 +71,127 @@ async def advanced_search_tools(
     sort_by: Optional[str] = Query("relevance"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    include_facets: bool = Query(False, description="Return per-value counts for the filter facets"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; empty for the first page"),
+    count_mode: Optional[str] = Query(None, pattern="^(exact|estimate|none)$", description="How `total` is computed"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Advanced search with pagination and filtering
+    
+    Passing `cursor` switches from page numbers to keyset pagination: the
+    response carries `next_cursor`. `count_mode` defaults to "exact" for page
+    numbers and "none" for cursors; with "estimate" or "none", has_next comes
+    from fetching one extra row. Searches answered by the in-process index
+    always report exact totals, which cost nothing there.
+    """
+    return await db.run_sync(
+        _search_tools, q, category_id, subcategory_id, pricing_model, company_size,
+        industry, employee_size, revenue_range, location, is_hot, is_featured, min_rating,
+        sort_by, page, per_page, include_facets, cursor, count_mode
+    )
+
+def _search_tools(
+    db: Session, q, category_id, subcategory_id, pricing_model, company_size,
+    industry, employee_size, revenue_range, location, is_hot, is_featured, min_rating,
+    sort_by, page, per_page, include_facets, cursor, count_mode
 ):
-    """Advanced search with pagination and filtering"""
+    if use_memory_index(db, tool_index):
+        return _search_tools_in_memory(
+            db, q, sort_by, page, per_page,
+            filters={
+                "category_id": category_id or None,
+                "subcategory_id": subcategory_id or None,
+                "pricing_model": pricing_model or None,
+                "company_size": company_size or None,
+                "industry": industry or None,
+                "employee_size": employee_size or None,
+                "revenue_range": revenue_range or None,
+                "is_hot": is_hot,
+                "is_featured": is_featured,
+            },
+            location=location,
+            min_rating=min_rating,
+            include_facets=include_facets,
+            cursor=cursor
+        )
     
     query = db.query(Tool)
+    relevance_order = None
     
-    # Text search
+    # Text search (full-text index where available, ILIKE otherwise)
     if q:
-        search_filter = (
-            Tool.name.ilike(f"%{q}%") | 
-            Tool.description.ilike(f"%{q}%") |
-            Tool.features.ilike(f"%{q}%") |
-            Tool.short_description.ilike(f"%{q}%")
-        )
-        query = query.filter(search_filter)
+        fulltext = apply_fulltext_search(query, db, q)
+        if fulltext:
+            query, relevance_order = fulltext
+        else:
+            search_filter = (
+                Tool.name.ilike(f"%{q}%") | 
+                Tool.description.ilike(f"%{q}%") |
+                Tool.features.ilike(f"%{q}%") |
+                Tool.short_description.ilike(f"%{q}%")
+            )
+            query = query.filter(search_filter)
     
-    # Apply filters
+    # Filters, keyed by facet so facet counts can leave out their own
+    filters = {}
     if category_id:
-        query = query.filter(Tool.category_id == category_id)
+        filters["category_id"] = Tool.category_id == category_id
     if subcategory_id:
-        query = query.filter(Tool.subcategory_id == subcategory_id)
+        filters["subcategory_id"] = Tool.subcategory_id == subcategory_id
     if pricing_model:
-        query = query.filter(Tool.pricing_model == pricing_model)
+        filters["pricing_model"] = Tool.pricing_model == pricing_model
     if company_size:
-        query = query.filter(Tool.company_size == company_size)
+        filters["company_size"] = Tool.company_size == company_size
     if industry:
-        query = query.filter(Tool.industry == industry)
+        filters["industry"] = Tool.industry == industry
     if employee_size:
-        query = query.filter(Tool.employee_size == employee_size)
+        filters["employee_size"] = Tool.employee_size == employee_size
     if revenue_range:
-        query = query.filter(Tool.revenue_range == revenue_range)
+        filters["revenue_range"] = Tool.revenue_range == revenue_range
     if location:
-        query = query.filter(Tool.location.ilike(f"%{location}%"))
+        filters["location"] = Tool.location.ilike(f"%{location}%")
     if is_hot is not None:
-        query = query.filter(Tool.is_hot == is_hot)
+        filters["is_hot"] = Tool.is_hot == is_hot
     if is_featured is not None:
-        query = query.filter(Tool.is_featured == is_featured)
+        filters["is_featured"] = Tool.is_featured == is_featured
     if min_rating:
-        query = query.filter(Tool.rating >= min_rating)
+        filters["min_rating"] = Tool.rating >= min_rating
+    
+    facets = _tool_facet_counts(query, filters) if include_facets else None
+    filtered = query = query.filter(*filters.values())
+    
+    if count_mode is None:
+        count_mode = "none" if cursor is not None else "exact"
+    
+    if cursor is not None:
+        if sort_by in TOOL_SEARCH_ORDERS:
+            column, descending = TOOL_SEARCH_ORDERS[sort_by]
+            tools, next_cursor = keyset_paginate(
+                filtered, [(column, descending), (Tool.id, descending)], per_page, sort_by, cursor
+            )
+        elif relevance_order is not None:
+            # Rank is not a column to seek on; page through it by offset
+            ranked = filtered.order_by(relevance_order, desc(Tool.trending_score), desc(Tool.id))
+            tools, next_cursor = offset_paginate(ranked, per_page, "rank", cursor)
+        else:
+            tools, next_cursor = keyset_paginate(
+                filtered, [(Tool.trending_score, True), (Tool.id, True)], per_page, "relevance", cursor
+            )
+        
+        total = count_rows(filtered, count_mode)
+        
+        return PaginatedToolsResponse(
+            tools=tools,
+            total=total,
+            page=page,
+            per_page=per_page,
+            total_pages=math.ceil(total / per_page) if total is not None else None,
+            has_next=next_cursor is not None,
+            has_prev=bool(cursor),
+            facets=facets,
+            next_cursor=next_cursor
+        )
     
     # Sorting
     if sort_by == "rating":
@@ -107,18 +206,35 @@ async def advanced_search_tools(
         query = query.order_by(asc(Tool.created_at))
     elif sort_by == "name":
         query = query.order_by(asc(Tool.name))
+    elif relevance_order is not None:  # relevance with a text query
+        query = query.order_by(relevance_order, desc(Tool.trending_score))
     else:  # relevance
         query = query.order_by(desc(Tool.trending_score))
     
-    # Get total count
-    total = query.count()
-    
-    # Calculate pagination
     skip = (page - 1) * per_page
-    tools = query.offset(skip).limit(per_page).all()
     
-    total_pages = math.ceil(total / per_page)
-    has_next = page < total_pages
+    if count_mode == "exact":
+        total = query.count()
+        tools = query.offset(skip).limit(per_page).all()
+        total_pages = math.ceil(total / per_page)
+        has_next = page < total_pages
+    else:
+        # One extra row answers has_next without counting
+        rows = query.offset(skip).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        tools = rows[:per_page]
+        
+        if count_mode == "estimate":
+            if has_next or (skip and not tools):
+                # Never report fewer rows than this page has shown to exist
+                total = max(count_rows(filtered, "estimate"), skip + len(tools) + int(has_next))
+            else:
+                total = skip + len(tools)  # last page: exact for free
+            total_pages = math.ceil(total / per_page)
+        else:
+            total = None
+            total_pages = None
+    
     has_prev = page > 1
     
     return PaginatedToolsResponse(
@@ -128,50 +244,163 @@ async def advanced_search_tools(
         per_page=per_page,
         total_pages=total_pages,
         has_next=has_next,
-        has_prev=has_prev
+        has_prev=has_prev,
+        facets=facets
+    )
+
+# Sort options of /search mapped to (column, descending) for keyset pagination
+TOOL_SEARCH_ORDERS = {
+    "rating": (Tool.rating, True),
+    "trending": (Tool.trending_score, True),
+    "views": (Tool.views, True),
+    "newest": (Tool.created_at, True),
+    "oldest": (Tool.created_at, False),
+    "name": (Tool.name, False),
+}
+
+# Sort options of /search mapped to (index sort field, descending)
+MEMORY_INDEX_SORTS = {
+    "rating": ("rating", True),
+    "trending": ("trending_score", True),
+    "views": ("views", True),
+    "newest": ("created_at", True),
+    "oldest": ("created_at", False),
+    "name": ("name", False),
+}
+
+# Filters of /search that facet counts are returned for
+TOOL_SEARCH_FACETS = [
+    "pricing_model",
+    "company_size",
+    "industry",
+    "employee_size",
+    "revenue_range",
+    "location",
+    "is_hot",
+    "is_featured",
+]
+
+def _facet_key(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+def _tool_facet_counts(query, filters):
+    """
+    Count matching tools per facet value in one round trip.
+    
+    Each facet is grouped with every filter except its own applied (so the UI
+    can show what switching to another value would return); the per-facet
+    GROUP BYs are combined with UNION ALL.
+    """
+    grouped = []
+    for facet in TOOL_SEARCH_FACETS:
+        column = getattr(Tool, facet)
+        grouped.append(
+            query.filter(*[criterion for name, criterion in filters.items() if name != facet])
+            .with_entities(
+                literal(facet).label("facet"),
+                cast(column, String).label("value"),
+                func.count(Tool.id).label("count")
+            )
+            .group_by(column)
+        )
+    
+    facets = {facet: {} for facet in TOOL_SEARCH_FACETS}
+    for facet, value, count in grouped[0].union_all(*grouped[1:]).all():
+        if value is None or value == "":
+            continue
+        if facet in ("is_hot", "is_featured"):
+            value = "true" if value.lower() in ("1", "true") else "false"
+        facets[facet][value] = facets[facet].get(value, 0) + count
+    return facets
+
+def _search_tools_in_memory(db, q, sort_by, page, per_page, filters, location, min_rating, include_facets=False, cursor=None):
+    """Answer /search from the in-process index; only the page rows are loaded"""
+    
+    if sort_by in MEMORY_INDEX_SORTS:
+        sort_field, descending = MEMORY_INDEX_SORTS[sort_by]
+    elif q:  # relevance with a text query
+        sort_field, descending = None, True
+    else:  # relevance
+        sort_field, descending = "trending_score", True
+    
+    # The index orders every match in memory, so cursors carry an offset
+    if cursor is not None:
+        skip = decode_cursor(cursor, "index").get("offset", 0)
+    else:
+        skip = (page - 1) * per_page
+    page_ids, total = tool_index.search(
+        q=q or None,
+        filters=filters,
+        contains={"location": location},
+        min_values={"rating": min_rating or None},
+        sort_by=sort_field,
+        descending=descending,
+        offset=skip,
+        limit=per_page
+    )
+    
+    rows = {tool.id: tool for tool in db.query(Tool).filter(Tool.id.in_(page_ids)).all()} if page_ids else {}
+    tools = [rows[tool_id] for tool_id in page_ids if tool_id in rows]
+    
+    facets = None
+    if include_facets:
+        counts = tool_index.facet_counts(
+            TOOL_SEARCH_FACETS,
+            q=q or None,
+            filters=filters,
+            contains={"location": location},
+            min_values={"rating": min_rating or None}
+        )
+        facets = {
+            facet: {_facet_key(value): count for value, count in values.items()}
+            for facet, values in counts.items()
+        }
+    
+    total_pages = math.ceil(total / per_page)
+    
+    if cursor is not None:
+        has_next = skip + per_page < total
+        return PaginatedToolsResponse(
+            tools=tools,
+            total=total,
+            page=page,
+            per_page=per_page,
+            total_pages=total_pages,
+            has_next=has_next,
+            has_prev=skip > 0,
+            facets=facets,
+            next_cursor=encode_cursor("index", offset=skip + per_page) if has_next else None
+        )
+    
+    return PaginatedToolsResponse(
+        tools=tools,
+        total=total,
+        page=page,
+        per_page=per_page,
+        total_pages=total_pages,
+        has_next=page < total_pages,
+        has_prev=page > 1,
+        facets=facets
     )
 
 # Categories Routes (must be before /{tool_id} route to avoid conflicts)
 @router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_async_read_db)):
     """Get all categories"""
-    categories = db.query(Category).all()
-    return categories
-@router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
-    """Get all categories"""
-    categories = db.query(Category).all()
-    return categories
+    result = await db.execute(select(Category))
+    return result.scalars().all()
 
 @router.get("/categories/analytics")
-async def get_category_analytics(db: Session = Depends(get_db)):
+async def get_category_analytics(
+    db: AsyncSession = Depends(get_async_read_db),
+    primary_db: AsyncSession = Depends(get_async_db)
+):
     """Get analytics for each category"""
-    categories = db.query(Category).all()
-    analytics = []
-    
-    for category in categories:
-        tools_in_category = db.query(Tool).filter(Tool.category_id == category.id)
-        tool_count = tools_in_category.count()
-        
-        if tool_count > 0:
-            avg_rating = tools_in_category.with_entities(func.avg(Tool.rating)).scalar() or 0
-            total_views = tools_in_category.with_entities(func.sum(Tool.views)).scalar() or 0
-            recommended_tools = tools_in_category.order_by(desc(Tool.rating)).limit(5).all()
-        else:
-            avg_rating = 0
-            total_views = 0
-            recommended_tools = []
-        
-        analytics.append(CategoryAnalytics(
-            category_id=category.id,
-            category_name=category.name,
-            tool_count=tool_count,
-            avg_rating=float(avg_rating),
-            total_views=int(total_views),
-            recommended_tools=recommended_tools
-        ))
-    
-    return analytics
+    # Names from the replica; stale entries are recomputed on the primary
+    categories = await db.run_sync(category_names)
+    return await primary_db.run_sync(tool_category_analytics.get, categories)
 
 # Tools CRUD Operations
 @router.post("", response_model=ToolResponse)
@@ -210,6 +439,11 @@ async def create_tool(
     db.commit()
     db.refresh(db_tool)
     
+    trending_aggregates.record_tool_added(db_tool)
+    analytics_snapshot.invalidate()
+    tool_index.index(db, db_tool)
+    tool_category_analytics.invalidate(db_tool.category_id)
+    
     return db_tool
 
 @router.put("/{tool_id}", response_model=ToolResponse)
@@ -258,6 +492,7 @@ async def update_tool(
             raise HTTPException(status_code=400, detail="Subcategory not found")
     
     # Update tool
+    previous_category_id = db_tool.category_id
     for field, value in update_data.items():
         setattr(db_tool, field, value)
     
@@ -265,6 +500,10 @@ async def update_tool(
     db.commit()
     db.refresh(db_tool)
     
+    analytics_snapshot.invalidate()
+    tool_index.index(db, db_tool)
+    tool_category_analytics.invalidate(previous_category_id, db_tool.category_id)
+    
     return db_tool
 
 @router.delete("/{tool_id}")
@@ -288,8 +527,14 @@ async def delete_tool(
                 detail="You don't have access to this tool"
             )
     
+    trending_aggregates.record_tool_removed(db_tool)
+    category_id = db_tool.category_id
+    
     db.delete(db_tool)
     db.commit()
+    analytics_snapshot.invalidate()
+    tool_index.unindex(db, tool_id)
+    tool_category_analytics.invalidate(category_id)
     return {"message": "Tool deleted successfully"}
 
 # Tools Comparison System
@@ -380,30 +625,32 @@ async def remove_tool_from_comparison(
 @router.get("/{tool_id}", response_model=ToolResponse)
 async def get_tool_by_id(
     tool_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific tool by ID"""
-    tool = db.query(Tool).filter(Tool.id == tool_id).first()
+    result = await db.execute(select(Tool).where(Tool.id == tool_id))
+    tool = result.scalars().first()
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
     
-    # Increment view count and update trending
-    increment_view_and_update_trending(db, tool_id)
+    # Buffered; views and trending score are updated on the next flush
+    view_counter.record("tools", tool.id)
     
     return tool
 
 @router.get("/slug/{slug}", response_model=ToolResponse)
 async def get_tool_by_slug(
     slug: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a tool by slug"""
-    tool = db.query(Tool).filter(Tool.slug == slug).first()
+    result = await db.execute(select(Tool).where(Tool.slug == slug))
+    tool = result.scalars().first()
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
     
-    # Increment view count and update trending
-    increment_view_and_update_trending(db, tool.id)
+    # Buffered; views and trending score are updated on the next flush
+    view_counter.record("tools", tool.id)
     
     return tool
 
@@ -448,28 +695,44 @@ async def create_review(
     db.add(db_review)
     
     # Update tool rating statistics
-    reviews = db.query(Review).filter(Review.tool_id == tool_id).all()
-    total_reviews = len(reviews) + 1  # Include the new review
-    avg_rating = (sum(r.rating for r in reviews) + review.rating) / total_reviews
-    
-    tool.rating = avg_rating
-    tool.total_reviews = total_reviews
+    trending_aggregates.ensure_loaded(db)
+    old_rating, old_total_reviews = tool.rating, tool.total_reviews
+    apply_rating_delta(db, tool, review.rating, 1)
+    trending_aggregates.record_rating_change(old_rating, old_total_reviews, tool.rating, tool.total_reviews)
+    rescore_tool(db, tool)
     
     db.commit()
     db.refresh(db_review)
+    analytics_snapshot.invalidate()
+    tool_category_analytics.invalidate(tool.category_id)
     
     return db_review
 
 @router.get("/{tool_id}/reviews", response_model=List[ReviewResponse])
 async def get_tool_reviews(
     tool_id: str,
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
-    """Get reviews for a tool with user's review status"""
-    reviews = db.query(Review).filter(Review.tool_id == tool_id).offset(skip).limit(limit).all()
+    """
+    Get reviews for a tool with user's review status
+    
+    With `cursor`, reviews are returned newest first and the next page's
+    cursor is sent in the X-Next-Cursor header.
+    """
+    query = db.query(Review).filter(Review.tool_id == tool_id)
+    if cursor is not None:
+        reviews, next_cursor = keyset_paginate(
+            query, [(Review.created_at, True), (Review.id, True)], limit, "newest", cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        reviews = query.offset(skip).limit(limit).all()
     
     # Add user's review status to each review
     for review in reviews:
@@ -538,6 +801,8 @@ async def update_review(
     if db_review.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to edit this review")
     
+    rating_delta = review_update.rating - db_review.rating
+    
     # Update review
     db_review.rating = review_update.rating
     db_review.title = review_update.title
@@ -545,17 +810,20 @@ async def update_review(
     db_review.pros = review_update.pros
     db_review.cons = review_update.cons
     
-    # Recalculate tool rating statistics
+    # Update tool rating statistics
     tool = db.query(Tool).filter(Tool.id == db_review.tool_id).first()
-    if tool:
-        reviews = db.query(Review).filter(Review.tool_id == db_review.tool_id).all()
-        if reviews:
-            avg_rating = sum(r.rating for r in reviews) / len(reviews)
-            tool.rating = avg_rating
-            tool.total_reviews = len(reviews)
+    if tool and rating_delta:
+        trending_aggregates.ensure_loaded(db)
+        old_rating, old_total_reviews = tool.rating, tool.total_reviews
+        apply_rating_delta(db, tool, rating_delta, 0)
+        trending_aggregates.record_rating_change(old_rating, old_total_reviews, tool.rating, tool.total_reviews)
+        rescore_tool(db, tool)
     
     db.commit()
     db.refresh(db_review)
+    analytics_snapshot.invalidate()
+    if tool:
+        tool_category_analytics.invalidate(tool.category_id)
     
     return db_review
 
@@ -577,19 +845,19 @@ async def delete_review(
     tool_id = db_review.tool_id
     db.delete(db_review)
     
-    # Recalculate tool rating statistics
+    # Update tool rating statistics
     tool = db.query(Tool).filter(Tool.id == tool_id).first()
     if tool:
-        reviews = db.query(Review).filter(Review.tool_id == tool_id).all()
-        if reviews:
-            avg_rating = sum(r.rating for r in reviews) / len(reviews)
-            tool.rating = avg_rating
-            tool.total_reviews = len(reviews)
-        else:
-            tool.rating = 0.0
-            tool.total_reviews = 0
+        trending_aggregates.ensure_loaded(db)
+        old_rating, old_total_reviews = tool.rating, tool.total_reviews
+        apply_rating_delta(db, tool, -db_review.rating, -1)
+        trending_aggregates.record_rating_change(old_rating, old_total_reviews, tool.rating, tool.total_reviews)
+        rescore_tool(db, tool)
     
     db.commit()
+    analytics_snapshot.invalidate()
+    if tool:
+        tool_category_analytics.invalidate(tool.category_id)
     
     return {"message": "Review deleted successfully"}
 
@@ -606,6 +874,17 @@ async def get_free_tools(
     db: Session = Depends(get_db)
 ):
     """Get all free tools (public endpoint)"""
+    # Text searches are ranked by the in-process index where available
+    if search and use_memory_index(db, free_tool_index):
+        page_ids, _ = free_tool_index.search(
+            q=search,
+            filters={"is_active": is_active, "category": category or None},
+            offset=skip,
+            limit=limit
+        )
+        rows = {tool.id: tool for tool in db.query(FreeTool).filter(FreeTool.id.in_(page_ids)).all()} if page_ids else {}
+        return [rows[tool_id] for tool_id in page_ids if tool_id in rows]
+    
     query = db.query(FreeTool).filter(FreeTool.is_active == is_active)
     
     if category:
@@ -627,9 +906,8 @@ async def get_free_tool(tool_id: str, db: Session = Depends(get_db)):
     if not tool:
         raise HTTPException(status_code=404, detail="Free tool not found")
     
-    # Increment view count
-    tool.views += 1
-    db.commit()
+    # Buffered; written on the next view counter flush
+    view_counter.record("free_tools", tool.id)
     
     return tool
 
@@ -640,45 +918,11 @@ async def get_free_tool_by_slug(slug: str, db: Session = Depends(get_db)):
     if not tool:
         raise HTTPException(status_code=404, detail="Free tool not found")
     
-    # Increment view count
-    tool.views += 1
-    db.commit()
+    # Buffered; written on the next view counter flush
+    view_counter.record("free_tools", tool.id)
     
     return tool
 
-# Helper function to get current user (optional)
-def get_token_optional(authorization: str = Header(None)):
-    if not authorization:
-        return None
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            return None
-        return token
-    except ValueError:
-        return None
-
-def get_current_user_optional_local(token: str = Depends(get_token_optional)):
-    if not token:
-        return None
-    try:
-        from auth import SECRET_KEY, ALGORITHM
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        from schemas import TokenData
-        token_data = TokenData(username=username)
-    except JWTError:
-        return None
-    
-    from auth import get_user
-    db = next(get_db())
-    user = get_user(db, username=token_data.username)
-    if user is None:
-        return None
-    return user
-
 # Search Routes (Public)
 @free_tools_router.post("/{tool_id}/search", response_model=SearchResponse)
 async def search_with_tool(
@@ -686,7 +930,7 @@ async def search_with_tool(
     search_request: SearchRequest,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional_local)
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Perform search using a free tool"""
     tool = db.query(FreeTool).filter(FreeTool.id == tool_id).first()
@@ -701,25 +945,17 @@ async def search_with_tool(
     else:
         raise HTTPException(status_code=400, detail="Invalid search engine")
     
-    # Save search history
-    search_history = SearchHistory(
-        id=str(uuid.uuid4()),
-        tool_id=tool_id,
+    # Buffered; written in batches by the search history writer
+    search_history_writer.record(
+        tool_id,
+        search_request.engine,
+        search_request.query,
+        [result.dict() for result in search_result.results],
         user_id=current_user.id if current_user else None,
-        search_engine=search_request.engine,
-        query=search_request.query,
-        results_count=len(search_result.results),
-        results=json.dumps([result.dict() for result in search_result.results]),
         ip_address=request.client.host,
         user_agent=request.headers.get("user-agent", "")
     )
     
-    db.add(search_history)
-    
-    # Update tool search count
-    tool.searches_count += 1
-    db.commit()
-    
     # Add tool_id to response
     search_result.tool_id = tool_id
     
@@ -731,7 +967,7 @@ async def combined_search_with_tool(
     search_request: SearchRequest,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional_local)
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Perform combined search (Google + Bing) using a free tool"""
     tool = db.query(FreeTool).filter(FreeTool.id == tool_id).first()
@@ -745,26 +981,18 @@ async def combined_search_with_tool(
         search_request.num_results
     )
     
-    # Save search history for both engines
+    # Buffered history for the engines that answered
     for engine in ["google", "bing"]:
         if engine in combined_results:
-            search_result = combined_results[engine]
-            search_history = SearchHistory(
-                id=str(uuid.uuid4()),
-                tool_id=tool_id,
+            search_history_writer.record(
+                tool_id,
+                engine,
+                search_request.query,
+                [result.dict() for result in combined_results[engine].results],
                 user_id=current_user.id if current_user else None,
-                search_engine=engine,
-                query=search_request.query,
-                results_count=len(search_result.results),
-                results=json.dumps([result.dict() for result in search_result.results]),
                 ip_address=request.client.host,
                 user_agent=request.headers.get("user-agent", "")
             )
-            db.add(search_history)
-    
-    # Update tool search count
-    tool.searches_count += 2  # Both Google and Bing
-    db.commit()
     
     return combined_results
 
@@ -6,14 +6,150 @@ This module calculates trending scores for tools based on multiple factors:
 - Rating and number of reviews
 - Recency of tool (newer tools get slight boost)
 - Current hot/featured status
+
+Scores are normalised against catalog-wide averages. Those averages are kept
+as running aggregates (see TrendingAggregates) so a single tool can be
+rescored in O(1) instead of scanning every tool on each page view.
 """
 
+import hashlib
+import json
 import math
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, case, cast, extract, select, Integer, true
 from models import Tool
+from schemas import ToolAnalytics
+from search_index import tool_index, build_search_indexes, refresh_tool_sort_values
+from category_stats import tool_category_analytics
+
+class TrendingAggregates:
+    """
+    In-process running totals behind the trending averages.
+
+    Stores the sums and counts used for avg_views, avg_rating and avg_reviews.
+    View and rating events adjust them in O(1); the TrendingUpdater thread
+    periodically reconciles them against the database to repair any drift
+    (e.g. writes made by other worker processes). Events recorded before the
+    first load are simply overwritten by it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.tool_count = 0
+        self.total_views = 0
+        self.total_reviews = 0
+        self.rated_count = 0
+        self.rating_sum = 0.0
+        self.reconciled_at = None
+
+    def load(self, tool_count: int, total_views: int, total_reviews: int, rated_count: int, rating_sum: float):
+        """Replace the running totals with freshly computed values"""
+        with self._lock:
+            self.tool_count = int(tool_count or 0)
+            self.total_views = int(total_views or 0)
+            self.total_reviews = int(total_reviews or 0)
+            self.rated_count = int(rated_count or 0)
+            self.rating_sum = float(rating_sum or 0.0)
+            self.loaded = True
+            self.reconciled_at = datetime.utcnow()
+
+    def reconcile(self, db: Session):
+        """Rebuild the totals from a single aggregate query"""
+        row = db.query(
+            func.count(Tool.id),
+            func.sum(Tool.views),
+            func.sum(Tool.total_reviews),
+            func.sum(case((Tool.rating > 0, 1), else_=0)),
+            func.sum(case((Tool.rating > 0, Tool.rating), else_=0.0))
+        ).one()
+        self.load(*row)
+
+    def ensure_loaded(self, db: Session):
+        """Reconcile once if the totals have never been loaded in this process"""
+        if not self.loaded:
+            self.reconcile(db)
+
+    def invalidate(self):
+        """Force the next ensure_loaded call to reconcile"""
+        with self._lock:
+            self.loaded = False
+
+    def averages(self) -> Tuple[float, float, float]:
+        """Return (avg_views, avg_rating, avg_reviews)"""
+        with self._lock:
+            if self.tool_count <= 0:
+                return 0.0, 0.0, 0.0
+            avg_views = self.total_views / self.tool_count
+            avg_rating = self.rating_sum / self.rated_count if self.rated_count > 0 else 0
+            avg_reviews = self.total_reviews / self.tool_count
+            return avg_views, avg_rating, avg_reviews
+
+    def record_views(self, count: int = 1):
+        """Account for new views on any tool"""
+        with self._lock:
+            self.total_views += count
+
+    def record_rating_change(self, old_rating: float, old_reviews: int, new_rating: float, new_reviews: int):
+        """Account for a tool's rating/review count changing"""
+        old_rating = old_rating or 0.0
+        new_rating = new_rating or 0.0
+        with self._lock:
+            self.total_reviews += (new_reviews or 0) - (old_reviews or 0)
+            if old_rating > 0:
+                self.rated_count -= 1
+                self.rating_sum -= old_rating
+            if new_rating > 0:
+                self.rated_count += 1
+                self.rating_sum += new_rating
+
+    def record_tool_added(self, tool: Tool):
+        """Account for a newly created tool"""
+        with self._lock:
+            self.tool_count += 1
+            self.total_views += tool.views or 0
+            self.total_reviews += tool.total_reviews or 0
+            if (tool.rating or 0) > 0:
+                self.rated_count += 1
+                self.rating_sum += tool.rating
+
+    def record_tool_removed(self, tool: Tool):
+        """Account for a deleted tool"""
+        with self._lock:
+            self.tool_count = max(0, self.tool_count - 1)
+            self.total_views -= tool.views or 0
+            self.total_reviews -= tool.total_reviews or 0
+            if (tool.rating or 0) > 0:
+                self.rated_count -= 1
+                self.rating_sum -= tool.rating
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current totals and averages for diagnostics"""
+        avg_views, avg_rating, avg_reviews = self.averages()
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "tool_count": self.tool_count,
+                "total_views": self.total_views,
+                "total_reviews": self.total_reviews,
+                "rated_count": self.rated_count,
+                "rating_sum": self.rating_sum,
+                "reconciled_at": self.reconciled_at,
+                "averages": {
+                    "views": avg_views,
+                    "rating": avg_rating,
+                    "reviews": avg_reviews
+                }
+            }
+
+# Global instance
+trending_aggregates = TrendingAggregates()
 
 def calculate_trending_score(tool: Tool, avg_views: float, avg_rating: float, avg_reviews: float) -> float:
     """
@@ -64,17 +200,131 @@ def calculate_trending_score(tool: Tool, avg_views: float, avg_rating: float, av
     # Ensure score is between 0 and 100
     return min(100.0, max(0.0, trending_score))
 
-def update_trending_scores(db: Session) -> Dict[str, Any]:
+def _trending_score_expression(dialect_name: str, table, avg_views, avg_reviews):
+    """
+    Build the SQL equivalent of calculate_trending_score for one tools row.
+    
+    Args:
+        dialect_name: SQLAlchemy dialect name ("postgresql" or "sqlite")
+        table: The tools table
+        avg_views: SQL expression for the average views across all tools
+        avg_reviews: SQL expression for the average review count across all tools
+    
+    Returns:
+        SQL expression for the clamped 0-100 trending score
+    """
+    
+    if dialect_name == "postgresql":
+        least, greatest = func.least, func.greatest
+        days_old = extract("day", func.now() - table.c.created_at)
+    else:
+        # SQLite's multi-argument min()/max() are scalar functions
+        least, greatest = func.min, func.max
+        days_old = cast(func.julianday("now") - func.julianday(table.c.created_at), Integer)
+    
+    views_score = least(40.0, func.coalesce(table.c.views, 0) * 20.0 / greatest(avg_views, 1))
+    rating_score = func.coalesce(table.c.rating, 0.0) / 5.0 * 25.0
+    reviews_score = least(15.0, func.coalesce(table.c.total_reviews, 0) * 7.5 / greatest(avg_reviews, 1))
+    recency_score = case(
+        (days_old < 30, 10.0 * (1 - days_old / 30.0)),
+        (days_old < 90, 5.0 * (1 - (days_old - 30) / 60.0)),
+        else_=0.0
+    )
+    hot_bonus = case((table.c.is_hot == true(), 5.0), else_=0.0)
+    featured_bonus = case((table.c.is_featured == true(), 5.0), else_=0.0)
+    
+    trending_score = views_score + rating_score + reviews_score + recency_score + hot_bonus + featured_bonus
+    
+    return least(100.0, greatest(0.0, trending_score))
+
+def update_trending_scores_set_based(db: Session) -> Dict[str, Any]:
+    """
+    Update trending scores for all tools with a single set-based UPDATE.
+    
+    On PostgreSQL this runs as UPDATE ... FROM (SELECT avg(...)) so the
+    averages are computed once by the database; other databases (SQLite)
+    use uncorrelated scalar subqueries instead. No Tool objects are loaded.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        Dictionary with summary statistics only
+    """
+    
+    # One aggregate query; also reconciles the running aggregates
+    trending_aggregates.reconcile(db)
+    totals = trending_aggregates.snapshot()
+    
+    if totals["tool_count"] == 0:
+        return {
+            "total_tools": 0,
+            "updated_tools": 0,
+            "error": "No tools found"
+        }
+    
+    table = Tool.__table__
+    dialect_name = db.get_bind().dialect.name
+    
+    # Aliased so the averages are not correlated with the row being updated
+    source = table.alias("stats_source")
+    averages = select(
+        func.coalesce(func.avg(source.c.views), 0).label("avg_views"),
+        func.coalesce(func.avg(source.c.total_reviews), 0).label("avg_reviews")
+    )
+    
+    if dialect_name == "postgresql":
+        stats = averages.subquery("stats")
+        avg_views, avg_reviews = stats.c.avg_views, stats.c.avg_reviews
+    else:
+        avg_views = select(averages.selected_columns.avg_views).scalar_subquery()
+        avg_reviews = select(averages.selected_columns.avg_reviews).scalar_subquery()
+    
+    stmt = table.update().values(
+        trending_score=_trending_score_expression(dialect_name, table, avg_views, avg_reviews),
+        last_updated=func.now()
+    )
+    if dialect_name == "postgresql":
+        # Referencing the subquery in WHERE renders it as UPDATE ... FROM
+        stmt = stmt.where(stats.c.avg_views.isnot(None))
+    
+    result = db.execute(stmt)
+    db.commit()
+    
+    score_min, score_max, score_avg = db.query(
+        func.min(Tool.trending_score),
+        func.max(Tool.trending_score),
+        func.avg(Tool.trending_score)
+    ).one()
+    
+    return {
+        "total_tools": totals["tool_count"],
+        "updated_tools": result.rowcount,
+        "mode": "set_based",
+        "averages": totals["averages"],
+        "score_summary": {
+            "min": float(score_min or 0.0),
+            "max": float(score_max or 0.0),
+            "avg": float(score_avg or 0.0)
+        }
+    }
+
+def update_trending_scores(db: Session, set_based: bool = True) -> Dict[str, Any]:
     """
     Update trending scores for all tools in the database.
     
     Args:
         db: Database session
+        set_based: Use the single-statement SQL recompute where the database
+            supports it; otherwise load every tool and score it in Python
     
     Returns:
         Dictionary with update statistics
     """
     
+    if set_based and db.get_bind().dialect.name in ("postgresql", "sqlite"):
+        return update_trending_scores_set_based(db)
+    
     # Get all tools
     tools = db.query(Tool).all()
     
@@ -90,10 +340,15 @@ def update_trending_scores(db: Session) -> Dict[str, Any]:
     total_rating = sum(tool.rating for tool in tools if tool.rating > 0)
     total_reviews = sum(tool.total_reviews for tool in tools)
     
+    rated_count = len([tool for tool in tools if tool.rating > 0])
+    
     avg_views = total_views / len(tools)
-    avg_rating = total_rating / len([tool for tool in tools if tool.rating > 0]) if any(tool.rating > 0 for tool in tools) else 0
+    avg_rating = total_rating / rated_count if rated_count > 0 else 0
     avg_reviews = total_reviews / len(tools)
     
+    # Full recompute doubles as a reconcile of the running aggregates
+    trending_aggregates.load(len(tools), total_views, total_reviews, rated_count, total_rating)
+    
     # Update trending scores for each tool
     updated_count = 0
     score_changes = []
@@ -174,36 +429,131 @@ def get_trending_analytics(db: Session, recalculate: bool = False) -> Dict[str,
         "update_result": update_result
     }
 
-def increment_view_and_update_trending(db: Session, tool_id: str) -> Tool:
+def rescore_tool(db: Session, tool: Tool) -> float:
     """
-    Increment a tool's view count and update its trending score.
+    Recalculate the trending score of a single tool using the running aggregates.
     
     Args:
-        db: Database session
-        tool_id: ID of the tool to update
+        db: Database session (only used if the aggregates need loading)
+        tool: The tool to rescore
     
     Returns:
-        Updated tool object
+        The new trending score (the caller is responsible for committing)
     """
     
-    tool = db.query(Tool).filter(Tool.id == tool_id).first()
-    if not tool:
-        return None
+    trending_aggregates.ensure_loaded(db)
+    avg_views, avg_rating, avg_reviews = trending_aggregates.averages()
     
-    # Increment view count
-    tool.views += 1
+    tool.trending_score = calculate_trending_score(tool, avg_views, avg_rating, avg_reviews)
+    tool.last_updated = datetime.utcnow().replace(tzinfo=None)
     
-    # Get current averages for trending calculation
-    tools = db.query(Tool).all()
-    if tools:
-        avg_views = sum(t.views for t in tools) / len(tools)
-        avg_rating = sum(t.rating for t in tools if t.rating > 0) / len([t for t in tools if t.rating > 0]) if any(t.rating > 0 for t in tools) else 0
-        avg_reviews = sum(t.total_reviews for t in tools) / len(tools)
-        
-        # Update trending score
-        tool.trending_score = calculate_trending_score(tool, avg_views, avg_rating, avg_reviews)
+    # Keep the search index's sort keys in step with the row
+    tool_index.update_sort_values(
+        db, tool.id, rating=tool.rating, views=tool.views, trending_score=tool.trending_score
+    )
     
-    tool.last_updated = datetime.utcnow().replace(tzinfo=None)
-    db.commit()
+    return tool.trending_score
+
+class AnalyticsSnapshot:
+    """
+    Precomputed landing-page analytics payload.
+
+    The six tool lists returned by GET /api/tools/analytics are serialized
+    once and served from memory together with an ETag and Last-Modified
+    timestamp. The TrendingUpdater rebuilds the snapshot after every
+    recompute; tool and review writes invalidate it so the next request
+    rebuilds it. A max age guards against a stalled scheduler.
+    """
+
+    def __init__(self, max_age_seconds: Optional[int] = None):
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else int(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS", "300"))
+        self._lock = threading.Lock()
+        self.payload = None
+        self.etag = None
+        self.last_modified = None
+        self.built_at = None
+        self.stale = True
+
+    def rebuild(self, db: Session) -> "AnalyticsSnapshot":
+        """Run the analytics queries and replace the cached payload"""
+        analytics = get_trending_analytics(db, recalculate=False)
+        payload = jsonable_encoder(ToolAnalytics(
+            trending_tools=analytics["trending_tools"],
+            top_rated_tools=analytics["top_rated_tools"],
+            most_viewed_tools=analytics["most_viewed_tools"],
+            newest_tools=analytics["newest_tools"],
+            featured_tools=analytics["featured_tools"],
+            hot_tools=analytics["hot_tools"]
+        ))
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        with self._lock:
+            # Keep Last-Modified stable when nothing actually changed
+            if etag != self.etag:
+                self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            self.payload = payload
+            self.etag = etag
+            self.built_at = datetime.utcnow()
+            self.stale = False
+        return self
+
+    def invalidate(self):
+        """Mark the snapshot for rebuilding on the next request"""
+        with self._lock:
+            self.stale = True
+
+    def is_fresh(self) -> bool:
+        """Whether the cached payload can be served as is"""
+        with self._lock:
+            if self.stale or self.payload is None:
+                return False
+            if self.max_age_seconds <= 0:
+                return True
+            return (datetime.utcnow() - self.built_at).total_seconds() < self.max_age_seconds
+
+    def not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Evaluate conditional request headers against the snapshot"""
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+        if if_modified_since and self.last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= since
+        return False
+
+    def headers(self) -> Dict[str, str]:
+        """Validator headers to send with the payload"""
+        return {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            "Cache-Control": "public, no-cache"
+        }
+
+    def get(self, db: Session) -> "AnalyticsSnapshot":
+        """Return the snapshot, rebuilding it first if stale"""
+        if not self.is_fresh():
+            self.rebuild(db)
+        return self
+
+# Global instance
+analytics_snapshot = AnalyticsSnapshot()
+
+def after_trending_recompute(db: Session, rebuild_search_indexes: bool = False):
+    """
+    Refresh everything derived from trending scores after update_trending_scores().
     
-    return tool
\ No newline at end of file
+    Rebuilds the analytics snapshot, updates the search index sort keys (or
+    rebuilds the indexes entirely) and drops cached category analytics.
+    """
+    analytics_snapshot.rebuild(db)
+    if rebuild_search_indexes:
+        build_search_indexes(db)
+    else:
+        refresh_tool_sort_values(db)
+    tool_category_analytics.clear()
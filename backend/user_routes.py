@@ -5,8 +5,8 @@ from database import get_db
 from models import User, AIGeneratedContent
 from schemas import *
 from auth import (
-    authenticate_user, create_access_token, get_current_verified_user,
-    get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+    authenticate_user_async, create_access_token, get_current_verified_user,
+    password_hasher, auth_user_cache, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from email_service import send_verification_email, send_password_reset_email, send_welcome_email
 from ai_services import ai_manager
@@ -38,7 +38,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     
     # Create new user
     verification_token = str(uuid.uuid4())
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     
     db_user = User(
         id=str(uuid.uuid4()),
@@ -67,7 +67,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 
 @router.post("/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user_async(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -116,6 +116,7 @@ async def verify_email(verification: EmailVerification, db: Session = Depends(ge
     user.is_verified = True
     user.verification_token = None
     db.commit()
+    auth_user_cache.invalidate(user.id)
     
     # Send welcome email
     send_welcome_email(user.email, user.full_name)
@@ -155,7 +156,7 @@ async def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db
         )
     
     # Update password
-    user.hashed_password = get_password_hash(reset_data.new_password)
+    user.hashed_password = await password_hasher.hash(reset_data.new_password)
     user.reset_token = None
     db.commit()
     
@@ -179,6 +180,7 @@ async def update_profile(
         current_user.full_name = user_update.full_name
     
     db.commit()
+    auth_user_cache.invalidate(current_user.id)
     db.refresh(current_user)
     return current_user
 
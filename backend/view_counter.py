@@ -0,0 +1,199 @@
+"""
+Write-behind view counter
+
+Detail endpoints for tools, free tools and blogs record views here instead of
+doing `views += 1` and committing on every read. Increments are accumulated
+in memory per process and flushed in batched
+`UPDATE ... SET views = views + :n` statements:
+
+- every VIEW_FLUSH_INTERVAL_SECONDS (default 5)
+- early, once VIEW_BUFFER_MAX_PENDING distinct rows are pending (default 1000)
+- on shutdown
+
+The interval and pending limit bound how many views can be lost if the
+process dies without a clean shutdown.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, Optional
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Tool, FreeTool, Blog
+from trending_calculator import rescore_tool, trending_aggregates
+from category_stats import tool_category_analytics, blog_category_stats
+
+# Buffer kinds and the models whose `views` column they increment
+VIEW_COUNTER_MODELS = {
+    "tools": Tool,
+    "free_tools": FreeTool,
+    "blogs": Blog,
+}
+
+class ViewCounter:
+    def __init__(self, interval: Optional[float] = None, max_pending: Optional[int] = None):
+        self.interval = interval if interval is not None else float(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", "5"))
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv("VIEW_BUFFER_MAX_PENDING", "1000"))
+        self.running = False
+        self.thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {kind: defaultdict(int) for kind in VIEW_COUNTER_MODELS}
+        self._pending_rows = 0
+        self.total_flushed = 0
+        self.last_flush_at = None
+
+    def record(self, kind: str, item_id: str, count: int = 1):
+        """Buffer `count` views for one row"""
+        if kind not in VIEW_COUNTER_MODELS:
+            raise ValueError(f"Unknown view counter kind: {kind}")
+
+        with self._lock:
+            bucket = self._pending[kind]
+            if item_id not in bucket:
+                self._pending_rows += 1
+            bucket[item_id] += count
+            should_wake = self._pending_rows >= self.max_pending
+
+        if should_wake:
+            self._wake.set()
+
+    def pending(self, kind: str, item_id: str) -> int:
+        """Number of buffered, not yet flushed views for one row"""
+        with self._lock:
+            return self._pending[kind].get(item_id, 0)
+
+    def _drain(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            drained = {kind: dict(bucket) for kind, bucket in self._pending.items() if bucket}
+            self._pending = {kind: defaultdict(int) for kind in VIEW_COUNTER_MODELS}
+            self._pending_rows = 0
+        return drained
+
+    def _restore(self, drained: Dict[str, Dict[str, int]]):
+        """Put counts back after a failed flush so they are retried"""
+        for kind, counts in drained.items():
+            for item_id, count in counts.items():
+                self.record(kind, item_id, count)
+
+    def flush(self, db: Optional[Session] = None) -> Dict[str, Any]:
+        """
+        Write all buffered views to the database.
+
+        Args:
+            db: Session to use; a new one is opened (and closed) if omitted
+
+        Returns:
+            Dictionary with the number of rows and views flushed per kind
+        """
+        drained = self._drain()
+        if not drained:
+            return {"rows": 0, "views": 0}
+
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+
+        try:
+            # Load trending aggregates before the UPDATEs so they are not counted twice
+            if "tools" in drained:
+                trending_aggregates.ensure_loaded(db)
+
+            result = {"rows": 0, "views": 0}
+            for kind, counts in drained.items():
+                table = VIEW_COUNTER_MODELS[kind].__table__
+                stmt = (
+                    table.update()
+                    .where(table.c.id == bindparam("row_id"))
+                    .values(views=table.c.views + bindparam("increment"))
+                )
+                db.execute(stmt, [
+                    {"row_id": item_id, "increment": count}
+                    for item_id, count in counts.items()
+                ])
+                result[kind] = len(counts)
+                result["rows"] += len(counts)
+                result["views"] += sum(counts.values())
+
+            # Rescore only the tools whose views changed
+            tool_counts = drained.get("tools")
+            tools = []
+            if tool_counts:
+                tools = db.query(Tool).filter(Tool.id.in_(list(tool_counts))).populate_existing().all()
+                # Views buffered for tools deleted meanwhile are not counted
+                trending_aggregates.record_views(sum(tool_counts[tool.id] for tool in tools))
+                for tool in tools:
+                    rescore_tool(db, tool)
+
+            blog_counts = drained.get("blogs")
+            blog_category_ids = []
+            if blog_counts:
+                blog_category_ids = [
+                    category_id for (category_id,) in
+                    db.query(Blog.category_id).filter(Blog.id.in_(list(blog_counts))).distinct()
+                ]
+
+            db.commit()
+            tool_category_analytics.invalidate(*{tool.category_id for tool in tools})
+            blog_category_stats.invalidate(*blog_category_ids)
+        except Exception:
+            db.rollback()
+            self._restore(drained)
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+        self.total_flushed += result["views"]
+        self.last_flush_at = datetime.utcnow()
+        return result
+
+    def start(self):
+        """Start the background flush thread"""
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            print(f"🚀 View counter started - flushing every {self.interval:g} seconds")
+
+    def stop(self):
+        """Stop the flush thread and write out anything still buffered"""
+        if self.running:
+            self.running = False
+            self._wake.set()
+            if self.thread:
+                self.thread.join()
+            print("🛑 View counter stopped")
+
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ Error flushing view counts on shutdown: {e}")
+
+    def _run(self):
+        """Flush loop"""
+        while self.running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self.running:
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Error flushing view counts: {e}")
+                time.sleep(self.interval)
+
+# Global instance
+view_counter = ViewCounter()
+
+def start_view_counter():
+    """Start the view counter flush thread"""
+    view_counter.start()
+
+def stop_view_counter():
+    """Stop the view counter and flush pending views"""
+    view_counter.stop()